@@ -9,23 +9,343 @@ import os
 # Agregar el path del proyecto para imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from Models.Envio import Envio, EnvioExpress, EnvioEstandar, EnvioEconomico
+from Models.Envio import Envio, CLASES_POR_TIPO
+from Models.RegistroEnvios import RegistroEnvios
 from Patterns.ChainOfResponsibility import CadenaValidacion
-from Patterns.State import GestorEstadoEnvio, EstadoPendiente
-from Patterns.Memento import OriginadorEnvio
+from Patterns.State import GestorEstadoEnvio, EstadoPendiente, ACCIONES_LOTE
+from Patterns.Memento import OriginadorEnvio, CaretakerEnvio, MementoEnvio, momento_fijo
 from Patterns.Visitor import CalculadorCosto, CalculadorTiempoEntrega, GeneradorReporte, CalculadorDescuento
-from typing import List, Optional
+from Persistence.Almacenamiento import AlmacenamientoEnvios
+from Persistence.AsignadorIds import AsignadorIds
+from Persistence.Serializacion import envio_a_fila, envio_desde_fila
+from Persistence.SnapshotColumnar import SnapshotColumnar, escribir_snapshot
+from Persistence.DiarioOperaciones import (DiarioOperaciones, OP_CREAR, OP_AVANZAR, OP_CANCELAR,
+                                           OP_MODIFICAR, OP_MODIFICAR_VARIOS, OP_TRANSACCION,
+                                           OP_DESHACER, OP_REHACER)
+from Controllers.TransaccionEnvios import TransaccionEnvios, ACCIONES_TRANSACCION
+from Utils.Bitacora import obtener_logger, evento
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import copy
+import logging
+import threading
+import time
+
+if TYPE_CHECKING:
+    # Requiere NumPy; solo se importa para las anotaciones de tipo
+    from Models.AlmacenColumnarEnvios import AlmacenColumnarEnvios
+
+log = obtener_logger(__name__)
+
+SEPARADOR = "=" * 80
+
+# ID (y nombre por defecto) de los envíos transitorios usados para cotizar
+ID_COTIZACION = "COTIZACION"
+
+# ID de los envíos transitorios usados para validar en lote
+ID_VALIDACION = "VALIDACION"
+
+def a_booleano(valor) -> bool:
+    """
+    Convierte un valor booleano recibido (ej. en JSON) sin aceptar valores ambiguos
+    Acepta True/False y los textos "true"/"false" (sin distinguir mayúsculas);
+    cualquier otro valor lanza ValueError (bool("false") sería True)
+    """
+    if isinstance(valor, bool):
+        return valor
+    if isinstance(valor, str) and valor.strip().lower() in ("true", "false"):
+        return valor.strip().lower() == "true"
+    raise ValueError(f"Valor booleano inválido: {valor!r}")
 
 class EnvioController:
     """
     Controlador que gestiona todas las operaciones relacionadas con envíos
     Implementa la lógica de negocio y coordina los patrones de diseño
+    
+    Es seguro para uso concurrente: los IDs los reserva un asignador atómico, las
+    mutaciones de un envío (estado, datos e historial) se serializan con un lock
+    por franja de IDs y las lecturas no toman locks
     """
     
-    def __init__(self):
-        self.envios: List[Envio] = []
-        self.originadores = {}  # Diccionario de originadores por ID de envío
-        self.contador_envios = 1
+    # Número de locks entre los que se reparten los envíos
+    FRANJAS_LOCK = 64
+    
+    # Campos modificables con modificar_envio_campos(): nombre -> (atributo, conversión)
+    CAMPOS_MODIFICABLES = {
+        'remitente': ('remitente', str),
+        'destinatario': ('destinatario', str),
+        'direccion_origen': ('direccion_origen', str),
+        'direccion_destino': ('direccion_destino', str),
+        'descripcion': ('descripcion', str),
+        'peso': ('peso', float),
+        'fragil': ('es_fragil', a_booleano),
+    }
+    
+    # Campos obligatorios de cada envío en crear_envios_lote()
+    CAMPOS_REQUERIDOS = ('tipo', 'remitente', 'destinatario', 'direccion_origen',
+                         'direccion_destino', 'peso')
+    
+    # Campos de crear_envios_lote() que deben ser texto
+    CAMPOS_TEXTO = ('tipo', 'remitente', 'destinatario', 'direccion_origen',
+                    'direccion_destino', 'descripcion')
+    
+    def __init__(self, almacenamiento: Optional[AlmacenamientoEnvios] = None,
+                 diario: Optional[DiarioOperaciones] = None,
+                 analitica: Optional['AlmacenColumnarEnvios'] = None,
+                 asignador_ids: Optional[AsignadorIds] = None):
+        """
+        Args:
+            almacenamiento: Backend persistente opcional. Si se indica, los envíos
+                            guardados se cargan al iniciar y cada mutación se le notifica
+            diario: Diario de operaciones opcional. Si se indica, se recupera el estado
+                    reproduciéndolo al iniciar y cada operación se registra en él
+            analitica: Almacén columnar opcional que refleja los envíos para
+                       consultas agregadas vectorizadas
+            asignador_ids: Origen de los números de ID. Por defecto un contador en
+                           memoria; con AsignadorIdsBloques varios procesos pueden
+                           crear envíos sin colisiones
+            
+        Raises:
+            ValueError: Si se indican almacenamiento y diario a la vez (ambos recuperan
+                        el estado completo y las operaciones se aplicarían dos veces)
+        """
+        if almacenamiento and diario:
+            raise ValueError("El almacenamiento y el diario no se pueden combinar: "
+                             "las operaciones recuperadas se aplicarían dos veces")
+        
+        # Registro indexado: envíos y originadores por ID + índices secundarios
+        self.registro = RegistroEnvios()
+        self.asignador_ids = asignador_ids or AsignadorIds()
+        self.almacenamiento = almacenamiento
+        self.diario = diario
+        self.analitica = analitica
+        self._reproduciendo = False
+        
+        # Concurrencia: locks por franja de envíos
+        self._franjas = tuple(threading.RLock() for _ in range(self.FRANJAS_LOCK))
+        self._lock_checkpoint = threading.Lock()
+        self._hilo = threading.local()
+        
+        if self.almacenamiento:
+            self._cargar_desde_almacenamiento()
+        
+        if self.diario:
+            self._recuperar_desde_diario()
+    
+    def _restaurar_envio(self, fila: tuple, historial: Optional[dict]):
+        """Agrega al registro un envío persistido junto con su historial"""
+        envio = envio_desde_fila(fila)
+        caretaker = CaretakerEnvio.importar(historial) if historial else None
+        self.registro.agregar(envio, OriginadorEnvio(envio, caretaker))
+        if self.analitica is not None:
+            self.analitica.actualizar(envio)
+        
+        self._reservar_id(envio.id_envio)
+    
+    def _cargar_desde_almacenamiento(self):
+        """Reconstruye envíos, estados e historiales desde el almacenamiento"""
+        for fila, historial in self.almacenamiento.cargar():
+            self._restaurar_envio(fila, historial)
+    
+    def _recuperar_desde_diario(self):
+        """Carga el último punto de control y reproduce las operaciones posteriores"""
+        estado = self.diario.cargar_checkpoint()
+        if estado:
+            for fila, historial in estado['envios']:
+                if fila[0] not in self.registro:
+                    self._restaurar_envio(fila, historial)
+            self.asignador_ids.reservar_hasta(estado['contador_envios'])
+        
+        self._reproduciendo = True
+        try:
+            for operacion, timestamp, argumentos in self.diario.leer():
+                # Los mementos reconstruidos conservan la fecha original de la operación
+                with momento_fijo(timestamp):
+                    self._aplicar_operacion(operacion, timestamp, argumentos)
+        finally:
+            self._reproduciendo = False
+        
+        self._checkpoint_si_corresponde()
+    
+    def _aplicar_operacion(self, operacion: int, timestamp: float, argumentos: list):
+        """Reaplica una operación leída del diario"""
+        if operacion == OP_CREAR:
+            (id_envio, tipo, remitente, destinatario, direccion_origen,
+             direccion_destino, peso, descripcion, es_fragil) = argumentos
+            # Reutilizar el mismo ID que se asignó originalmente
+            self._reservar_id(id_envio)
+            envio = self._crear_envio_con_id(id_envio, tipo, remitente, destinatario,
+                                             direccion_origen, direccion_destino, peso,
+                                             descripcion, es_fragil)
+            if envio:
+                envio.fecha_creacion = datetime.fromtimestamp(timestamp)
+                self._registrar_cambio(envio)
+        elif operacion == OP_AVANZAR:
+            self.avanzar_estado_envio(*argumentos)
+        elif operacion == OP_CANCELAR:
+            self.cancelar_envio(*argumentos)
+        elif operacion == OP_MODIFICAR:
+            self.modificar_envio(*argumentos)
+        elif operacion == OP_MODIFICAR_VARIOS:
+            self.modificar_envio_campos(*argumentos)
+        elif operacion == OP_TRANSACCION:
+            self.ejecutar_transaccion(*argumentos)
+        elif operacion == OP_DESHACER:
+            self.deshacer_cambio(*argumentos)
+        elif operacion == OP_REHACER:
+            self.rehacer_cambio(*argumentos)
+        else:
+            raise ValueError(f"Operación desconocida en el diario: {operacion}")
+    
+    @property
+    def contador_envios(self) -> int:
+        """Número que se asignará al próximo envío creado"""
+        return self.asignador_ids.proximo()
+    
+    def _asignar_id(self) -> str:
+        """Reserva de forma atómica el siguiente ID de envío"""
+        return f"ENV-{self.asignador_ids.siguiente():05d}"
+    
+    def _reservar_id(self, id_envio: str):
+        """Evita que el asignador vuelva a entregar un ID ya existente"""
+        numero = int(id_envio.split("-")[1])
+        self.asignador_ids.reservar_hasta(numero + 1)
+    
+    @contextmanager
+    def _bloquear_envio(self, id_envio: str):
+        """
+        Serializa las mutaciones de un envío tomando el lock de su franja
+        Al liberar el último lock del hilo se crea un punto de control si corresponde
+        """
+        franja = self._franjas[hash(id_envio) % len(self._franjas)]
+        self._hilo.profundidad = getattr(self._hilo, 'profundidad', 0) + 1
+        try:
+            with franja:
+                yield
+        finally:
+            self._hilo.profundidad -= 1
+        
+        if self._hilo.profundidad == 0:
+            self._checkpoint_si_corresponde()
+    
+    @contextmanager
+    def _bloquear_envios(self, ids_envio: List[str]):
+        """
+        Toma los locks de las franjas de varios envíos a la vez
+        Se adquieren en orden de franja (el mismo que crear_checkpoint) para evitar interbloqueos
+        """
+        franjas = sorted({hash(id_envio) % len(self._franjas) for id_envio in ids_envio})
+        self._hilo.profundidad = getattr(self._hilo, 'profundidad', 0) + 1
+        try:
+            with ExitStack() as pila:
+                for franja in franjas:
+                    pila.enter_context(self._franjas[franja])
+                yield
+        finally:
+            self._hilo.profundidad -= 1
+        
+        if self._hilo.profundidad == 0:
+            self._checkpoint_si_corresponde()
+    
+    def _registrar_operacion(self, operacion: int, *argumentos):
+        """Anota una operación en el diario"""
+        if not self.diario or self._reproduciendo:
+            return
+        
+        self.diario.registrar(operacion, *argumentos)
+    
+    def _checkpoint_si_corresponde(self):
+        """Crea un punto de control si el diario lo requiere (un solo hilo a la vez)"""
+        if not self.diario or self._reproduciendo or not self.diario.requiere_checkpoint():
+            return
+        
+        if self._lock_checkpoint.acquire(blocking=False):
+            try:
+                if self.diario.requiere_checkpoint():
+                    self.crear_checkpoint()
+            finally:
+                self._lock_checkpoint.release()
+    
+    def crear_checkpoint(self):
+        """
+        Guarda el estado completo en el diario y lo trunca para acotar la recuperación
+        Toma todos los locks de franja para capturar un estado consistente con el diario
+        """
+        if not self.diario:
+            return
+        
+        for franja in self._franjas:
+            franja.acquire()
+        try:
+            originadores = self.registro.originadores()
+            self.diario.checkpoint({
+                'contador_envios': self.contador_envios,
+                'envios': [
+                    (envio_a_fila(envio),
+                     originadores[envio.id_envio].exportar_historial()
+                     if envio.id_envio in originadores else None)
+                    for envio in self.registro
+                ]
+            })
+        finally:
+            for franja in reversed(self._franjas):
+                franja.release()
+    
+    def _registrar_cambio(self, envio):
+        """Actualiza índices, analítica y almacenamiento tras una mutación"""
+        self.registro.reindexar(envio)
+        if self.analitica is not None:
+            self.analitica.actualizar(envio)
+        if self.almacenamiento:
+            self.almacenamiento.guardar(envio, self.registro.obtener_originador(envio.id_envio))
+    
+    def guardar_snapshot(self, ruta: str):
+        """
+        Escribe todos los envíos en un snapshot columnar (ver Persistence.SnapshotColumnar)
+        El historial de cambios no forma parte del snapshot
+        """
+        escribir_snapshot(ruta, [envio_a_fila(envio) for envio in self.registro],
+                          self.contador_envios)
+    
+    def cargar_snapshot(self, ruta: str):
+        """
+        Reemplaza el registro por el contenido de un snapshot columnar
+        El archivo se mapea en memoria y cada envío se materializa al consultarlo
+        por primera vez, por lo que la carga no depende del número de envíos
+        
+        Raises:
+            ValueError: Si el controlador usa diario o almacenamiento (el snapshot
+                        descartaría los cambios recuperados de ellos)
+        """
+        if self.diario or self.almacenamiento:
+            raise ValueError("El snapshot no se puede cargar con diario o almacenamiento: "
+                             "reemplazaría los cambios recuperados de ellos")
+        
+        snapshot = SnapshotColumnar(ruta)
+        self.registro = RegistroEnvios()
+        self.registro.cargar_perezoso(snapshot, self._materializar_desde_snapshot)
+        self.asignador_ids.reservar_hasta(snapshot.contador_envios)
+        if self.analitica is not None:
+            self.analitica.limpiar()
+            self.analitica.cargar_desde_snapshot(snapshot)
+    
+    @staticmethod
+    def _materializar_desde_snapshot(fila: tuple):
+        """Construye el envío y su originador a partir de una fila del snapshot"""
+        envio = envio_desde_fila(fila)
+        originador = OriginadorEnvio(envio, descripcion_inicial="Estado restaurado desde snapshot")
+        return envio, originador
+    
+    @property
+    def envios(self) -> List[Envio]:
+        """Envíos registrados en orden de creación"""
+        return self.registro.envios()
+    
+    @property
+    def originadores(self) -> Dict[str, OriginadorEnvio]:
+        """Diccionario de originadores por ID de envío"""
+        return self.registro.originadores()
     
     def crear_envio(self, tipo: str, remitente: str, destinatario: str,
                    direccion_origen: str, direccion_destino: str, 
@@ -46,103 +366,475 @@ class EnvioController:
         Returns:
             El envío creado o None si falla la validación
         """
-        print(f"\n{'='*80}")
-        print(f"CREANDO NUEVO ENVÍO")
-        print(f"{'='*80}\n")
-        
         # Generar ID único
-        id_envio = f"ENV-{self.contador_envios:05d}"
-        self.contador_envios += 1
+        id_envio = self._asignar_id()
+        return self._crear_envio_con_id(id_envio, tipo, remitente, destinatario,
+                                        direccion_origen, direccion_destino, peso,
+                                        descripcion, es_fragil)
+    
+    def _crear_envio_con_id(self, id_envio: str, tipo: str, remitente: str, destinatario: str,
+                            direccion_origen: str, direccion_destino: str,
+                            peso: float, descripcion: str, es_fragil: bool) -> Optional[Envio]:
+        """Crea, valida y registra un envío con un ID ya reservado"""
+        log.debug("\n%s", SEPARADOR)
+        log.debug("CREANDO NUEVO ENVÍO")
+        log.debug("%s\n", SEPARADOR)
         
-        # Crear el envío según el tipo
-        if tipo == "Express":
-            envio = EnvioExpress(id_envio, remitente, destinatario, 
-                               direccion_origen, direccion_destino, peso, descripcion)
-        elif tipo == "Estándar":
-            envio = EnvioEstandar(id_envio, remitente, destinatario,
-                                direccion_origen, direccion_destino, peso, descripcion)
-        elif tipo == "Económico":
-            envio = EnvioEconomico(id_envio, remitente, destinatario,
-                                 direccion_origen, direccion_destino, peso, descripcion)
-        else:
-            print(f"❌ Error: Tipo de envío '{tipo}' no válido")
+        envio, mensaje = self._construir_envio(id_envio, tipo, remitente, destinatario,
+                                               direccion_origen, direccion_destino, peso,
+                                               descripcion, es_fragil)
+        if not envio:
+            evento(log, logging.WARNING, "creacion_rechazada",
+                   "❌ No se pudo crear el envío: %s", mensaje, id_envio=id_envio, motivo=mensaje)
             return None
         
+        # Agregar al registro indexado
+        with self._bloquear_envio(id_envio):
+            self._agregar_envio_nuevo(envio)
+            self._registrar_operacion(OP_CREAR, id_envio, tipo, remitente, destinatario,
+                                      direccion_origen, direccion_destino, peso, descripcion,
+                                      es_fragil)
+            
+        evento(log, logging.INFO, "envio_creado", "✅ Envío %s creado exitosamente", id_envio,
+               id_envio=id_envio, tipo=tipo, costo=envio.costo)
+        log.info("💰 Costo total: $%.2f", envio.costo)
+            
+        return envio
+    
+    def _construir_envio(self, id_envio: str, tipo: str, remitente: str, destinatario: str,
+                         direccion_origen: str, direccion_destino: str, peso: float,
+                         descripcion: str, es_fragil: bool, cadena=None,
+                         calculador: Optional[CalculadorCosto] = None) -> Tuple[Optional[Envio], str]:
+        """
+        Crea el envío, lo valida, inicializa su estado y calcula su costo
+        
+        Args:
+            cadena: Validador a usar (por defecto el pipeline compartido de CadenaValidacion)
+            calculador: Calculador de costo reutilizable (por defecto se crea uno nuevo)
+            
+        Returns:
+            (envío, mensaje); el envío es None si el tipo no existe o falla la validación
+        """
+        # Crear el envío según el tipo
+        clase = CLASES_POR_TIPO.get(tipo)
+        if clase is None:
+            return None, f"❌ Error: Tipo de envío '{tipo}' no válido"
+        
+        envio = clase(id_envio, remitente, destinatario,
+                      direccion_origen, direccion_destino, peso, descripcion)
         envio.es_fragil = es_fragil
         
         # PATRÓN CHAIN OF RESPONSIBILITY: Validar el envío
-        es_valido, mensaje = CadenaValidacion.validar_envio(envio)
+        if cadena is None:
+            es_valido, mensaje = CadenaValidacion.validar_envio(envio)
+        else:
+            es_valido, mensaje = cadena.validar(envio)
         
         if not es_valido:
-            print(f"❌ No se pudo crear el envío: {mensaje}")
-            return None
+            return None, mensaje
         
         # PATRÓN STATE: Inicializar el estado del envío
         GestorEstadoEnvio.inicializar_envio(envio)
         
         # PATRÓN VISITOR: Calcular costo inicial
-        calculador = CalculadorCosto()
-        envio.accept(calculador)
+        envio.accept(calculador or CalculadorCosto())
         
-        # PATRÓN MEMENTO: Crear originador para historial
+        return envio, mensaje
+    
+    def _agregar_envio_nuevo(self, envio: Envio):
+        """Crea el historial de un envío recién construido y lo agrega al registro"""
+        # PATRÓN MEMENTO: Crear originador para historial (el caretaker se construye al primer uso)
         originador = OriginadorEnvio(envio)
-        self.originadores[id_envio] = originador
         
-        # Agregar a la lista de envíos
-        self.envios.append(envio)
+        self.registro.agregar(envio, originador)
+        if self.analitica is not None:
+            self.analitica.actualizar(envio)
+        if self.almacenamiento:
+            self.almacenamiento.guardar(envio, originador)
+    
+    def crear_envios_lote(self, datos: List[dict]) -> List[Tuple[Optional[Envio], str]]:
+        """
+        Crea muchos envíos en una sola llamada
+        Reutiliza el pipeline de validación compartido y un único calculador de costo, y
+        anota todas las altas en el diario con una sola escritura
+        
+        Args:
+            datos: Lista de diccionarios con las claves de crear_envio()
+                   (tipo, remitente, destinatario, direccion_origen,
+                   direccion_destino, peso y opcionalmente descripcion, es_fragil)
+            
+        Returns:
+            Una tupla (envío, mensaje) por elemento, en el mismo orden; el envío es
+            None y el mensaje explica el error si ese elemento no pudo crearse
+        """
+        inicio = time.perf_counter()
+        cadena = CadenaValidacion.pipeline()
+        calculador = CalculadorCosto()
+        
+        resultados = []
+        validos = []
+        for datos_envio in datos:
+            if not isinstance(datos_envio, dict):
+                resultados.append((None, "❌ Error: Cada envío debe ser un objeto"))
+                continue
+            
+            faltantes = [campo for campo in self.CAMPOS_REQUERIDOS if campo not in datos_envio]
+            if faltantes:
+                resultados.append((None, f"❌ Error: Campos requeridos faltantes: {', '.join(faltantes)}"))
+                continue
+            
+            no_texto = [campo for campo in self.CAMPOS_TEXTO
+                        if not isinstance(datos_envio.get(campo, ''), str)]
+            if no_texto:
+                resultados.append((None, f"❌ Error: Campos que deben ser texto: {', '.join(no_texto)}"))
+                continue
+            
+            try:
+                peso = float(datos_envio['peso'])
+            except (TypeError, ValueError):
+                resultados.append((None, f"❌ Error: Peso inválido: {datos_envio['peso']!r}"))
+                continue
+            
+            try:
+                es_fragil = a_booleano(datos_envio.get('es_fragil', False))
+            except ValueError:
+                resultados.append((None, f"❌ Error: Valor inválido para 'es_fragil': {datos_envio['es_fragil']!r}"))
+                continue
+            
+            argumentos = (self._asignar_id(), datos_envio['tipo'], datos_envio['remitente'],
+                          datos_envio['destinatario'], datos_envio['direccion_origen'],
+                          datos_envio['direccion_destino'], peso,
+                          datos_envio.get('descripcion', ''), es_fragil)
+            envio, mensaje = self._construir_envio(*argumentos, cadena=cadena, calculador=calculador)
+            resultados.append((envio, mensaje))
+            if envio:
+                validos.append(argumentos)
         
-        print(f"✅ Envío {id_envio} creado exitosamente")
-        print(f"💰 Costo total: ${envio.costo:.2f}")
+        # Alta en el diario (una sola escritura) y en el registro bajo los mismos locks,
+        # de modo que ningún punto de control ni operación posterior quede entre ambas
+        with self._bloquear_envios([argumentos[0] for argumentos in validos]):
+            if validos and self.diario and not self._reproduciendo:
+                self.diario.registrar_lote(OP_CREAR, validos)
+            
+            for envio, _ in resultados:
+                if envio:
+                    self._agregar_envio_nuevo(envio)
         
-        return envio
+        creados = len(validos)
+        duracion = time.perf_counter() - inicio
+        evento(log, logging.INFO, "lote_creado",
+               "✅ Lote procesado: %d envíos creados, %d con errores (%.0f envíos/s)",
+               creados, len(resultados) - creados, creados / duracion if duracion else 0,
+               creados=creados, errores=len(resultados) - creados)
+        
+        return resultados
+    
+    def validar_envios_lote(self, datos: List[dict]) -> List[Tuple[Optional[Envio], List[str]]]:
+        """
+        Valida muchos envíos sin crearlos, reportando todos los errores de cada uno
+        A diferencia de crear_envio(), no se detiene en la primera regla que falla:
+        aplica todas las reglas a todas las filas en una sola pasada. No reserva IDs
+        ni toca el registro, el diario ni el almacenamiento
+        
+        Args:
+            datos: Lista de diccionarios con las claves de crear_envio()
+            
+        Returns:
+            Una tupla (envío, errores) por elemento, en el mismo orden. El envío es
+            transitorio (con la distancia y el requisito de seguro calculados) o None
+            si la fila no tiene la forma esperada; errores está vacía si la fila es válida
+        """
+        resultados: List[Tuple[Optional[Envio], List[str]]] = []
+        candidatos = []
+        for datos_envio in datos:
+            if not isinstance(datos_envio, dict):
+                resultados.append((None, ["❌ Error: Cada envío debe ser un objeto"]))
+                continue
+            
+            errores = []
+            faltantes = [campo for campo in self.CAMPOS_REQUERIDOS if campo not in datos_envio]
+            if faltantes:
+                errores.append(f"❌ Error: Campos requeridos faltantes: {', '.join(faltantes)}")
+            
+            if 'peso' in datos_envio:
+                try:
+                    float(datos_envio['peso'])
+                except (TypeError, ValueError):
+                    errores.append(f"❌ Error: Peso inválido: {datos_envio['peso']!r}")
+            
+            try:
+                es_fragil = a_booleano(datos_envio.get('es_fragil', False))
+            except ValueError:
+                errores.append(f"❌ Error: Valor inválido para 'es_fragil': {datos_envio['es_fragil']!r}")
+            
+            if errores:
+                resultados.append((None, errores))
+                continue
+            
+            # Envío genérico: un tipo desconocido lo reporta ValidadorTipoEnvio junto con el resto
+            envio = Envio(ID_VALIDACION, datos_envio['remitente'], datos_envio['destinatario'],
+                          datos_envio['direccion_origen'], datos_envio['direccion_destino'],
+                          float(datos_envio['peso']), datos_envio['tipo'],
+                          datos_envio.get('descripcion', ''))
+            envio.es_fragil = es_fragil
+            resultados.append((envio, []))
+            candidatos.append(len(resultados) - 1)
+        
+        errores_por_fila = CadenaValidacion.pipeline().validar_lote(
+            [resultados[indice][0] for indice in candidatos])
+        for indice, errores in zip(candidatos, errores_por_fila):
+            resultados[indice] = (resultados[indice][0], errores)
+        
+        invalidos = sum(1 for _, errores in resultados if errores)
+        log.info("🔎 Lote validado: %d envíos válidos, %d con errores",
+                 len(resultados) - invalidos, invalidos)
+        return resultados
+    
+    @staticmethod
+    def _entradas_costo(envio: Envio) -> tuple:
+        """Datos del envío de los que depende su costo"""
+        return (envio.tipo_envio, envio.peso, envio.distancia, envio.es_fragil, envio.requiere_seguro)
+    
+    def recalcular_costos(self) -> int:
+        """
+        Recalcula el costo de todos los envíos (ej. tras un cambio de tarifas)
+        Usa el calculador vectorizado si NumPy está disponible. Los costos se calculan
+        sin locks y cada uno se asigna con el lock de su envío; si el envío cambió
+        mientras tanto, su costo se vuelve a calcular con el lock tomado
+        
+        Returns:
+            Cantidad de envíos cuyo costo cambió
+        """
+        envios = self.registro.envios()
+        entradas = [self._entradas_costo(envio) for envio in envios]
+        
+        calculador = CalculadorCosto()
+        try:
+            from Patterns.VisitorLote import CalculadorCostoLote
+        except ImportError:
+            # El visitor asigna el costo: se calcula sobre copias
+            costos = [copy.copy(envio).accept(calculador) for envio in envios]
+        else:
+            costos = CalculadorCostoLote().calcular_envios(envios).tolist()
+        
+        cambiados = 0
+        for envio, entrada, costo in zip(envios, entradas, costos):
+            if costo == envio.costo:
+                continue
+            with self._bloquear_envio(envio.id_envio):
+                anterior = envio.costo
+                if self._entradas_costo(envio) == entrada:
+                    envio.costo = costo
+                else:
+                    envio.accept(calculador)
+                if envio.costo != anterior:
+                    self._registrar_cambio(envio)
+                    cambiados += 1
+        
+        log.info("💰 Costos recalculados: %d de %d envíos cambiaron", cambiados, len(envios))
+        return cambiados
+    
+    def cotizar(self, tipo: str, direccion_origen: str, direccion_destino: str, peso: float,
+                es_fragil: bool = False, remitente: str = "", destinatario: str = "",
+                descripcion: str = "") -> Tuple[Optional[dict], str]:
+        """
+        Cotiza un envío sin crearlo: valida y calcula costo, tiempo de entrega y
+        descuentos sobre un envío transitorio. No reserva ID, no crea historial y
+        no toca el registro, el diario ni el almacenamiento
+        
+        Args:
+            es_fragil: True/False o "true"/"false" (ver a_booleano)
+            remitente, destinatario: Opcionales (no influyen en el precio)
+            
+        Returns:
+            (cotización, mensaje); la cotización es None si el envío no es válido
+            
+        Raises:
+            ValueError: Si es_fragil no es un valor booleano válido
+        """
+        envio, mensaje = self._construir_envio(ID_COTIZACION, tipo, remitente or ID_COTIZACION,
+                                               destinatario or ID_COTIZACION, direccion_origen,
+                                               direccion_destino, peso, descripcion, a_booleano(es_fragil))
+        if not envio:
+            return None, mensaje
+        
+        descuento = envio.accept(CalculadorDescuento())
+        return {
+            'tipo': envio.tipo_envio,
+            'costo': envio.costo,
+            'descuento': descuento,
+            'costo_final': envio.costo - descuento,
+            'dias_estimados': envio.accept(CalculadorTiempoEntrega()),
+            'distancia': envio.distancia,
+            'requiere_seguro': envio.requiere_seguro
+        }, mensaje
     
     def obtener_envio(self, id_envio: str) -> Optional[Envio]:
         """Busca y retorna un envío por su ID"""
-        for envio in self.envios:
-            if envio.id_envio == id_envio:
-                return envio
-        return None
+        return self.registro.obtener(id_envio)
+    
+    def obtener_envio_en(self, id_envio: str, momento: datetime) -> Optional[MementoEnvio]:
+        """
+        Reconstruye un envío tal como estaba en un momento dado a partir de su historial
+        No modifica el envío ni la posición de deshacer/rehacer
+        
+        Returns:
+            El memento vigente en ese momento, o None si el envío no existe o el
+            momento es anterior a su historial
+        """
+        with self._bloquear_envio(id_envio):
+            originador = self.registro.obtener_originador(id_envio)
+            if not originador:
+                return None
+            return originador.estado_en(momento.timestamp())
+    
+    def filtrar_envios(self, estado: Optional[str] = None, tipo: Optional[str] = None,
+                       remitente: Optional[str] = None,
+                       destinatario: Optional[str] = None) -> List[Envio]:
+        """
+        Filtra los envíos usando los índices secundarios del registro
+        
+        Args:
+            estado: Nombre de la clase de estado (ej. "EstadoEnTransito")
+            tipo: "Express", "Estándar" o "Económico"
+            remitente: Nombre exacto del remitente
+            destinatario: Nombre exacto del destinatario
+        """
+        return self.registro.filtrar(estado=estado, tipo_envio=tipo,
+                                     remitente=remitente, destinatario=destinatario)
     
     def avanzar_estado_envio(self, id_envio: str) -> bool:
         """Avanza el envío al siguiente estado"""
-        envio = self.obtener_envio(id_envio)
-        if not envio:
-            print(f"❌ Envío {id_envio} no encontrado")
-            return False
+        with self._bloquear_envio(id_envio):
+            envio = self.obtener_envio(id_envio)
+            if not envio:
+                log.warning("❌ Envío %s no encontrado", id_envio)
+                return False
+            
+            mensaje = GestorEstadoEnvio.avanzar_estado(envio)
+            evento(log, logging.DEBUG, "estado_avanzado", "%s", mensaje, id_envio=id_envio,
+                   estado=envio.estado.__class__.__name__)
+            
+            # Guardar cambio en el historial (Memento)
+            originador = self.registro.obtener_originador(id_envio)
+            if originador:
+                estado_actual = envio.estado.get_descripcion()
+                originador.crear_snapshot(f"Estado cambiado a: {estado_actual}")
+            
+            self._registrar_cambio(envio)
+            self._registrar_operacion(OP_AVANZAR, id_envio)
+            
+            return True
+    
+    def transicionar_envios(self, accion: str, ids: Optional[List[str]] = None,
+                            estado: Optional[str] = None, tipo: Optional[str] = None,
+                            desde: Optional[datetime] = None,
+                            hasta: Optional[datetime] = None) -> List[Tuple[str, bool, str]]:
+        """
+        Avanza o cancela en una sola operación todos los envíos que cumplen un filtro
         
-        mensaje = GestorEstadoEnvio.avanzar_estado(envio)
+        Args:
+            accion: "siguiente" (avanzar) o "cancelar"
+            ids: Lista de IDs de envío
+            estado: Nombre de la clase de estado (ej. "EstadoEnProceso")
+            tipo: "Express", "Estándar" o "Económico"
+            desde, hasta: Rango de fecha de creación (inclusivo)
+            
+        Returns:
+            Una tupla (ID, cambió de estado, mensaje) por envío seleccionado
+        """
+        if accion not in ACCIONES_LOTE:
+            raise ValueError(f"Acción '{accion}' no válida. Acciones válidas: {', '.join(ACCIONES_LOTE)}")
+        if ids is None and estado is None and tipo is None and desde is None and hasta is None:
+            raise ValueError("Se requiere al menos un filtro (ids, estado, tipo, desde o hasta)")
         
-        # Guardar cambio en el historial (Memento)
-        if id_envio in self.originadores:
-            estado_actual = envio.estado.get_descripcion()
-            self.originadores[id_envio].crear_snapshot(f"Estado cambiado a: {estado_actual}")
+        resultados = []
+        if ids is not None:
+            # Un ID repetido se transiciona una sola vez
+            ids = list(dict.fromkeys(ids))
+            candidatos = []
+            for id_envio in ids:
+                envio = self.obtener_envio(id_envio)
+                if envio:
+                    candidatos.append(envio)
+                else:
+                    resultados.append((id_envio, False, f"Envío {id_envio} no encontrado"))
+        else:
+            candidatos = self.filtrar_envios(estado=estado, tipo=tipo)
+        
+        def cumple(envio) -> bool:
+            if estado is not None and (envio.estado.__class__.__name__ if envio.estado else None) != estado:
+                return False
+            if tipo is not None and envio.tipo_envio != tipo:
+                return False
+            if desde is not None and envio.fecha_creacion < desde:
+                return False
+            if hasta is not None and envio.fecha_creacion > hasta:
+                return False
+            return True
         
-        return True
+        with self._bloquear_envios([envio.id_envio for envio in candidatos]):
+            # El filtro se reevalúa bajo los locks: otro hilo pudo cambiar el estado
+            seleccionados = [envio for envio in candidatos if cumple(envio)]
+            transiciones = GestorEstadoEnvio.transicionar_lote(seleccionados, accion)
+            
+            cambiados = []
+            for envio, cambio, mensaje in transiciones:
+                resultados.append((envio.id_envio, cambio, mensaje))
+                if not cambio:
+                    continue
+                
+                # Guardar cambio en el historial (Memento)
+                originador = self.registro.obtener_originador(envio.id_envio)
+                if originador:
+                    if accion == "siguiente":
+                        originador.crear_snapshot(f"Estado cambiado a: {envio.estado.get_descripcion()}")
+                    else:
+                        originador.crear_snapshot("Envío cancelado")
+                
+                self._registrar_cambio(envio)
+                cambiados.append((envio.id_envio,))
+            
+            # Una sola escritura en el diario para todo el lote
+            if cambiados and self.diario and not self._reproduciendo:
+                operacion = OP_AVANZAR if accion == "siguiente" else OP_CANCELAR
+                self.diario.registrar_lote(operacion, cambiados)
+        
+        evento(log, logging.INFO, "transicion_lote",
+               "✅ Transición en lote (%s): %d envíos seleccionados, %d cambiaron de estado",
+               accion, len(resultados), len(cambiados),
+               accion=accion, seleccionados=len(resultados), cambiados=len(cambiados))
+        return resultados
     
     def consultar_estado_envio(self, id_envio: str) -> Optional[str]:
         """Consulta el estado actual de un envío"""
         envio = self.obtener_envio(id_envio)
         if not envio:
-            print(f"❌ Envío {id_envio} no encontrado")
+            log.warning("❌ Envío %s no encontrado", id_envio)
             return None
         
         return GestorEstadoEnvio.mostrar_estado_actual(envio)
     
     def cancelar_envio(self, id_envio: str) -> bool:
         """Cancela un envío"""
-        envio = self.obtener_envio(id_envio)
-        if not envio:
-            print(f"❌ Envío {id_envio} no encontrado")
-            return False
-        
-        mensaje = GestorEstadoEnvio.cancelar_envio(envio)
-        print(mensaje)
-        
-        # Guardar cambio en el historial (Memento)
-        if id_envio in self.originadores:
-            self.originadores[id_envio].crear_snapshot("Envío cancelado")
-        
-        return True
+        with self._bloquear_envio(id_envio):
+            envio = self.obtener_envio(id_envio)
+            if not envio:
+                log.warning("❌ Envío %s no encontrado", id_envio)
+                return False
+            
+            mensaje = GestorEstadoEnvio.cancelar_envio(envio)
+            evento(log, logging.INFO, "envio_cancelado", "%s", mensaje, id_envio=id_envio)
+            
+            # Guardar cambio en el historial (Memento)
+            originador = self.registro.obtener_originador(id_envio)
+            if originador:
+                originador.crear_snapshot("Envío cancelado")
+            
+            self._registrar_cambio(envio)
+            self._registrar_operacion(OP_CANCELAR, id_envio)
+            
+            return True
     
     def modificar_envio(self, id_envio: str, campo: str, nuevo_valor) -> bool:
         """
@@ -153,90 +845,317 @@ class EnvioController:
             campo: Campo a modificar ("remitente", "destinatario", "peso", etc.)
             nuevo_valor: Nuevo valor para el campo
         """
-        if id_envio not in self.originadores:
-            print(f"❌ Envío {id_envio} no encontrado")
-            return False
-        
-        originador = self.originadores[id_envio]
-        
-        if campo == "remitente":
-            originador.modificar_remitente(nuevo_valor)
-        elif campo == "destinatario":
-            originador.modificar_destinatario(nuevo_valor)
-        elif campo == "peso":
-            originador.modificar_peso(nuevo_valor)
-        elif campo == "direccion_destino":
-            originador.modificar_direccion_destino(nuevo_valor)
-        elif campo == "fragil":
-            originador.marcar_como_fragil(nuevo_valor)
-        else:
-            print(f"❌ Campo '{campo}' no reconocido")
-            return False
-        
-        # Recalcular costo después de modificación
-        envio = originador.envio
-        calculador = CalculadorCosto()
-        envio.accept(calculador)
+        with self._bloquear_envio(id_envio):
+            originador = self.registro.obtener_originador(id_envio)
+            if not originador:
+                log.warning("❌ Envío %s no encontrado", id_envio)
+                return False
+            
+            if campo == "remitente":
+                originador.modificar_remitente(nuevo_valor)
+            elif campo == "destinatario":
+                originador.modificar_destinatario(nuevo_valor)
+            elif campo == "peso":
+                originador.modificar_peso(nuevo_valor)
+            elif campo == "direccion_destino":
+                originador.modificar_direccion_destino(nuevo_valor)
+            elif campo == "fragil":
+                originador.marcar_como_fragil(nuevo_valor)
+            else:
+                log.warning("❌ Campo '%s' no reconocido", campo)
+                return False
+            
+            # Recalcular costo después de modificación
+            envio = originador.envio
+            calculador = CalculadorCosto()
+            envio.accept(calculador)
+            self._registrar_cambio(envio)
+            self._registrar_operacion(OP_MODIFICAR, id_envio, campo, nuevo_valor)
+            
+            evento(log, logging.INFO, "envio_modificado", "✅ Envío %s modificado exitosamente",
+                   id_envio, id_envio=id_envio, campo=campo)
+            return True
+    
+    def _convertir_cambios(self, cambios: Dict[str, object]) -> Tuple[Optional[Dict[str, object]], str]:
+        """
+        Convierte los cambios pedidos en valores de atributos del envío (ver CAMPOS_MODIFICABLES)
+        Returns: (atributo -> valor, mensaje); los valores son None si algún cambio no es válido
+        """
+        if not cambios or not isinstance(cambios, dict):
+            return None, "❌ Error: No se indicaron cambios"
         
-        print(f"✅ Envío {id_envio} modificado exitosamente")
-        return True
+        valores = {}
+        for campo, valor in cambios.items():
+            if campo not in self.CAMPOS_MODIFICABLES:
+                return None, f"❌ Error: Campo '{campo}' no modificable"
+            atributo, conversion = self.CAMPOS_MODIFICABLES[campo]
+            try:
+                valores[atributo] = conversion(valor)
+            except (TypeError, ValueError):
+                return None, f"❌ Error: Valor inválido para '{campo}': {valor!r}"
+        return valores, ""
     
-    def deshacer_cambio(self, id_envio: str) -> bool:
-        """Deshace el último cambio realizado en un envío"""
-        if id_envio not in self.originadores:
-            print(f"❌ Envío {id_envio} no encontrado")
-            return False
+    @staticmethod
+    def _preparar_cambios(envio: Envio, valores: Dict[str, object]) -> Tuple[Optional[Envio], str]:
+        """
+        Asigna los valores a una copia del envío y la valida (sin recalcular el costo)
+        El envío original no se toca, de modo que las lecturas sin lock nunca ven
+        valores que no pasaron la validación
         
-        resultado = self.originadores[id_envio].deshacer()
+        Returns:
+            (copia validada, mensaje); la copia es None si la validación falla
+        """
+        copia = copy.copy(envio)
+        for atributo, valor in valores.items():
+            setattr(copia, atributo, valor)
+        es_valido, mensaje = CadenaValidacion.validar_envio(copia)
+        return (copia if es_valido else None), mensaje
+    
+    @staticmethod
+    def _publicar(envio: Envio, copia: Envio):
+        """Copia al envío los datos y el estado de una copia ya validada (con su lock tomado)"""
+        # PATRÓN MEMENTO: el memento de la copia trae todos los datos de una vez
+        MementoEnvio(copia).restaurar_en(envio)
+        envio.estado = copia.estado
+    
+    def modificar_envio_campos(self, id_envio: str, cambios: Dict[str, object]) -> Tuple[bool, str]:
+        """
+        Modifica varios campos del envío de forma atómica
+        Aplica todos los cambios sobre una copia, la valida y recalcula su costo una
+        sola vez, y solo entonces los publica en el envío guardando un único snapshot
+        en el historial. Si algún campo no es válido o la validación falla, el envío
+        no llega a modificarse
         
-        if resultado:
-            # Recalcular costo después de deshacer
-            envio = self.originadores[id_envio].envio
-            calculador = CalculadorCosto()
-            envio.accept(calculador)
+        Args:
+            id_envio: ID del envío
+            cambios: Campo -> nuevo valor (ver CAMPOS_MODIFICABLES)
+            
+        Returns:
+            (éxito, mensaje)
+        """
+        # Convertir todos los valores antes de tocar el envío
+        valores, mensaje = self._convertir_cambios(cambios)
+        if valores is None:
+            return False, mensaje
         
-        return resultado
+        with self._bloquear_envio(id_envio):
+            originador = self.registro.obtener_originador(id_envio)
+            if not originador:
+                log.warning("❌ Envío %s no encontrado", id_envio)
+                return False, f"❌ Error: Envío {id_envio} no encontrado"
+            
+            envio = originador.envio
+            copia, mensaje = self._preparar_cambios(envio, valores)
+            if copia is None:
+                log.warning("❌ Modificación de %s rechazada: %s", id_envio, mensaje)
+                return False, mensaje
+            
+            copia.accept(CalculadorCosto())
+            self._publicar(envio, copia)
+            originador.crear_snapshot(f"Modificación: {', '.join(cambios)}")
+            self._registrar_cambio(envio)
+            self._registrar_operacion(OP_MODIFICAR_VARIOS, id_envio, dict(cambios))
+            
+            evento(log, logging.INFO, "envio_modificado", "✅ Envío %s modificado exitosamente",
+                   id_envio, id_envio=id_envio, campos=list(cambios))
+            return True, "✅ Envío modificado exitosamente"
     
-    def rehacer_cambio(self, id_envio: str) -> bool:
-        """Rehace el último cambio deshecho en un envío"""
-        if id_envio not in self.originadores:
-            print(f"❌ Envío {id_envio} no encontrado")
-            return False
+    def transaccion(self) -> 'TransaccionEnvios':
+        """
+        Inicia una transacción sobre varios envíos (ver TransaccionEnvios)
+        Las operaciones se acumulan sin tomar locks y se aplican todas juntas al confirmar
+        """
+        return TransaccionEnvios(self)
+    
+    def ejecutar_transaccion(self, operaciones: List[Tuple[str, str, Optional[dict]]]) -> Tuple[bool, str]:
+        """
+        Aplica un grupo de operaciones sobre varios envíos de forma atómica
+        Toma los locks de todos los envíos involucrados (en orden de franja) solo
+        mientras aplica las operaciones. Las operaciones se aplican sobre copias de
+        los envíos; solo si todas son válidas se publican las copias en los envíos
+        reales (a través de un memento de cada copia). Si alguna falla, las copias se
+        descartan: ningún envío llega a modificarse y no se registra nada en el
+        historial, el diario ni el almacenamiento
+        
+        Args:
+            operaciones: Tuplas (acción, ID de envío, cambios) con acción "modificar"
+                         (cambios: campo -> valor, ver CAMPOS_MODIFICABLES), "avanzar"
+                         o "cancelar" (cambios: None), aplicadas en orden
+            
+        Returns:
+            (éxito, mensaje)
+        """
+        if not operaciones:
+            return False, "❌ Error: La transacción no tiene operaciones"
         
-        resultado = self.originadores[id_envio].rehacer()
+        # Validar la forma de las operaciones y convertir los cambios antes de tomar locks
+        preparadas = []
+        for accion, id_envio, cambios in operaciones:
+            if accion not in ACCIONES_TRANSACCION:
+                return False, (f"❌ Error: Acción '{accion}' no válida. "
+                               f"Acciones válidas: {', '.join(ACCIONES_TRANSACCION)}")
+            valores = None
+            if accion == "modificar":
+                valores, mensaje = self._convertir_cambios(cambios)
+                if valores is None:
+                    return False, f"{id_envio}: {mensaje}"
+            preparadas.append((accion, id_envio, valores))
         
-        if resultado:
-            # Recalcular costo después de rehacer
-            envio = self.originadores[id_envio].envio
+        ids = list(dict.fromkeys(id_envio for _, id_envio, _ in preparadas))
+        with self._bloquear_envios(ids):
+            envios = {}
+            for id_envio in ids:
+                envio = self.obtener_envio(id_envio)
+                if not envio:
+                    return False, f"❌ Error: Envío {id_envio} no encontrado"
+                envios[id_envio] = envio
+            
+            # Las operaciones se aplican sobre copias: los lectores sin lock no ven cambios a medias
+            copias = {id_envio: copy.copy(envio) for id_envio, envio in envios.items()}
+            acciones: Dict[str, List[str]] = {id_envio: [] for id_envio in ids}
+            
+            for accion, id_envio, valores in preparadas:
+                copia = copias[id_envio]
+                if accion == "modificar":
+                    copia, mensaje = self._preparar_cambios(copia, valores)
+                    aplicada = copia is not None
+                else:
+                    estado = copia.estado
+                    if estado is None:
+                        aplicada, mensaje = False, "El envío no tiene estado"
+                    else:
+                        mensaje = estado.siguiente(copia) if accion == "avanzar" else estado.cancelar(copia)
+                        aplicada = copia.estado is not estado
+                
+                if not aplicada:
+                    evento(log, logging.WARNING, "transaccion_revertida",
+                           "❌ Transacción revertida (%s %s): %s", accion, id_envio, mensaje,
+                           envios=len(envios), accion=accion, id_envio=id_envio)
+                    return False, f"{id_envio} ({accion}): {mensaje}"
+                copias[id_envio] = copia
+                acciones[id_envio].append(accion)
+            
+            # Confirmar: recalcular costos y publicar todas las copias antes de registrar nada
             calculador = CalculadorCosto()
-            envio.accept(calculador)
+            for id_envio, envio in envios.items():
+                if "modificar" in acciones[id_envio]:
+                    copias[id_envio].accept(calculador)
+                self._publicar(envio, copias[id_envio])
+            
+            # Un snapshot por envío y una sola anotación en el diario
+            for id_envio, envio in envios.items():
+                originador = self.registro.obtener_originador(id_envio)
+                if originador:
+                    originador.crear_snapshot(f"Transacción: {', '.join(acciones[id_envio])}")
+                self._registrar_cambio(envio)
+            self._registrar_operacion(OP_TRANSACCION, [[accion, id_envio, cambios]
+                                                       for accion, id_envio, cambios in operaciones])
         
-        return resultado
+        evento(log, logging.INFO, "transaccion_confirmada",
+               "✅ Transacción confirmada: %d operaciones sobre %d envíos", len(operaciones), len(envios),
+               operaciones=len(operaciones), envios=len(envios))
+        return True, f"✅ Transacción confirmada: {len(operaciones)} operaciones sobre {len(envios)} envíos"
+    
+    def deshacer_cambio(self, id_envio: str) -> bool:
+        """Deshace el último cambio realizado en un envío"""
+        with self._bloquear_envio(id_envio):
+            originador = self.registro.obtener_originador(id_envio)
+            if not originador:
+                log.warning("❌ Envío %s no encontrado", id_envio)
+                return False
+            
+            resultado = originador.deshacer()
+            
+            if resultado:
+                # Recalcular costo después de deshacer
+                envio = originador.envio
+                calculador = CalculadorCosto()
+                envio.accept(calculador)
+                self._registrar_cambio(envio)
+                self._registrar_operacion(OP_DESHACER, id_envio)
+            
+            return resultado
+    
+    def rehacer_cambio(self, id_envio: str) -> bool:
+        """Rehace el último cambio deshecho en un envío"""
+        with self._bloquear_envio(id_envio):
+            originador = self.registro.obtener_originador(id_envio)
+            if not originador:
+                log.warning("❌ Envío %s no encontrado", id_envio)
+                return False
+            
+            resultado = originador.rehacer()
+            
+            if resultado:
+                # Recalcular costo después de rehacer
+                envio = originador.envio
+                calculador = CalculadorCosto()
+                envio.accept(calculador)
+                self._registrar_cambio(envio)
+                self._registrar_operacion(OP_REHACER, id_envio)
+            
+            return resultado
     
     def mostrar_historial_envio(self, id_envio: str):
         """Muestra el historial de cambios de un envío"""
-        if id_envio not in self.originadores:
-            print(f"❌ Envío {id_envio} no encontrado")
+        originador = self.registro.obtener_originador(id_envio)
+        if not originador:
+            log.warning("❌ Envío %s no encontrado", id_envio)
             return
         
-        self.originadores[id_envio].mostrar_historial()
+        originador.mostrar_historial()
     
     def calcular_tiempo_entrega(self, id_envio: str) -> Optional[int]:
         """Calcula el tiempo estimado de entrega de un envío"""
         envio = self.obtener_envio(id_envio)
         if not envio:
-            print(f"❌ Envío {id_envio} no encontrado")
+            log.warning("❌ Envío %s no encontrado", id_envio)
             return None
         
         calculador = CalculadorTiempoEntrega()
         dias = envio.accept(calculador)
         return dias
     
+    def calcular_tiempos_entrega(self, ids: Optional[List[str]] = None,
+                                 estado: Optional[str] = None,
+                                 tipo: Optional[str] = None) -> List[Tuple[str, int]]:
+        """
+        Calcula el tiempo estimado de entrega de muchos envíos en una sola llamada
+        Usa el calculador vectorizado si NumPy está disponible
+        
+        Args:
+            ids: IDs de envío (los inexistentes se omiten)
+            estado, tipo: Filtros sobre los índices del registro
+            Sin ningún filtro se calculan todos los envíos abiertos
+            (ni entregados ni cancelados)
+            
+        Returns:
+            Lista de (ID, días estimados)
+        """
+        if ids is not None:
+            envios = [envio for envio in map(self.obtener_envio, ids) if envio]
+        elif estado is not None or tipo is not None:
+            envios = self.filtrar_envios(estado=estado, tipo=tipo)
+        else:
+            cerrados = ("EstadoEntregado", "EstadoCancelado")
+            envios = [envio for envio in self.registro
+                      if not envio.estado or envio.estado.__class__.__name__ not in cerrados]
+        
+        try:
+            from Patterns.VisitorLote import CalculadorTiempoEntregaLote
+        except ImportError:
+            calculador = CalculadorTiempoEntrega()
+            dias = [envio.accept(calculador) for envio in envios]
+        else:
+            dias = CalculadorTiempoEntregaLote().calcular_envios(envios).tolist()
+        
+        return [(envio.id_envio, dias_envio) for envio, dias_envio in zip(envios, dias)]
+    
     def generar_reporte_envio(self, id_envio: str) -> Optional[str]:
         """Genera un reporte detallado de un envío"""
         envio = self.obtener_envio(id_envio)
         if not envio:
-            print(f"❌ Envío {id_envio} no encontrado")
+            log.warning("❌ Envío %s no encontrado", id_envio)
             return None
         
         generador = GeneradorReporte()
@@ -247,7 +1166,7 @@ class EnvioController:
         """Calcula los descuentos aplicables a un envío"""
         envio = self.obtener_envio(id_envio)
         if not envio:
-            print(f"❌ Envío {id_envio} no encontrado")
+            log.warning("❌ Envío %s no encontrado", id_envio)
             return None
         
         calculador = CalculadorDescuento()
@@ -256,21 +1175,21 @@ class EnvioController:
     
     def listar_envios(self):
         """Lista todos los envíos registrados"""
-        print(f"\n{'='*80}")
-        print(f"LISTA DE ENVÍOS REGISTRADOS ({len(self.envios)} total)")
-        print(f"{'='*80}\n")
+        log.info("\n%s", SEPARADOR)
+        log.info("LISTA DE ENVÍOS REGISTRADOS (%s total)", len(self.registro))
+        log.info("%s\n", SEPARADOR)
         
-        if not self.envios:
-            print("No hay envíos registrados")
+        if not len(self.registro):
+            log.info("No hay envíos registrados")
         else:
-            for i, envio in enumerate(self.envios, 1):
+            for i, envio in enumerate(self.registro, 1):
                 estado = envio.estado.get_descripcion() if envio.estado else "Sin estado"
-                print(f"{i}. {envio.id_envio} | {envio.remitente} → {envio.destinatario}")
-                print(f"   Tipo: {envio.tipo_envio} | Estado: {estado} | Costo: ${envio.costo:.2f}")
-                print()
+                log.info("%s. %s | %s → %s", i, envio.id_envio, envio.remitente, envio.destinatario)
+                log.info("   Tipo: %s | Estado: %s | Costo: $%.2f", envio.tipo_envio, estado, envio.costo)
+                log.info("")
         
-        print(f"{'='*80}\n")
+        log.info("%s\n", SEPARADOR)
     
     def get_total_envios(self) -> int:
         """Retorna el total de envíos registrados"""
-        return len(self.envios)
+        return len(self.registro)
@@ -0,0 +1,74 @@
+# Controllers/TransaccionEnvios.py
+"""
+Transacciones sobre varios envíos
+Acumula modificaciones y transiciones de estado de distintos envíos y las aplica
+todas juntas con EnvioController.ejecutar_transaccion(): se aplican sobre copias
+de los envíos y se publican solo si todas son válidas, de modo que o se confirman
+todas o ningún envío queda modificado
+"""
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from Controllers.EnvioController import EnvioController
+
+# Acciones que puede contener una transacción
+ACCIONES_TRANSACCION = ("modificar", "avanzar", "cancelar")
+
+
+class TransaccionEnvios:
+    """
+    Grupo de operaciones pendientes sobre uno o más envíos
+    Mientras se arma no toma locks ni modifica envíos; puede usarse como contexto,
+    en cuyo caso se confirma al salir del bloque si no hubo excepciones:
+
+        with controller.transaccion() as transaccion:
+            transaccion.modificar("ENV-00001", {'peso': 3.5})
+            transaccion.avanzar("ENV-00002")
+        exito, mensaje = transaccion.resultado
+    """
+
+    def __init__(self, controller: 'EnvioController'):
+        self.controller = controller
+        self.operaciones: List[Tuple[str, str, Optional[dict]]] = []
+        self.resultado: Optional[Tuple[bool, str]] = None
+
+    def __len__(self) -> int:
+        return len(self.operaciones)
+
+    def _agregar(self, accion: str, id_envio: str, cambios: Optional[dict] = None) -> 'TransaccionEnvios':
+        if self.resultado is not None:
+            raise RuntimeError("La transacción ya fue confirmada")
+        self.operaciones.append((accion, id_envio, cambios))
+        return self
+
+    def modificar(self, id_envio: str, cambios: Dict[str, object]) -> 'TransaccionEnvios':
+        """Modifica campos del envío (ver EnvioController.CAMPOS_MODIFICABLES)"""
+        return self._agregar("modificar", id_envio, dict(cambios))
+
+    def avanzar(self, id_envio: str) -> 'TransaccionEnvios':
+        """Avanza el envío a su siguiente estado"""
+        return self._agregar("avanzar", id_envio)
+
+    def cancelar(self, id_envio: str) -> 'TransaccionEnvios':
+        """Cancela el envío"""
+        return self._agregar("cancelar", id_envio)
+
+    def confirmar(self) -> Tuple[bool, str]:
+        """
+        Aplica todas las operaciones de forma atómica
+
+        Returns:
+            (éxito, mensaje)
+        """
+        if self.resultado is not None:
+            raise RuntimeError("La transacción ya fue confirmada")
+        self.resultado = self.controller.ejecutar_transaccion(self.operaciones)
+        return self.resultado
+
+    def __enter__(self) -> 'TransaccionEnvios':
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.confirmar()
+        return False
@@ -3,5 +3,6 @@
 Paquete de controladores de la aplicación
 """
 from .EnvioController import EnvioController
+from .TransaccionEnvios import TransaccionEnvios
 
-__all__ = ['EnvioController']
+__all__ = ['EnvioController', 'TransaccionEnvios']
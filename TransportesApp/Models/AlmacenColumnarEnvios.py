@@ -0,0 +1,207 @@
+# Models/AlmacenColumnarEnvios.py
+"""
+Almacén columnar de envíos sobre arreglos de NumPy
+Refleja los envíos del controlador en columnas contiguas (peso, costo, distancia,
+estado, tipo, banderas y fecha de creación) para responder consultas agregadas
+sobre todo el libro de envíos sin recorrer objetos Python
+"""
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from Models.Envio import CODIGOS_TIPO
+from Patterns.State import CODIGOS_ESTADO
+
+SIN_CODIGO = -1
+
+
+class AlmacenColumnarEnvios:
+    """
+    Copia columnar de los envíos, actualizada incrementalmente en cada mutación
+    Cada envío ocupa una fila fija; las columnas crecen por duplicación
+    """
+
+    # Columna -> tipo de dato de NumPy
+    COLUMNAS = {
+        'peso': np.float64,
+        'costo': np.float64,
+        'distancia': np.float64,
+        'fecha_creacion': np.float64,   # timestamp en segundos
+        'estado': np.int8,
+        'tipo_envio': np.int8,
+        'es_fragil': np.bool_,
+        'requiere_seguro': np.bool_,
+    }
+
+    def __init__(self, capacidad_inicial: int = 1024):
+        self._filas: Dict[str, int] = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        self._columnas = {nombre: np.zeros(capacidad_inicial, dtype=tipo)
+                          for nombre, tipo in self.COLUMNAS.items()}
+
+    def __len__(self) -> int:
+        return self._total
+
+    def limpiar(self):
+        """Elimina todas las filas (conserva la capacidad reservada)"""
+        with self._lock:
+            self._filas.clear()
+            self._total = 0
+
+    def _reservar(self, cantidad: int):
+        """Asegura capacidad para `cantidad` filas adicionales"""
+        necesaria = self._total + cantidad
+        capacidad = len(self._columnas['peso'])
+        if necesaria <= capacidad:
+            return
+        while capacidad < necesaria:
+            capacidad *= 2
+        for nombre, columna in self._columnas.items():
+            nueva = np.zeros(capacidad, dtype=columna.dtype)
+            nueva[:self._total] = columna[:self._total]
+            self._columnas[nombre] = nueva
+
+    def actualizar(self, envio):
+        """Inserta o actualiza la fila de un envío"""
+        with self._lock:
+            fila = self._filas.get(envio.id_envio)
+            if fila is None:
+                self._reservar(1)
+                fila = self._total
+                self._filas[envio.id_envio] = fila
+                self._total += 1
+
+            columnas = self._columnas
+            columnas['peso'][fila] = envio.peso
+            columnas['costo'][fila] = envio.costo
+            columnas['distancia'][fila] = envio.distancia
+            columnas['fecha_creacion'][fila] = envio.fecha_creacion.timestamp()
+            columnas['estado'][fila] = CODIGOS_ESTADO.get(
+                envio.estado.__class__.__name__ if envio.estado else None, SIN_CODIGO)
+            columnas['tipo_envio'][fila] = CODIGOS_TIPO.get(envio.tipo_envio, SIN_CODIGO)
+            columnas['es_fragil'][fila] = envio.es_fragil
+            columnas['requiere_seguro'][fila] = envio.requiere_seguro
+
+    def cargar_desde_snapshot(self, snapshot):
+        """
+        Carga todas las filas de un snapshot columnar sin materializar envíos
+        (ver Persistence.SnapshotColumnar)
+        """
+        total = len(snapshot)
+        with self._lock:
+            self._reservar(total)
+            inicio, fin = self._total, self._total + total
+            columnas = self._columnas
+            for nombre in ('peso', 'costo', 'distancia', 'fecha_creacion'):
+                columnas[nombre][inicio:fin] = np.frombuffer(snapshot.columna(nombre), dtype=np.float64)
+
+            # Los códigos del snapshot usan su propia tabla; se traducen a los actuales
+            for nombre, codigos, tabla in (('estado', CODIGOS_ESTADO, snapshot.tabla_estados),
+                                           ('tipo_envio', CODIGOS_TIPO, snapshot.tabla_tipos)):
+                traduccion = np.full(256, SIN_CODIGO, dtype=np.int8)
+                for codigo, valor in enumerate(tabla):
+                    traduccion[codigo] = codigos.get(valor, SIN_CODIGO)
+                columnas[nombre][inicio:fin] = traduccion[
+                    np.frombuffer(snapshot.columna(nombre), dtype=np.uint8)]
+
+            banderas = np.frombuffer(snapshot.columna('banderas'), dtype=np.uint8)
+            columnas['es_fragil'][inicio:fin] = (banderas & 1).astype(bool)
+            columnas['requiere_seguro'][inicio:fin] = (banderas & 2).astype(bool)
+
+            for fila in range(total):
+                self._filas[snapshot.id_en(fila)] = inicio + fila
+            self._total = fin
+
+    def columna(self, nombre: str) -> np.ndarray:
+        """Retorna una vista de solo lectura de las filas ocupadas de una columna"""
+        vista = self._columnas[nombre][:self._total]
+        vista.flags.writeable = False
+        return vista
+
+    def mascara(self, estado: Optional[str] = None, tipo: Optional[str] = None,
+                es_fragil: Optional[bool] = None, desde: Optional[float] = None,
+                hasta: Optional[float] = None) -> np.ndarray:
+        """
+        Retorna la máscara booleana de las filas que cumplen los filtros
+
+        Args:
+            estado: Nombre de la clase de estado (ej. "EstadoEnTransito")
+            tipo: "Express", "Estándar" o "Económico"
+            es_fragil: Filtrar por envíos frágiles o no frágiles
+            desde, hasta: Rango de fecha de creación (timestamps, inclusivo)
+        """
+        mascara = np.ones(self._total, dtype=bool)
+        if estado is not None:
+            mascara &= self.columna('estado') == CODIGOS_ESTADO.get(estado, SIN_CODIGO)
+        if tipo is not None:
+            mascara &= self.columna('tipo_envio') == CODIGOS_TIPO.get(tipo, SIN_CODIGO)
+        if es_fragil is not None:
+            mascara &= self.columna('es_fragil') == es_fragil
+        if desde is not None:
+            mascara &= self.columna('fecha_creacion') >= desde
+        if hasta is not None:
+            mascara &= self.columna('fecha_creacion') <= hasta
+        return mascara
+
+    def _filtrar(self, columna: str, filtros: dict) -> np.ndarray:
+        """Retorna los valores de una columna en las filas que cumplen los filtros"""
+        valores = self.columna(columna)
+        if any(valor is not None for valor in filtros.values()):
+            valores = valores[self.mascara(**filtros)]
+        return valores
+
+    def agregar(self, columna: str, operacion: str = "suma", **filtros) -> float:
+        """
+        Calcula un agregado ("suma", "promedio", "minimo", "maximo", "conteo")
+        de una columna sobre las filas que cumplen los filtros de mascara()
+        """
+        valores = self._filtrar(columna, filtros)
+        if operacion == "conteo":
+            return int(valores.size)
+        if valores.size == 0:
+            return 0.0
+        if operacion == "suma":
+            return float(valores.sum())
+        if operacion == "promedio":
+            return float(valores.mean())
+        if operacion == "minimo":
+            return float(valores.min())
+        if operacion == "maximo":
+            return float(valores.max())
+        raise ValueError(f"Operación '{operacion}' no soportada")
+
+    def ingresos_por_tipo(self, **filtros) -> Dict[str, float]:
+        """Suma de costos agrupada por tipo de envío"""
+        tipos = self._filtrar('tipo_envio', filtros)
+        costos = self._filtrar('costo', filtros)
+        validos = tipos >= 0
+        totales = np.bincount(tipos[validos], weights=costos[validos],
+                              minlength=len(CODIGOS_TIPO))
+        return {tipo: float(totales[codigo]) for tipo, codigo in CODIGOS_TIPO.items()}
+
+    def conteo_por_estado(self, **filtros) -> Dict[str, int]:
+        """Cantidad de envíos por estado"""
+        estados = self._filtrar('estado', filtros)
+        conteos = np.bincount(estados[estados >= 0], minlength=len(CODIGOS_ESTADO))
+        return {estado: int(conteos[codigo]) for estado, codigo in CODIGOS_ESTADO.items()}
+
+    def peso_en_transito(self) -> float:
+        """Kilogramos totales de los envíos en tránsito"""
+        return self.agregar('peso', "suma", estado="EstadoEnTransito")
+
+    def distancia_promedio(self, **filtros) -> float:
+        """Distancia promedio de los envíos que cumplen los filtros"""
+        return self.agregar('distancia', "promedio", **filtros)
+
+    def resumen(self) -> dict:
+        """Resumen agregado del libro de envíos"""
+        return {
+            'total_envios': self._total,
+            'ingresos_por_tipo': self.ingresos_por_tipo(),
+            'conteo_por_estado': self.conteo_por_estado(),
+            'peso_total': self.agregar('peso'),
+            'peso_en_transito': self.peso_en_transito(),
+            'distancia_promedio': self.distancia_promedio(),
+        }
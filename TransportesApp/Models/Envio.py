@@ -2,11 +2,27 @@
 """
 Modelo principal de Envío para la empresa de transportes
 """
+import sys
+import time
 from datetime import datetime
 from typing import List, Optional
 
+# Tipos de envío: una sola instancia de cada texto compartida por todos los envíos
+TIPO_EXPRESS = sys.intern("Express")
+TIPO_ESTANDAR = sys.intern("Estándar")
+TIPO_ECONOMICO = sys.intern("Económico")
+
 class Envio:
-    """Clase que representa un envío en la empresa de transportes"""
+    """
+    Clase que representa un envío en la empresa de transportes
+    Usa __slots__ (sin __dict__ por instancia) y guarda la fecha de creación
+    como timestamp flotante, expuesto como datetime mediante una propiedad
+    """
+    
+    __slots__ = ('id_envio', 'remitente', 'destinatario', 'direccion_origen',
+                 'direccion_destino', 'peso', 'tipo_envio', 'descripcion',
+                 '_fecha_creacion', 'estado', 'costo', 'distancia',
+                 'es_fragil', 'requiere_seguro')
     
     def __init__(self, id_envio: str, remitente: str, destinatario: str, 
                  direccion_origen: str, direccion_destino: str, peso: float, 
@@ -19,13 +35,22 @@ class Envio:
         self.peso = peso  # en kg
         self.tipo_envio = tipo_envio  # "express", "estandar", "economico"
         self.descripcion = descripcion
-        self.fecha_creacion = datetime.now()
+        self._fecha_creacion = time.time()  # timestamp (segundos desde epoch)
         self.estado = None  # Se asignará por el patrón State
         self.costo = 0.0
         self.distancia = 0.0  # en km
         self.es_fragil = False
         self.requiere_seguro = False
         
+    @property
+    def fecha_creacion(self) -> datetime:
+        """Fecha de creación del envío"""
+        return datetime.fromtimestamp(self._fecha_creacion)
+    
+    @fecha_creacion.setter
+    def fecha_creacion(self, fecha: datetime):
+        self._fecha_creacion = fecha.timestamp()
+    
     def __str__(self):
         return f"Envío {self.id_envio}: {self.remitente} -> {self.destinatario} ({self.tipo_envio})"
     
@@ -51,23 +76,40 @@ class Envio:
 
 class EnvioExpress(Envio):
     """Envío express - entrega en 24 horas"""
+    __slots__ = ()
+    
     def __init__(self, id_envio: str, remitente: str, destinatario: str, 
                  direccion_origen: str, direccion_destino: str, peso: float, descripcion: str = ""):
         super().__init__(id_envio, remitente, destinatario, direccion_origen, 
-                        direccion_destino, peso, "Express", descripcion)
+                        direccion_destino, peso, TIPO_EXPRESS, descripcion)
 
 
 class EnvioEstandar(Envio):
     """Envío estándar - entrega en 3-5 días"""
+    __slots__ = ()
+    
     def __init__(self, id_envio: str, remitente: str, destinatario: str, 
                  direccion_origen: str, direccion_destino: str, peso: float, descripcion: str = ""):
         super().__init__(id_envio, remitente, destinatario, direccion_origen, 
-                        direccion_destino, peso, "Estándar", descripcion)
+                        direccion_destino, peso, TIPO_ESTANDAR, descripcion)
 
 
 class EnvioEconomico(Envio):
     """Envío económico - entrega en 7-10 días"""
+    __slots__ = ()
+    
     def __init__(self, id_envio: str, remitente: str, destinatario: str, 
                  direccion_origen: str, direccion_destino: str, peso: float, descripcion: str = ""):
         super().__init__(id_envio, remitente, destinatario, direccion_origen, 
-                        direccion_destino, peso, "Económico", descripcion)
+                        direccion_destino, peso, TIPO_ECONOMICO, descripcion)
+
+
+# Clase concreta por tipo de envío
+CLASES_POR_TIPO = {
+    TIPO_EXPRESS: EnvioExpress,
+    TIPO_ESTANDAR: EnvioEstandar,
+    TIPO_ECONOMICO: EnvioEconomico
+}
+
+# Código numérico compacto de cada tipo (para almacenamiento columnar)
+CODIGOS_TIPO = {tipo: codigo for codigo, tipo in enumerate(CLASES_POR_TIPO)}
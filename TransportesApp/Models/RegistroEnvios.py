@@ -0,0 +1,216 @@
+# Models/RegistroEnvios.py
+"""
+Registro indexado de envíos
+Reemplaza la búsqueda lineal sobre la lista de envíos por un diccionario
+con acceso O(1) por ID y mantiene índices secundarios para los filtros
+"""
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+class RegistroEnvios:
+    """
+    Registro de envíos con índice primario por ID e índices secundarios
+    por estado, tipo de envío, remitente y destinatario
+    
+    Las búsquedas por ID no toman locks (lectura de un dict); las altas,
+    la reindexación y los filtros sobre índices secundarios usan un lock interno
+    """
+
+    # Campos indexados y función que obtiene la clave de cada envío
+    CAMPOS_INDEXADOS = {
+        'estado': lambda envio: envio.estado.__class__.__name__ if envio.estado else "Sin estado",
+        'tipo_envio': lambda envio: envio.tipo_envio,
+        'remitente': lambda envio: envio.remitente,
+        'destinatario': lambda envio: envio.destinatario,
+    }
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._envios: Dict[str, object] = {}  # Conserva el orden de inserción
+        self._originadores: Dict[str, object] = {}
+        # campo -> valor -> IDs (dict usado como conjunto ordenado)
+        self._indices: Dict[str, Dict[object, Dict[str, None]]] = {
+            campo: {} for campo in self.CAMPOS_INDEXADOS
+        }
+        # ID -> claves con las que el envío está indexado actualmente
+        self._claves: Dict[str, Dict[str, object]] = {}
+        
+        # Fuente perezosa (ej. snapshot columnar) cuyas filas se materializan al consultarlas
+        self._fuente = None
+        self._constructor: Optional[Callable] = None
+        self._materializadas: Optional[bytearray] = None
+        self._pendientes = 0
+
+    def cargar_perezoso(self, fuente, constructor: Callable):
+        """
+        Registra una fuente de envíos que se materializan bajo demanda
+
+        Args:
+            fuente: Objeto con __len__, id_en(fila), buscar(id) -> fila o -1 y fila(fila)
+            constructor: Función fila -> (envio, originador) que materializa una fila
+        """
+        self._fuente = fuente
+        self._constructor = constructor
+        self._materializadas = bytearray(len(fuente))
+        self._pendientes = len(fuente)
+
+    def _materializar_fila(self, fila: int):
+        """Construye el envío de una fila de la fuente y lo agrega al registro"""
+        envio, originador = self._constructor(self._fuente.fila(fila))
+        self._materializadas[fila] = 1
+        self._pendientes -= 1
+        self.agregar(envio, originador)
+        return envio
+
+    def _materializar_id(self, id_envio: str):
+        """Materializa el envío con el ID dado si está pendiente en la fuente"""
+        with self._lock:
+            if self._fuente is None:
+                return self._envios.get(id_envio)
+            fila = self._fuente.buscar(id_envio)
+            if fila < 0 or self._materializadas[fila]:
+                return self._envios.get(id_envio)
+            return self._materializar_fila(fila)
+
+    def materializar_todo(self):
+        """
+        Materializa todas las filas pendientes de la fuente perezosa
+        Se usa antes de recorrer o filtrar el registro completo
+        """
+        if self._fuente is None:
+            return
+
+        with self._lock:
+            if self._fuente is None:
+                return
+
+            for fila in range(len(self._fuente)):
+                if not self._materializadas[fila]:
+                    self._materializar_fila(fila)
+
+            # Restaurar el orden de creación: primero las filas de la fuente
+            orden = [self._fuente.id_en(fila) for fila in range(len(self._fuente))]
+            envios = {id_envio: self._envios[id_envio] for id_envio in orden}
+            envios.update(self._envios)
+            self._envios = envios
+
+            self._fuente = None
+            self._constructor = None
+            self._materializadas = None
+
+    def agregar(self, envio, originador=None):
+        """Registra un envío (y su originador de historial) e indexa sus campos"""
+        with self._lock:
+            if originador is not None:
+                self._originadores[envio.id_envio] = originador
+            self._envios[envio.id_envio] = envio
+            self.reindexar(envio)
+
+    def obtener(self, id_envio: str):
+        """Retorna el envío con el ID dado o None"""
+        envio = self._envios.get(id_envio)
+        if envio is None and self._pendientes:
+            envio = self._materializar_id(id_envio)
+        return envio
+
+    def obtener_originador(self, id_envio: str):
+        """Retorna el originador de historial del envío o None"""
+        originador = self._originadores.get(id_envio)
+        if originador is None and self._pendientes and self._materializar_id(id_envio):
+            originador = self._originadores.get(id_envio)
+        return originador
+
+    def reindexar(self, envio):
+        """
+        Actualiza los índices secundarios de un envío
+        Debe llamarse después de cualquier cambio de estado o de datos
+        """
+        id_envio = envio.id_envio
+        claves_nuevas = {campo: obtener_clave(envio)
+                         for campo, obtener_clave in self.CAMPOS_INDEXADOS.items()}
+
+        with self._lock:
+            claves_previas = self._claves.get(id_envio, {})
+            for campo, clave in claves_nuevas.items():
+                if campo in claves_previas:
+                    clave_previa = claves_previas[campo]
+                    if clave_previa == clave:
+                        continue
+                    self._quitar_de_indice(campo, clave_previa, id_envio)
+
+                self._indices[campo].setdefault(clave, {})[id_envio] = None
+
+            self._claves[id_envio] = claves_nuevas
+
+    def _quitar_de_indice(self, campo: str, clave, id_envio: str):
+        """Elimina un ID del índice de un campo, descartando claves vacías"""
+        ids = self._indices[campo].get(clave)
+        if ids is None:
+            return
+        ids.pop(id_envio, None)
+        if not ids:
+            del self._indices[campo][clave]
+
+    def filtrar(self, **criterios) -> List:
+        """
+        Retorna los envíos que cumplen todos los criterios dados
+
+        Args:
+            criterios: pares campo=valor sobre los campos indexados
+                       (estado, tipo_envio, remitente, destinatario).
+                       El estado se expresa con el nombre de la clase (ej. "EstadoPendiente")
+        """
+        self.materializar_todo()
+        criterios = {campo: valor for campo, valor in criterios.items() if valor is not None}
+        if not criterios:
+            return list(self._envios.values())
+
+        for campo in criterios:
+            if campo not in self._indices:
+                raise ValueError(f"Campo '{campo}' no indexado")
+
+        with self._lock:
+            # Intersectar empezando por el índice más selectivo
+            candidatos = sorted(
+                (self._indices[campo].get(valor, {}) for campo, valor in criterios.items()),
+                key=len
+            )
+            base, resto = candidatos[0], candidatos[1:]
+            return [self._envios[id_envio] for id_envio in base
+                    if all(id_envio in ids for ids in resto)]
+
+    def contar_por(self, campo: str) -> Dict[object, int]:
+        """Retorna cuántos envíos hay por cada valor de un campo indexado"""
+        self.materializar_todo()
+        with self._lock:
+            return {clave: len(ids) for clave, ids in self._indices[campo].items()}
+
+    def ids(self) -> List[str]:
+        """Retorna los IDs registrados en orden de creación"""
+        self.materializar_todo()
+        return list(self._envios)
+
+    def envios(self) -> List:
+        """Retorna los envíos registrados en orden de creación"""
+        self.materializar_todo()
+        return list(self._envios.values())
+
+    def originadores(self) -> Dict[str, object]:
+        """Retorna el diccionario de originadores por ID de envío"""
+        self.materializar_todo()
+        return self._originadores
+
+    def __contains__(self, id_envio: str) -> bool:
+        if id_envio in self._envios:
+            return True
+        fuente = self._fuente
+        return fuente is not None and fuente.buscar(id_envio) >= 0
+
+    def __iter__(self) -> Iterator:
+        # Se recorre una copia para tolerar altas concurrentes durante la iteración
+        self.materializar_todo()
+        return iter(list(self._envios.values()))
+
+    def __len__(self) -> int:
+        return len(self._envios) + self._pendientes
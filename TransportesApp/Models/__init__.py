@@ -2,6 +2,11 @@
 """
 Paquete de modelos de la aplicación
 """
-from .Envio import Envio, EnvioExpress, EnvioEstandar, EnvioEconomico
+from .Envio import (Envio, EnvioExpress, EnvioEstandar, EnvioEconomico,
+                    TIPO_EXPRESS, TIPO_ESTANDAR, TIPO_ECONOMICO)
+from .RegistroEnvios import RegistroEnvios
 
-__all__ = ['Envio', 'EnvioExpress', 'EnvioEstandar', 'EnvioEconomico']
+__all__ = [
+    'Envio', 'EnvioExpress', 'EnvioEstandar', 'EnvioEconomico',
+    'TIPO_EXPRESS', 'TIPO_ESTANDAR', 'TIPO_ECONOMICO', 'RegistroEnvios'
+]
@@ -0,0 +1,79 @@
+# Patterns/CacheCotizaciones.py
+"""
+Caché LRU de cotizaciones para CalculadorCosto
+Guarda el costo calculado para cada combinación de datos de tarificación
+(tipo, peso, distancia, frágil, seguro). Cada consulta lleva la huella de las
+tarifas vigentes: si cambió, el caché se vacía antes de responder
+"""
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class CacheCotizaciones:
+    """Caché LRU acotado y seguro entre hilos, con contadores de aciertos y fallos"""
+
+    def __init__(self, capacidad: int = 4096):
+        """
+        Args:
+            capacidad: Cantidad máxima de cotizaciones guardadas (0 desactiva el caché)
+        """
+        self.capacidad = capacidad
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self._entradas: 'OrderedDict[Hashable, float]' = OrderedDict()
+        self._huella: Optional[Hashable] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def _validar_huella(self, huella: Hashable):
+        """Vacía el caché si las tarifas cambiaron (llamar con el lock tomado)"""
+        if huella != self._huella:
+            if self._entradas:
+                self._entradas.clear()
+                self.invalidaciones += 1
+            self._huella = huella
+
+    def obtener(self, clave: Hashable, huella: Hashable) -> Optional[float]:
+        """Retorna el costo guardado para la clave o None (cuenta el acierto o fallo)"""
+        with self._lock:
+            self._validar_huella(huella)
+            costo = self._entradas.get(clave)
+            if costo is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return costo
+
+    def guardar(self, clave: Hashable, huella: Hashable, costo: float):
+        """Guarda un costo calculado con las tarifas de la huella dada"""
+        if self.capacidad <= 0:
+            return
+        with self._lock:
+            self._validar_huella(huella)
+            self._entradas[clave] = costo
+            self._entradas.move_to_end(clave)
+            if len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        """Vacía el caché y reinicia los contadores"""
+        with self._lock:
+            self._entradas.clear()
+            self.aciertos = self.fallos = self.invalidaciones = 0
+
+    def estadisticas(self) -> dict:
+        """Tamaño, capacidad, aciertos, fallos, tasa de aciertos e invalidaciones"""
+        consultas = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._entradas),
+            'capacidad': self.capacidad,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+            'invalidaciones': self.invalidaciones,
+        }
@@ -4,11 +4,23 @@ Patrón Chain of Responsibility para validación de envíos
 Valida diferentes aspectos del envío antes de ser procesado
 """
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Dict, List, Optional, Sequence
+import threading
+import time
+
+from Utils.Bitacora import obtener_logger
+from Utils.Distancias import DistanciasEnCache, ProveedorDistanciaGeografica, ProveedorDistancias
+
+log = obtener_logger(__name__)
+
+SEPARADOR = "=" * 60
 
 class ValidadorEnvio(ABC):
     """Clase base abstracta para validadores de envío"""
     
+    # Mensaje retornado cuando este validador es el último de la cadena
+    MENSAJE_EXITO = "✓ Validación exitosa"
+    
     def __init__(self):
         self._siguiente: Optional[ValidadorEnvio] = None
     
@@ -18,112 +30,294 @@ class ValidadorEnvio(ABC):
         return validador
     
     @abstractmethod
+    def verificar(self, envio) -> Optional[str]:
+        """
+        Aplica la regla de este validador (sin recorrer la cadena)
+        Retorna: mensaje de error o None si el envío cumple la regla
+        """
+        pass
+    
+    def verificar_todo(self, envio) -> List[str]:
+        """
+        Aplica la regla de este validador y retorna todos sus errores
+        (los validadores que revisan varias condiciones la sobrescriben)
+        """
+        error = self.verificar(envio)
+        return [error] if error else []
+    
     def validar(self, envio) -> tuple[bool, str]:
         """
         Valida el envío y pasa al siguiente validador si es necesario
         Retorna: (es_valido, mensaje)
         """
-        pass
+        error = self.verificar(envio)
+        if error:
+            return False, error
+        
+        if self._siguiente:
+            return self._siguiente.validar(envio)
+        
+        return True, self.MENSAJE_EXITO
 
 
 class ValidadorDatos(ValidadorEnvio):
     """Valida que los datos básicos del envío estén completos"""
     
-    def validar(self, envio) -> tuple[bool, str]:
+    MENSAJE_EXITO = "✓ Validación de datos exitosa"
+    
+    CAMPOS_TEXTO = ('remitente', 'destinatario', 'direccion_origen', 'direccion_destino')
+    
+    def verificar_todo(self, envio) -> List[str]:
+        errores = []
+        # Los valores vacíos (ej. None) se informan abajo como datos faltantes
+        no_texto = [campo for campo in self.CAMPOS_TEXTO
+                    if getattr(envio, campo) and not isinstance(getattr(envio, campo), str)]
+        if no_texto:
+            errores.append(f"❌ Error: Campos que deben ser texto: {', '.join(no_texto)}")
+        
         if not envio.remitente or not envio.destinatario:
-            return False, "❌ Error: Remitente o destinatario vacío"
+            errores.append("❌ Error: Remitente o destinatario vacío")
         
         if not envio.direccion_origen or not envio.direccion_destino:
-            return False, "❌ Error: Direcciones incompletas"
-        
-        print("✓ Validador de Datos: Información básica completa")
+            errores.append("❌ Error: Direcciones incompletas")
         
-        if self._siguiente:
-            return self._siguiente.validar(envio)
+        return errores
+    
+    def verificar(self, envio) -> Optional[str]:
+        errores = self.verificar_todo(envio)
+        if errores:
+            return errores[0]
         
-        return True, "✓ Validación de datos exitosa"
+        log.debug("✓ Validador de Datos: Información básica completa")
+        return None
 
 
 class ValidadorPeso(ValidadorEnvio):
     """Valida que el peso del envío esté dentro de los límites permitidos"""
     
+    MENSAJE_EXITO = "✓ Validación de peso exitosa"
+    
     PESO_MINIMO = 0.1  # kg
     PESO_MAXIMO = 1000  # kg
     
-    def validar(self, envio) -> tuple[bool, str]:
+    def verificar(self, envio) -> Optional[str]:
         if envio.peso < self.PESO_MINIMO:
-            return False, f"❌ Error: Peso mínimo {self.PESO_MINIMO} kg"
+            return f"❌ Error: Peso mínimo {self.PESO_MINIMO} kg"
         
         if envio.peso > self.PESO_MAXIMO:
-            return False, f"❌ Error: Peso máximo {self.PESO_MAXIMO} kg. Requiere transporte especial"
-        
-        print(f"✓ Validador de Peso: {envio.peso} kg dentro del rango permitido")
-        
-        if self._siguiente:
-            return self._siguiente.validar(envio)
+            return f"❌ Error: Peso máximo {self.PESO_MAXIMO} kg. Requiere transporte especial"
         
-        return True, "✓ Validación de peso exitosa"
+        log.debug("✓ Validador de Peso: %s kg dentro del rango permitido", envio.peso)
+        return None
 
 
 class ValidadorTipoEnvio(ValidadorEnvio):
     """Valida que el tipo de envío sea válido"""
     
+    MENSAJE_EXITO = "✓ Validación de tipo exitosa"
+    
     TIPOS_VALIDOS = ["Express", "Estándar", "Económico"]
     
-    def validar(self, envio) -> tuple[bool, str]:
+    def verificar(self, envio) -> Optional[str]:
         if envio.tipo_envio not in self.TIPOS_VALIDOS:
-            return False, f"❌ Error: Tipo de envío inválido. Tipos válidos: {', '.join(self.TIPOS_VALIDOS)}"
-        
-        print(f"✓ Validador de Tipo: {envio.tipo_envio} es válido")
+            return f"❌ Error: Tipo de envío inválido. Tipos válidos: {', '.join(self.TIPOS_VALIDOS)}"
         
-        if self._siguiente:
-            return self._siguiente.validar(envio)
-        
-        return True, "✓ Validación de tipo exitosa"
+        log.debug("✓ Validador de Tipo: %s es válido", envio.tipo_envio)
+        return None
 
 
 class ValidadorDistancia(ValidadorEnvio):
     """Valida restricciones según la distancia del envío"""
     
-    def validar(self, envio) -> tuple[bool, str]:
-        # Simulamos cálculo de distancia (en app real sería con API de mapas)
-        distancia = len(envio.direccion_destino) * 10  # Simulación simple
+    MENSAJE_EXITO = "✓ Validación de distancia exitosa"
+    
+    # Proveedor compartido por todos los validadores (ver Utils.Distancias)
+    _proveedor: Optional[ProveedorDistancias] = None
+    _lock_proveedor = threading.Lock()
+    
+    @classmethod
+    def proveedor(cls) -> ProveedorDistancias:
+        """Proveedor configurado; por defecto el geográfico con caché en memoria"""
+        if cls._proveedor is None:
+            with cls._lock_proveedor:
+                if cls._proveedor is None:
+                    cls._proveedor = DistanciasEnCache(ProveedorDistanciaGeografica())
+        return cls._proveedor
+    
+    @classmethod
+    def configurar_proveedor(cls, proveedor: ProveedorDistancias):
+        """Reemplaza el proveedor de distancias (ej. el simulado en pruebas)"""
+        cls._proveedor = proveedor
+    
+    def verificar(self, envio) -> Optional[str]:
+        if not isinstance(envio.direccion_origen, str) or not isinstance(envio.direccion_destino, str):
+            # ValidadorDatos rechaza el envío (puede evaluarse después si se reordenan las reglas)
+            return None
+        
+        distancia = self.proveedor().distancia(envio.direccion_origen, envio.direccion_destino)
         envio.distancia = distancia
         
         if envio.tipo_envio == "Express" and distancia > 500:
-            return False, f"❌ Error: Envío Express limitado a 500 km (distancia: {distancia} km)"
+            return f"❌ Error: Envío Express limitado a 500 km (distancia: {distancia} km)"
         
         if distancia > 2000:
-            print(f"⚠ Advertencia: Distancia larga ({distancia} km) - puede requerir tiempo adicional")
-        
-        print(f"✓ Validador de Distancia: {distancia} km calculados")
-        
-        if self._siguiente:
-            return self._siguiente.validar(envio)
+            log.debug("⚠ Advertencia: Distancia larga (%s km) - puede requerir tiempo adicional", distancia)
         
-        return True, "✓ Validación de distancia exitosa"
+        log.debug("✓ Validador de Distancia: %s km calculados", distancia)
+        return None
 
 
 class ValidadorSeguridad(ValidadorEnvio):
     """Valida aspectos de seguridad del envío"""
     
-    def validar(self, envio) -> tuple[bool, str]:
+    MENSAJE_EXITO = "✓ Validación de seguridad exitosa"
+    
+    def verificar(self, envio) -> Optional[str]:
         # Validar si requiere seguro
         if envio.peso > 50 or envio.es_fragil:
             envio.requiere_seguro = True
-            print(f"⚠ Validador de Seguridad: Se requiere seguro adicional")
+            log.debug("⚠ Validador de Seguridad: Se requiere seguro adicional")
         
-        print("✓ Validador de Seguridad: Verificación completada")
+        log.debug("✓ Validador de Seguridad: Verificación completada")
+        return None
+
+
+class PipelineValidacion:
+    """
+    Cadena de validación precompilada y reutilizable entre hilos
+    Los validadores no guardan estado por envío, por lo que una sola instancia sirve
+    para todas las validaciones. Lleva contadores de evaluaciones, rechazos y tiempo
+    por regla y puede reordenar las reglas independientes para que las que más
+    rechazan (por unidad de tiempo) se evalúen primero. Las reglas finales (que
+    modifican el envío a partir de los datos ya validados) conservan su posición
+    """
+    
+    def __init__(self, reglas: Sequence[ValidadorEnvio], finales: Sequence[ValidadorEnvio] = (),
+                 reordenar_cada: Optional[int] = None):
+        """
+        Args:
+            reglas: Validadores independientes entre sí (reordenables)
+            finales: Validadores que siempre se evalúan al final, en este orden
+            reordenar_cada: Validaciones entre reordenamientos automáticos (None: nunca)
+        """
+        self._reglas = tuple(reglas)
+        self._finales = tuple(finales)
+        self._orden = self._reglas + self._finales
+        self.reordenar_cada = reordenar_cada
         
-        if self._siguiente:
-            return self._siguiente.validar(envio)
+        self._lock = threading.Lock()
+        self._validaciones = 0
+        self._evaluaciones: Dict[str, int] = {}
+        self._rechazos: Dict[str, int] = {}
+        self._nanosegundos: Dict[str, int] = {}
+        self.limpiar_estadisticas()
+    
+    @property
+    def orden(self) -> list:
+        """Nombres de las reglas en el orden en que se evalúan"""
+        return [regla.__class__.__name__ for regla in self._orden]
+    
+    def validar(self, envio) -> tuple[bool, str]:
+        """
+        Valida el envío con todas las reglas, deteniéndose en el primer rechazo
+        Retorna: (es_valido, mensaje) como la cadena clásica
+        """
+        orden = self._orden  # Lectura atómica: un reordenamiento no afecta esta validación
+        ultima = orden[-1]
+        for regla in orden:
+            inicio = time.perf_counter_ns()
+            error = regla.verificar(envio)
+            self._contar(regla.__class__.__name__, time.perf_counter_ns() - inicio, error is not None)
+            if error:
+                self._finalizar_validacion()
+                return False, error
+        
+        self._finalizar_validacion()
+        return True, ultima.MENSAJE_EXITO
+    
+    def validar_lote(self, envios: Sequence) -> List[List[str]]:
+        """
+        Aplica todas las reglas a cada envío sin detenerse en el primer rechazo
+        Las reglas se evalúan en su orden original, de modo que los errores de cada
+        fila salen siempre en el mismo orden, y los efectos de ValidadorDistancia y
+        ValidadorSeguridad (distancia, requiere_seguro) se aplican a todas las filas.
+        No afecta los contadores ni el orden adaptativo
+        
+        Returns:
+            Una lista de errores por envío, en el mismo orden (vacía si el envío es válido)
+        """
+        reglas = self._reglas + self._finales
+        errores = [[] for _ in envios]
+        for regla in reglas:
+            for errores_envio, envio in zip(errores, envios):
+                errores_envio.extend(regla.verificar_todo(envio))
         
-        return True, "✓ Validación de seguridad exitosa"
+        log.debug("🔎 Validación en lote: %d envíos, %d con errores",
+                  len(errores), sum(1 for errores_envio in errores if errores_envio))
+        return errores
+    
+    def _contar(self, nombre: str, nanosegundos: int, rechazo: bool):
+        """Acumula los contadores de una regla"""
+        with self._lock:
+            self._evaluaciones[nombre] += 1
+            self._nanosegundos[nombre] += nanosegundos
+            if rechazo:
+                self._rechazos[nombre] += 1
+    
+    def _finalizar_validacion(self):
+        """Cuenta la validación y reordena si corresponde"""
+        with self._lock:
+            self._validaciones += 1
+            toca_reordenar = self.reordenar_cada and self._validaciones % self.reordenar_cada == 0
+        if toca_reordenar:
+            self.reordenar()
+    
+    def _prioridad(self, regla: ValidadorEnvio) -> float:
+        """Rechazos por nanosegundo invertido en la regla (mayor = evaluar antes)"""
+        nombre = regla.__class__.__name__
+        return self._rechazos[nombre] / (self._nanosegundos[nombre] or 1)
+    
+    def reordenar(self):
+        """Ordena las reglas independientes según su tasa de rechazo por unidad de tiempo"""
+        with self._lock:
+            reglas = sorted(self._reglas, key=self._prioridad, reverse=True)
+            # sorted es estable: sin rechazos se conserva el orden original
+            self._orden = tuple(reglas) + self._finales
+        log.debug("🔀 Orden de validación: %s", self.orden)
+    
+    def limpiar_estadisticas(self):
+        """Reinicia los contadores (el orden actual se conserva)"""
+        with self._lock:
+            nombres = [regla.__class__.__name__ for regla in self._reglas + self._finales]
+            self._validaciones = 0
+            self._evaluaciones = dict.fromkeys(nombres, 0)
+            self._rechazos = dict.fromkeys(nombres, 0)
+            self._nanosegundos = dict.fromkeys(nombres, 0)
+    
+    def estadisticas(self) -> dict:
+        """Validaciones totales, orden actual y, por regla, evaluaciones, rechazos y latencia media"""
+        with self._lock:
+            return {
+                'validaciones': self._validaciones,
+                'orden': self.orden,
+                'reglas': {
+                    nombre: {
+                        'evaluaciones': evaluaciones,
+                        'rechazos': self._rechazos[nombre],
+                        'latencia_media_us': (self._nanosegundos[nombre] / evaluaciones / 1000
+                                              if evaluaciones else 0.0)
+                    }
+                    for nombre, evaluaciones in self._evaluaciones.items()
+                }
+            }
 
 
 class CadenaValidacion:
     """Clase para configurar y ejecutar la cadena de validación"""
     
+    _pipeline: Optional[PipelineValidacion] = None
+    _lock = threading.Lock()
+    
     @staticmethod
     def crear_cadena() -> ValidadorEnvio:
         """Crea y retorna la cadena de validadores configurada"""
@@ -141,22 +335,33 @@ class CadenaValidacion:
         
         return validador_datos
     
+    @classmethod
+    def pipeline(cls) -> PipelineValidacion:
+        """Pipeline compartido con las mismas reglas y orden inicial que crear_cadena()"""
+        if cls._pipeline is None:
+            with cls._lock:
+                if cls._pipeline is None:
+                    cls._pipeline = PipelineValidacion(
+                        reglas=(ValidadorDatos(), ValidadorPeso(), ValidadorTipoEnvio(), ValidadorDistancia()),
+                        finales=(ValidadorSeguridad(),)
+                    )
+        return cls._pipeline
+    
     @staticmethod
     def validar_envio(envio) -> tuple[bool, str]:
         """Ejecuta la validación completa del envío"""
-        print(f"\n{'='*60}")
-        print(f"INICIANDO VALIDACIÓN DE ENVÍO: {envio.id_envio}")
-        print(f"{'='*60}")
+        log.debug("\n%s", SEPARADOR)
+        log.debug("INICIANDO VALIDACIÓN DE ENVÍO: %s", envio.id_envio)
+        log.debug(SEPARADOR)
         
-        cadena = CadenaValidacion.crear_cadena()
-        resultado, mensaje = cadena.validar(envio)
+        resultado, mensaje = CadenaValidacion.pipeline().validar(envio)
         
-        print(f"{'='*60}")
+        log.debug(SEPARADOR)
         if resultado:
-            print(f"✅ VALIDACIÓN COMPLETADA EXITOSAMENTE")
+            log.debug("✅ VALIDACIÓN COMPLETADA EXITOSAMENTE")
         else:
-            print(f"❌ VALIDACIÓN FALLIDA")
-        print(f"Mensaje: {mensaje}")
-        print(f"{'='*60}\n")
+            log.debug("❌ VALIDACIÓN FALLIDA")
+        log.debug("Mensaje: %s", mensaje)
+        log.debug("%s\n", SEPARADOR)
         
         return resultado, mensaje
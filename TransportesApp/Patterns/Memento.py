@@ -3,9 +3,50 @@
 Patrón Memento para guardar y restaurar el historial de cambios del envío
 Permite deshacer cambios y mantener un registro de todas las modificaciones
 """
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import bisect
 import copy
+import functools
+import logging
+import marshal
+import sys
+import threading
+import time
+
+from Utils.Bitacora import obtener_logger
+
+log = obtener_logger(__name__)
+
+SEPARADOR = "=" * 80
+
+# Índices de campos cambiados de los deltas del historial (compartidos entre caretakers)
+_POSICIONES: Dict[bytes, bytes] = {}
+
+# Tipos de valores de las entradas que suman al tamaño estimado de un historial
+_TIPOS_CONTADOS = (str, float, int)
+
+# Reloj de los mementos: time.time() salvo dentro de momento_fijo() (por hilo)
+_reloj = threading.local()
+
+def _ahora() -> float:
+    """Instante con el que se fechan los mementos creados en este hilo"""
+    momento = getattr(_reloj, 'momento', None)
+    return time.time() if momento is None else momento
+
+@contextmanager
+def momento_fijo(momento: float):
+    """
+    Fecha con el instante dado los mementos creados en este hilo dentro del bloque
+    Se usa al reproducir el diario para conservar la fecha original de cada cambio
+    """
+    anterior = getattr(_reloj, 'momento', None)
+    _reloj.momento = momento
+    try:
+        yield
+    finally:
+        _reloj.momento = anterior
 
 class MementoEnvio:
     """
@@ -30,7 +71,7 @@ class MementoEnvio:
         # Guardar el nombre del estado actual
         self._estado_nombre = envio.estado.__class__.__name__ if envio.estado else "Sin estado"
         
-        self._timestamp = datetime.now()
+        self._timestamp = datetime.fromtimestamp(_ahora())
         self._descripcion_cambio = ""
     
     def get_timestamp(self) -> datetime:
@@ -66,6 +107,39 @@ class MementoEnvio:
         # Nota: El estado no se restaura automáticamente para evitar inconsistencias
         # Debe ser manejado manualmente si es necesario
     
+    @staticmethod
+    def capturar(envio, descripcion: str = "") -> tuple:
+        """
+        Captura el estado del envío directamente como la tupla de a_tupla()
+        (sin construir el memento)
+        """
+        return (envio.id_envio, envio.remitente, envio.destinatario,
+                envio.direccion_origen, envio.direccion_destino, envio.peso,
+                envio.tipo_envio, envio.descripcion, envio.costo, envio.distancia,
+                envio.es_fragil, envio.requiere_seguro,
+                envio.estado.__class__.__name__ if envio.estado else "Sin estado",
+                _ahora(), descripcion)
+    
+    def a_tupla(self) -> tuple:
+        """Retorna el memento como tupla compacta (para persistencia)"""
+        return (self._id_envio, self._remitente, self._destinatario,
+                self._direccion_origen, self._direccion_destino, self._peso,
+                self._tipo_envio, self._descripcion, self._costo, self._distancia,
+                self._es_fragil, self._requiere_seguro, self._estado_nombre,
+                self._timestamp.timestamp(), self._descripcion_cambio)
+    
+    @classmethod
+    def desde_tupla(cls, datos) -> 'MementoEnvio':
+        """Reconstruye un memento a partir de la tupla de a_tupla()"""
+        memento = cls.__new__(cls)
+        (memento._id_envio, memento._remitente, memento._destinatario,
+         memento._direccion_origen, memento._direccion_destino, memento._peso,
+         memento._tipo_envio, memento._descripcion, memento._costo, memento._distancia,
+         memento._es_fragil, memento._requiere_seguro, memento._estado_nombre,
+         timestamp, memento._descripcion_cambio) = datos
+        memento._timestamp = datetime.fromtimestamp(timestamp)
+        return memento
+    
     def get_resumen(self) -> dict:
         """Retorna un resumen del memento"""
         return {
@@ -80,81 +154,272 @@ class MementoEnvio:
             'descripcion_cambio': self._descripcion_cambio
         }
     
+    def get_campos(self) -> dict:
+        """Retorna todos los campos guardados del envío y el nombre de su estado"""
+        return {
+            'id_envio': self._id_envio,
+            'remitente': self._remitente,
+            'destinatario': self._destinatario,
+            'direccion_origen': self._direccion_origen,
+            'direccion_destino': self._direccion_destino,
+            'peso': self._peso,
+            'tipo_envio': self._tipo_envio,
+            'descripcion': self._descripcion,
+            'costo': self._costo,
+            'distancia': self._distancia,
+            'es_fragil': self._es_fragil,
+            'requiere_seguro': self._requiere_seguro,
+            'estado': self._estado_nombre
+        }
+    
     def __str__(self):
         return (f"Snapshot [{self._timestamp.strftime('%H:%M:%S')}]: "
                 f"{self._id_envio} - {self._estado_nombre} - "
                 f"{self._descripcion_cambio}")
 
 
+def _con_gestor(metodo):
+    """
+    Ejecuta un método del caretaker a través del gestor de memoria configurado
+    (recarga el historial si fue descargado a disco y contabiliza su uso)
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        gestor = self.gestor
+        if gestor is None:
+            return metodo(self, *args, **kwargs)
+        with gestor.usar(self):
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+
+class _MarcasDeTiempo:
+    """Vista de solo lectura de los timestamps de un historial, para bisect"""
+    
+    __slots__ = ('_caretaker',)
+    
+    def __init__(self, caretaker: 'CaretakerEnvio'):
+        self._caretaker = caretaker
+    
+    def __len__(self) -> int:
+        return self._caretaker._total
+    
+    def __getitem__(self, indice: int) -> float:
+        return self._caretaker._entrada(indice)[1]
+
+
 class CaretakerEnvio:
     """
     Caretaker que gestiona el historial de mementos de un envío
+    Guarda el historial en un buffer circular de capacidad fija. Cada paso guarda
+    solo los campos que cambiaron respecto del anterior, salvo cada
+    INTERVALO_CHECKPOINT pasos, que guardan el estado completo; así reconstruir
+    cualquier paso recorre a lo sumo ese número de entradas. El primer paso del
+    buffer siempre es completo
     """
     
+    INTERVALO_CHECKPOINT = 10  # Pasos entre estados completos
+    
+    # Gestor de memoria compartido por todos los historiales (None: sin límite global)
+    gestor = None
+    
     def __init__(self):
-        self._historial: List[MementoEnvio] = []
-        self._indice_actual: int = -1
         self._max_historial: int = 50  # Límite de snapshots guardados
+        # Entradas planas: (None, timestamp, descripción, *campos) para estados completos
+        # y (índices, timestamp, descripción, *valores cambiados) para deltas.
+        # El buffer crece hasta _max_historial y a partir de ahí se reutiliza en círculo
+        self._buffer: List[tuple] = []
+        self._inicio: int = 0  # Posición del buffer del paso más antiguo
+        self._total: int = 0
+        self._indice_actual: int = -1
+        # Campos del paso actual (base de los deltas) y pasos desde su estado completo
+        self._campos_actuales: Optional[tuple] = None
+        self._desde_checkpoint: int = 0
+        # Datos del gestor de memoria: clave en el almacén de descarga y lock de uso
+        self._clave: Optional[int] = None
+        self._lock = None
     
-    def guardar(self, memento: MementoEnvio):
-        """Guarda un nuevo memento en el historial"""
-        # Si estamos en medio del historial (después de deshacer), 
-        # eliminamos los estados futuros
-        if self._indice_actual < len(self._historial) - 1:
-            self._historial = self._historial[:self._indice_actual + 1]
+    def _entrada(self, indice: int) -> tuple:
+        """Retorna la entrada del paso `indice` (0 = más antiguo)"""
+        return self._buffer[(self._inicio + indice) % self._max_historial]
+    
+    def _reconstruir(self, indice: int) -> Tuple[tuple, int]:
+        """Retorna los campos completos del paso `indice` y su distancia al último estado completo"""
+        deltas = []
+        while True:
+            entrada = self._entrada(indice)
+            if entrada[0] is None:
+                break
+            deltas.append(entrada)
+            indice -= 1
+        
+        campos = list(entrada[3:])
+        for delta in reversed(deltas):
+            for posicion, valor in zip(delta[0], delta[3:]):
+                campos[posicion] = valor
+        return tuple(campos), len(deltas)
+    
+    def _pasos(self):
+        """Recorre los pasos del más antiguo al más reciente como (campos, timestamp, descripción)"""
+        return self._recorrer(self._entrada(indice) for indice in range(self._total))
+    
+    @staticmethod
+    def _recorrer(entradas):
+        """Reconstruye los pasos de una secuencia de entradas ordenada (la primera es completa)"""
+        campos = None
+        for entrada in entradas:
+            if entrada[0] is None:
+                campos = list(entrada[3:])
+            else:
+                for posicion, valor in zip(entrada[0], entrada[3:]):
+                    campos[posicion] = valor
+            yield tuple(campos), entrada[1], entrada[2]
+    
+    @staticmethod
+    def _a_memento(campos: tuple, timestamp: float, descripcion: str) -> MementoEnvio:
+        return MementoEnvio.desde_tupla(campos + (timestamp, descripcion))
+    
+    def _anexar(self, campos: tuple, timestamp: float, descripcion: str):
+        """Agrega un paso después del actual, descartando los pasos rehacibles"""
+        # Si estamos en medio del historial (después de deshacer),
+        # los estados futuros se descartan sin mover datos
+        self._total = self._indice_actual + 1
+        
+        if self._campos_actuales is None or self._desde_checkpoint + 1 >= self.INTERVALO_CHECKPOINT:
+            entrada = (None, timestamp, descripcion) + campos
+            self._desde_checkpoint = 0
+        else:
+            posiciones = bytes(posicion for posicion, (valor, anterior)
+                               in enumerate(zip(campos, self._campos_actuales)) if valor != anterior)
+            # Los mismos campos cambian una y otra vez: se comparte un único objeto de índices
+            posiciones = _POSICIONES.setdefault(posiciones, posiciones)
+            entrada = (posiciones, timestamp, descripcion) + tuple(campos[posicion] for posicion in posiciones)
+            self._desde_checkpoint += 1
         
-        self._historial.append(memento)
+        # Limitar el tamaño del historial: se sobrescribe el paso más antiguo
+        if self._total == self._max_historial:
+            siguiente = self._entrada(1)
+            if siguiente[0] is not None:
+                # El nuevo paso más antiguo debe ser un estado completo
+                self._buffer[(self._inicio + 1) % self._max_historial] = (
+                    (None, siguiente[1], siguiente[2]) + self._reconstruir(1)[0])
+            self._inicio = (self._inicio + 1) % self._max_historial
+            self._total -= 1
+            self._indice_actual -= 1
         
-        # Limitar el tamaño del historial
-        if len(self._historial) > self._max_historial:
-            self._historial.pop(0)
+        posicion = (self._inicio + self._total) % self._max_historial
+        if posicion == len(self._buffer):
+            self._buffer.append(entrada)
         else:
-            self._indice_actual += 1
+            self._buffer[posicion] = entrada
+        self._total += 1
+        self._indice_actual += 1
+        self._campos_actuales = campos
+    
+    @property
+    def descargado(self) -> bool:
+        """True si el historial está en el almacén en disco del gestor"""
+        return self._buffer is None
+    
+    def tamano_estimado(self) -> int:
+        """
+        Bytes aproximados que ocupa el historial en memoria: el buffer, cada entrada
+        y sus textos y números (direcciones, nombres, timestamp, costo...). Los índices
+        de los deltas se comparten entre historiales y True/False/None son únicos,
+        por lo que no se cuentan
+        """
+        if self._buffer is None:
+            return 0
+        return sys.getsizeof(self._buffer) + sum(
+            sys.getsizeof(entrada) + sum(sys.getsizeof(valor) for valor in entrada[1:]
+                                         if type(valor) in _TIPOS_CONTADOS)
+            for entrada in self._buffer)
+    
+    def descargar(self) -> bytes:
+        """Libera las entradas del historial y las retorna serializadas"""
+        datos = marshal.dumps((self._buffer, self._campos_actuales))
+        self._buffer = None
+        self._campos_actuales = None
+        return datos
+    
+    def cargar(self, datos: bytes):
+        """Restaura las entradas serializadas por descargar()"""
+        self._buffer, self._campos_actuales = marshal.loads(datos)
+    
+    @_con_gestor
+    def guardar(self, memento: MementoEnvio):
+        """Guarda un nuevo memento en el historial"""
+        datos = memento.a_tupla()
+        self._anexar(datos[:-2], datos[-2], datos[-1])
         
-        print(f"💾 Snapshot guardado: {memento.get_descripcion_cambio()}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("💾 Snapshot guardado: %s", memento.get_descripcion_cambio())
+    
+    def _mover_a(self, indice: int) -> MementoEnvio:
+        """Fija el paso actual y retorna su memento"""
+        self._indice_actual = indice
+        self._campos_actuales, self._desde_checkpoint = self._reconstruir(indice)
+        entrada = self._entrada(indice)
+        return self._a_memento(self._campos_actuales, entrada[1], entrada[2])
     
+    @_con_gestor
     def deshacer(self) -> Optional[MementoEnvio]:
         """Retorna el memento anterior en el historial"""
         if self._indice_actual > 0:
-            self._indice_actual -= 1
-            memento = self._historial[self._indice_actual]
-            print(f"↩️ Deshaciendo al estado: {memento.get_descripcion_cambio()}")
+            memento = self._mover_a(self._indice_actual - 1)
+            log.info("↩️ Deshaciendo al estado: %s", memento.get_descripcion_cambio())
             return memento
         else:
-            print("⚠️ No hay más cambios que deshacer")
+            log.info("⚠️ No hay más cambios que deshacer")
             return None
     
+    @_con_gestor
     def rehacer(self) -> Optional[MementoEnvio]:
         """Retorna el memento siguiente en el historial"""
-        if self._indice_actual < len(self._historial) - 1:
-            self._indice_actual += 1
-            memento = self._historial[self._indice_actual]
-            print(f"↪️ Rehaciendo al estado: {memento.get_descripcion_cambio()}")
+        if self._indice_actual < self._total - 1:
+            memento = self._mover_a(self._indice_actual + 1)
+            log.info("↪️ Rehaciendo al estado: %s", memento.get_descripcion_cambio())
             return memento
         else:
-            print("⚠️ No hay más cambios que rehacer")
+            log.info("⚠️ No hay más cambios que rehacer")
+            return None
+    
+    @_con_gestor
+    def estado_en(self, momento: float) -> Optional[MementoEnvio]:
+        """
+        Retorna el memento vigente en el instante dado (timestamp en segundos):
+        el último paso guardado hasta ese momento, o None si es anterior al historial.
+        Busca por bisección y no mueve la posición de deshacer/rehacer
+        """
+        indice = bisect.bisect_right(_MarcasDeTiempo(self), momento) - 1
+        if indice < 0:
             return None
+        campos, _ = self._reconstruir(indice)
+        entrada = self._entrada(indice)
+        return self._a_memento(campos, entrada[1], entrada[2])
     
+    @_con_gestor
     def get_historial_completo(self) -> List[dict]:
         """Retorna el historial completo de cambios"""
-        return [memento.get_resumen() for memento in self._historial]
+        return [self._a_memento(*paso).get_resumen() for paso in self._pasos()]
     
+    @_con_gestor
     def mostrar_historial(self):
         """Muestra el historial de cambios de forma legible"""
-        print(f"\n{'='*80}")
-        print(f"HISTORIAL DE CAMBIOS DEL ENVÍO")
-        print(f"{'='*80}")
+        log.info("\n%s", SEPARADOR)
+        log.info("HISTORIAL DE CAMBIOS DEL ENVÍO")
+        log.info(SEPARADOR)
         
-        if not self._historial:
-            print("No hay cambios registrados")
+        if not self._total:
+            log.info("No hay cambios registrados")
         else:
-            for i, memento in enumerate(self._historial):
+            for i, paso in enumerate(self._pasos()):
                 marcador = "→ " if i == self._indice_actual else "  "
-                print(f"{marcador}{i+1}. {memento}")
+                log.info("%s%s. %s", marcador, i+1, self._a_memento(*paso))
         
-        print(f"{'='*80}")
-        print(f"Posición actual: {self._indice_actual + 1}/{len(self._historial)}")
-        print(f"{'='*80}\n")
+        log.info(SEPARADOR)
+        log.info("Posición actual: %s/%s", self._indice_actual + 1, self._total)
+        log.info("%s\n", SEPARADOR)
     
     def puede_deshacer(self) -> bool:
         """Verifica si se puede deshacer"""
@@ -162,23 +427,115 @@ class CaretakerEnvio:
     
     def puede_rehacer(self) -> bool:
         """Verifica si se puede rehacer"""
-        return self._indice_actual < len(self._historial) - 1
+        return self._indice_actual < self._total - 1
     
     def get_total_cambios(self) -> int:
         """Retorna el total de cambios registrados"""
-        return len(self._historial)
+        return self._total
+    
+    @_con_gestor
+    def exportar(self) -> dict:
+        """Exporta el historial y la posición actual (para persistencia)"""
+        return self.exportar_captura(self.capturar())
+    
+    @_con_gestor
+    def capturar(self) -> tuple:
+        """
+        Copia ligera del historial en este instante: las entradas (tuplas inmutables)
+        en orden y la posición actual. Exportarla con exportar_captura() da el mismo
+        resultado que exportar() en el momento de la captura, aunque el historial
+        cambie entretanto
+        """
+        return tuple(self._entrada(indice) for indice in range(self._total)), self._indice_actual
+    
+    @classmethod
+    def exportar_captura(cls, captura: tuple) -> dict:
+        """Exporta como exportar() una captura hecha con capturar()"""
+        entradas, indice_actual = captura
+        return {
+            'indice_actual': indice_actual,
+            'mementos': [campos + (timestamp, descripcion)
+                         for campos, timestamp, descripcion in cls._recorrer(entradas)]
+        }
+    
+    @classmethod
+    def importar(cls, datos: dict) -> 'CaretakerEnvio':
+        """Reconstruye un caretaker a partir de los datos de exportar()"""
+        caretaker = cls()
+        for memento in datos['mementos']:
+            memento = tuple(memento)
+            caretaker._anexar(memento[:-2], memento[-2], memento[-1])
+        if caretaker._total:
+            caretaker._mover_a(datos['indice_actual'])
+        if cls.gestor is not None:
+            # Contabilizar el historial restaurado aunque no se vuelva a usar
+            with cls.gestor.usar(caretaker):
+                pass
+        return caretaker
 
 
 class OriginadorEnvio:
     """
     Originador que crea y restaura mementos del envío
+    El historial es perezoso: al crear el originador solo se captura el estado
+    inicial como tupla, y el caretaker se construye la primera vez que se
+    necesita (un cambio, deshacer, rehacer o consultar el historial)
     """
     
-    def __init__(self, envio):
+    __slots__ = ('envio', '_caretaker', '_inicial')
+    
+    # Protege la construcción del caretaker (ocurre una sola vez por envío)
+    _lock = threading.Lock()
+    
+    def __init__(self, envio, caretaker: Optional[CaretakerEnvio] = None,
+                 descripcion_inicial: str = "Estado inicial"):
         self.envio = envio
-        self.caretaker = CaretakerEnvio()
-        # Guardar estado inicial
-        self.crear_snapshot("Estado inicial")
+        # Historial restaurado (ej. desde almacenamiento persistente) o estado inicial compacto
+        self._caretaker = caretaker
+        self._inicial = None if caretaker is not None else MementoEnvio.capturar(envio, descripcion_inicial)
+    
+    @property
+    def caretaker(self) -> CaretakerEnvio:
+        """Caretaker del historial (se construye con el estado inicial al primer uso)"""
+        if self._caretaker is None:
+            with self._lock:
+                if self._caretaker is None:
+                    caretaker = CaretakerEnvio()
+                    caretaker.guardar(MementoEnvio.desde_tupla(self._inicial))
+                    self._caretaker = caretaker
+                    self._inicial = None
+        return self._caretaker
+    
+    def exportar_historial(self) -> dict:
+        """Exporta el historial como CaretakerEnvio.exportar(), sin construirlo si no hace falta"""
+        inicial = self._inicial
+        if self._caretaker is None and inicial is not None:
+            return {'indice_actual': 0, 'mementos': [inicial]}
+        return self.caretaker.exportar()
+    
+    def capturar_historial(self):
+        """
+        Captura el historial sin exportarlo (ver CaretakerEnvio.capturar); el trabajo
+        de exportarlo se deja para exportar_captura(), por ejemplo en otro hilo
+        """
+        inicial = self._inicial
+        if self._caretaker is None and inicial is not None:
+            return {'indice_actual': 0, 'mementos': [inicial]}
+        return self.caretaker.capturar()
+    
+    @staticmethod
+    def exportar_captura(captura) -> dict:
+        """Exporta como exportar_historial() una captura de capturar_historial()"""
+        if isinstance(captura, dict):
+            return captura
+        return CaretakerEnvio.exportar_captura(captura)
+    
+    def estado_en(self, momento: float) -> Optional[MementoEnvio]:
+        """Memento vigente en el instante dado (ver CaretakerEnvio.estado_en), sin construir el historial"""
+        inicial = self._inicial
+        if self._caretaker is None and inicial is not None:
+            return MementoEnvio.desde_tupla(inicial) if inicial[-2] <= momento else None
+        return self.caretaker.estado_en(momento)
     
     def crear_snapshot(self, descripcion: str = "Cambio sin descripción"):
         """Crea un snapshot del estado actual"""
@@ -191,7 +548,7 @@ class OriginadorEnvio:
         memento = self.caretaker.deshacer()
         if memento:
             memento.restaurar_en(self.envio)
-            print(f"✅ Cambios deshechos exitosamente")
+            log.info("✅ Cambios deshechos exitosamente")
             return True
         return False
     
@@ -200,7 +557,7 @@ class OriginadorEnvio:
         memento = self.caretaker.rehacer()
         if memento:
             memento.restaurar_en(self.envio)
-            print(f"✅ Cambios rehechos exitosamente")
+            log.info("✅ Cambios rehechos exitosamente")
             return True
         return False
     
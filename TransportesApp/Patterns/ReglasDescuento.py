@@ -0,0 +1,150 @@
+# Patterns/ReglasDescuento.py
+"""
+Motor de reglas de descuento declarativas
+Las reglas se leen de un archivo JSON (por defecto reglas_descuento.json junto a este
+módulo, o la ruta de TRANSPORTES_REGLAS_DESCUENTO) y se compilan una sola vez en una
+tabla de decisión: por cada regla, los umbrales ordenados y el porcentaje de cada
+intervalo. Evaluar un envío es una búsqueda por regla; un lote se evalúa con NumPy
+"""
+import json
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+RUTA_POR_DEFECTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reglas_descuento.json")
+
+CAMPOS_NUMERICOS = ("peso", "distancia", "costo")
+CAMPOS_CATEGORICOS = ("tipo_envio",)
+
+
+class ReglaCompilada:
+    """
+    Una regla de la tabla de decisión: en cada regla se aplica como máximo un tramo,
+    el primero (en el orden del archivo) cuya condición se cumpla
+    """
+
+    def __init__(self, nombre: str, campo: str, tramos: List[dict]):
+        self.nombre = nombre
+        self.campo = campo
+        self.categorica = campo in CAMPOS_CATEGORICOS
+
+        if self.categorica:
+            # valor -> (porcentaje, descripción); el primer tramo de cada valor gana
+            self.por_valor: Dict[str, Tuple[float, str]] = {}
+            for tramo in tramos:
+                self.por_valor.setdefault(tramo['igual_a'], (tramo['porcentaje'], tramo['descripcion']))
+            return
+
+        # Umbrales ordenados: el intervalo i contiene los valores v con
+        # umbrales[i-1] < v <= umbrales[i]; se precalcula el tramo que gana en cada uno
+        self.umbrales = sorted({tramo['mayor_que'] for tramo in tramos})
+        self.intervalos: List[Tuple[float, str]] = []
+        for indice in range(len(self.umbrales) + 1):
+            superados = self.umbrales[:indice]
+            ganador = next((tramo for tramo in tramos if tramo['mayor_que'] in superados), None)
+            self.intervalos.append((ganador['porcentaje'], ganador['descripcion']) if ganador else (0.0, ""))
+
+    def evaluar(self, valor) -> Tuple[float, str]:
+        """Retorna (porcentaje, descripción) del tramo aplicable; (0.0, "") si ninguno"""
+        if self.categorica:
+            return self.por_valor.get(valor, (0.0, ""))
+        return self.intervalos[bisect_left(self.umbrales, valor)]
+
+    def porcentajes(self, valores):
+        """Porcentaje aplicable a cada elemento de un arreglo (NumPy)"""
+        import numpy as np
+
+        if self.categorica:
+            return np.fromiter((self.por_valor.get(valor, (0.0, ""))[0] for valor in valores),
+                               dtype=np.float64, count=len(valores))
+        tabla = np.array([porcentaje for porcentaje, _ in self.intervalos], dtype=np.float64)
+        return tabla[np.searchsorted(np.array(self.umbrales, dtype=np.float64), valores, side='left')]
+
+
+class MotorDescuentos:
+    """Tabla de decisión de descuentos compilada a partir de reglas declarativas"""
+
+    _por_defecto: Optional['MotorDescuentos'] = None
+    _lock = threading.Lock()
+
+    def __init__(self, configuracion: dict):
+        """
+        Args:
+            configuracion: {"reglas": [{"nombre", "campo", "tramos": [...]}, ...]}.
+                           Cada tramo lleva "porcentaje", "descripcion" y una condición:
+                           "mayor_que" (campos numéricos) o "igual_a" (tipo_envio)
+        """
+        self.reglas = [self._compilar(regla) for regla in configuracion['reglas']]
+
+    @staticmethod
+    def _compilar(regla: dict) -> ReglaCompilada:
+        """Valida una regla del archivo y la compila"""
+        campo = regla.get('campo')
+        if campo not in CAMPOS_NUMERICOS + CAMPOS_CATEGORICOS:
+            raise ValueError(f"Regla '{regla.get('nombre')}': campo '{campo}' no soportado")
+
+        condicion = 'igual_a' if campo in CAMPOS_CATEGORICOS else 'mayor_que'
+        for tramo in regla['tramos']:
+            faltantes = {condicion, 'porcentaje', 'descripcion'} - set(tramo)
+            if faltantes:
+                raise ValueError(f"Regla '{regla.get('nombre')}': faltan {', '.join(sorted(faltantes))} en un tramo")
+
+        return ReglaCompilada(regla['nombre'], campo, regla['tramos'])
+
+    @classmethod
+    def desde_archivo(cls, ruta: str) -> 'MotorDescuentos':
+        """Carga y compila las reglas de un archivo JSON"""
+        with open(ruta, "r", encoding="utf-8") as archivo:
+            return cls(json.load(archivo))
+
+    @classmethod
+    def por_defecto(cls) -> 'MotorDescuentos':
+        """Motor compartido con las reglas configuradas (se compila una sola vez)"""
+        if cls._por_defecto is None:
+            with cls._lock:
+                if cls._por_defecto is None:
+                    cls._por_defecto = cls.desde_archivo(
+                        os.environ.get('TRANSPORTES_REGLAS_DESCUENTO') or RUTA_POR_DEFECTO)
+        return cls._por_defecto
+
+    def evaluar(self, envio) -> Tuple[float, List[Tuple[str, float, float]]]:
+        """
+        Calcula el descuento de un envío
+
+        Returns:
+            (descuento total, [(descripción, porcentaje, monto) de cada descuento aplicado])
+        """
+        descuento_total = 0.0
+        aplicados = []
+        for regla in self.reglas:
+            porcentaje, descripcion = regla.evaluar(getattr(envio, regla.campo))
+            if porcentaje:
+                monto = envio.costo * porcentaje
+                descuento_total += monto
+                aplicados.append((descripcion, porcentaje, monto))
+        return descuento_total, aplicados
+
+    def evaluar_lote(self, columnas: Dict[str, Sequence]):
+        """
+        Calcula el descuento total de muchos envíos con NumPy
+
+        Args:
+            columnas: Arreglos por campo; requiere "costo" y los campos usados por las reglas
+        """
+        import numpy as np
+
+        costo = np.asarray(columnas['costo'], dtype=np.float64)
+        descuento_total = np.zeros(len(costo), dtype=np.float64)
+        # Se suma regla por regla, en el mismo orden que evaluar()
+        for regla in self.reglas:
+            valores = columnas[regla.campo]
+            if not regla.categorica:
+                valores = np.asarray(valores, dtype=np.float64)
+            descuento_total += costo * regla.porcentajes(valores)
+        return descuento_total
+
+    def evaluar_envios(self, envios: Sequence):
+        """Calcula el descuento total de una lista de envíos con NumPy"""
+        campos = {'costo'} | {regla.campo for regla in self.reglas}
+        return self.evaluar_lote({campo: [getattr(envio, campo) for envio in envios] for campo in campos})
@@ -5,7 +5,15 @@ Estados: Pendiente -> En Proceso -> En Tránsito -> En Distribución -> Entregad
 También puede pasar a Cancelado desde cualquier estado antes de Entregado
 """
 from abc import ABC, abstractmethod
+import logging
 from datetime import datetime
+from typing import List, Tuple
+
+from Utils.Bitacora import obtener_logger, evento
+
+log = obtener_logger(__name__)
+
+SEPARADOR = "=" * 60
 
 class EstadoEnvio(ABC):
     """Clase base abstracta para los estados del envío"""
@@ -35,16 +43,16 @@ class EstadoPendiente(EstadoEnvio):
     """Estado inicial: el envío ha sido registrado pero no procesado"""
     
     def procesar(self, envio):
-        print(f"📋 Envío {envio.id_envio} está PENDIENTE de validación")
+        log.info("📋 Envío %s está PENDIENTE de validación", envio.id_envio)
         return "El envío ha sido registrado y está pendiente de validación"
     
     def siguiente(self, envio):
-        print(f"🔄 Cambiando estado: Pendiente → En Proceso")
+        log.debug("🔄 Cambiando estado: Pendiente → En Proceso")
         envio.estado = EstadoEnProceso()
         return "Envío pasado a procesamiento"
     
     def cancelar(self, envio):
-        print(f"❌ Cancelando envío desde estado Pendiente")
+        log.debug("❌ Cancelando envío desde estado Pendiente")
         envio.estado = EstadoCancelado()
         return "Envío cancelado desde estado Pendiente"
     
@@ -56,19 +64,19 @@ class EstadoEnProceso(EstadoEnvio):
     """El envío está siendo procesado y preparado"""
     
     def procesar(self, envio):
-        print(f"⚙️ Envío {envio.id_envio} está EN PROCESO")
-        print(f"   - Verificando documentación")
-        print(f"   - Preparando empaque")
-        print(f"   - Asignando ruta de entrega")
+        log.info("⚙️ Envío %s está EN PROCESO", envio.id_envio)
+        log.info("   - Verificando documentación")
+        log.info("   - Preparando empaque")
+        log.info("   - Asignando ruta de entrega")
         return "El envío está siendo procesado y preparado para transporte"
     
     def siguiente(self, envio):
-        print(f"🔄 Cambiando estado: En Proceso → En Tránsito")
+        log.debug("🔄 Cambiando estado: En Proceso → En Tránsito")
         envio.estado = EstadoEnTransito()
         return "Envío despachado y en tránsito"
     
     def cancelar(self, envio):
-        print(f"❌ Cancelando envío desde estado En Proceso")
+        log.debug("❌ Cancelando envío desde estado En Proceso")
         envio.estado = EstadoCancelado()
         return "Envío cancelado durante el procesamiento"
     
@@ -80,19 +88,19 @@ class EstadoEnTransito(EstadoEnvio):
     """El envío está en camino al destino"""
     
     def procesar(self, envio):
-        print(f"🚚 Envío {envio.id_envio} está EN TRÁNSITO")
-        print(f"   - Ubicación actual: En ruta")
-        print(f"   - Distancia aproximada: {envio.distancia} km")
-        print(f"   - Tipo de servicio: {envio.tipo_envio}")
+        log.info("🚚 Envío %s está EN TRÁNSITO", envio.id_envio)
+        log.info("   - Ubicación actual: En ruta")
+        log.info("   - Distancia aproximada: %s km", envio.distancia)
+        log.info("   - Tipo de servicio: %s", envio.tipo_envio)
         return "El envío está en camino al centro de distribución de destino"
     
     def siguiente(self, envio):
-        print(f"🔄 Cambiando estado: En Tránsito → En Distribución")
+        log.debug("🔄 Cambiando estado: En Tránsito → En Distribución")
         envio.estado = EstadoEnDistribucion()
         return "Envío llegó al centro de distribución"
     
     def cancelar(self, envio):
-        print(f"⚠️ Envío en tránsito - se requiere coordinación especial para cancelar")
+        log.debug("⚠️ Envío en tránsito - se requiere coordinación especial para cancelar")
         envio.estado = EstadoCancelado()
         return "Envío cancelado - se realizará devolución al origen"
     
@@ -104,19 +112,19 @@ class EstadoEnDistribucion(EstadoEnvio):
     """El envío está en el centro de distribución local para entrega final"""
     
     def procesar(self, envio):
-        print(f"📦 Envío {envio.id_envio} está EN DISTRIBUCIÓN LOCAL")
-        print(f"   - Centro de distribución: Ciudad de destino")
-        print(f"   - Preparando ruta de reparto")
-        print(f"   - Destinatario: {envio.destinatario}")
+        log.info("📦 Envío %s está EN DISTRIBUCIÓN LOCAL", envio.id_envio)
+        log.info("   - Centro de distribución: Ciudad de destino")
+        log.info("   - Preparando ruta de reparto")
+        log.info("   - Destinatario: %s", envio.destinatario)
         return "El envío está en el centro de distribución local, listo para entrega"
     
     def siguiente(self, envio):
-        print(f"🔄 Cambiando estado: En Distribución → Entregado")
+        log.debug("🔄 Cambiando estado: En Distribución → Entregado")
         envio.estado = EstadoEntregado()
         return "¡Envío entregado exitosamente!"
     
     def cancelar(self, envio):
-        print(f"⚠️ Cancelación en última etapa - se contactará al destinatario")
+        log.debug("⚠️ Cancelación en última etapa - se contactará al destinatario")
         envio.estado = EstadoCancelado()
         return "Envío cancelado - disponible para devolución o recogida"
     
@@ -128,10 +136,10 @@ class EstadoEntregado(EstadoEnvio):
     """Estado final: el envío ha sido entregado al destinatario"""
     
     def procesar(self, envio):
-        print(f"✅ Envío {envio.id_envio} fue ENTREGADO")
-        print(f"   - Destinatario: {envio.destinatario}")
-        print(f"   - Dirección: {envio.direccion_destino}")
-        print(f"   - Fecha de entrega: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        log.info("✅ Envío %s fue ENTREGADO", envio.id_envio)
+        log.info("   - Destinatario: %s", envio.destinatario)
+        log.info("   - Dirección: %s", envio.direccion_destino)
+        log.info("   - Fecha de entrega: %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         return "El envío ha sido entregado satisfactoriamente al destinatario"
     
     def siguiente(self, envio):
@@ -148,9 +156,9 @@ class EstadoCancelado(EstadoEnvio):
     """Estado terminal: el envío ha sido cancelado"""
     
     def procesar(self, envio):
-        print(f"🚫 Envío {envio.id_envio} ha sido CANCELADO")
-        print(f"   - Fecha de cancelación: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"   - Se procederá según políticas de devolución")
+        log.info("🚫 Envío %s ha sido CANCELADO", envio.id_envio)
+        log.info("   - Fecha de cancelación: %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        log.info("   - Se procederá según políticas de devolución")
         return "El envío ha sido cancelado"
     
     def siguiente(self, envio):
@@ -163,23 +171,44 @@ class EstadoCancelado(EstadoEnvio):
         return "Cancelado"
 
 
+# Estados indexados por nombre de clase (para restaurar envíos persistidos)
+ESTADOS = {
+    estado.__name__: estado
+    for estado in (EstadoPendiente, EstadoEnProceso, EstadoEnTransito,
+                   EstadoEnDistribucion, EstadoEntregado, EstadoCancelado)
+}
+
+# Código numérico compacto de cada estado (para almacenamiento columnar)
+CODIGOS_ESTADO = {nombre: codigo for codigo, nombre in enumerate(ESTADOS)}
+
+# Transiciones que se pueden aplicar en lote
+ACCIONES_LOTE = ("siguiente", "cancelar")
+
+
 class GestorEstadoEnvio:
     """Clase auxiliar para gestionar los estados del envío"""
     
+    @staticmethod
+    def restaurar_estado(envio, nombre_estado: str):
+        """Asigna al envío el estado guardado con el nombre de clase dado"""
+        clase_estado = ESTADOS.get(nombre_estado)
+        envio.estado = clase_estado() if clase_estado else None
+    
     @staticmethod
     def inicializar_envio(envio):
         """Inicializa un envío en estado Pendiente"""
         envio.estado = EstadoPendiente()
-        print(f"🆕 Envío {envio.id_envio} inicializado en estado: {envio.estado.get_descripcion()}")
+        evento(log, logging.DEBUG, "estado_inicializado", "🆕 Envío %s inicializado en estado: %s",
+               envio.id_envio, envio.estado.get_descripcion(), id_envio=envio.id_envio)
     
     @staticmethod
     def mostrar_estado_actual(envio):
         """Muestra el estado actual del envío"""
-        print(f"\n{'='*60}")
-        print(f"ESTADO ACTUAL DEL ENVÍO: {envio.id_envio}")
-        print(f"{'='*60}")
+        log.info("\n%s", SEPARADOR)
+        log.info("ESTADO ACTUAL DEL ENVÍO: %s", envio.id_envio)
+        log.info(SEPARADOR)
         mensaje = envio.estado.procesar(envio)
-        print(f"{'='*60}\n")
+        log.info("%s\n", SEPARADOR)
         return mensaje
     
     @staticmethod
@@ -188,10 +217,43 @@ class GestorEstadoEnvio:
         estado_anterior = envio.estado.get_descripcion()
         mensaje = envio.estado.siguiente(envio)
         estado_nuevo = envio.estado.get_descripcion()
-        print(f"📊 Estado actualizado: {estado_anterior} → {estado_nuevo}")
+        log.info("📊 Estado actualizado: %s → %s", estado_anterior, estado_nuevo)
         return mensaje
     
     @staticmethod
     def cancelar_envio(envio):
         """Cancela el envío"""
         return envio.estado.cancelar(envio)
+    
+    @staticmethod
+    def transicionar_lote(envios, accion: str) -> List[Tuple[object, bool, str]]:
+        """
+        Aplica la misma transición a varios envíos en una sola pasada
+        
+        Args:
+            envios: Envíos a transicionar
+            accion: "siguiente" o "cancelar"
+            
+        Returns:
+            Una tupla (envío, cambió de estado, mensaje) por envío
+        """
+        if accion not in ACCIONES_LOTE:
+            raise ValueError(f"Acción '{accion}' no válida. Acciones válidas: {', '.join(ACCIONES_LOTE)}")
+        
+        resultados = []
+        for envio in envios:
+            estado = envio.estado
+            if estado is None:
+                resultados.append((envio, False, "El envío no tiene estado"))
+                continue
+            
+            if accion == "siguiente":
+                mensaje = estado.siguiente(envio)
+            else:
+                mensaje = estado.cancelar(envio)
+            resultados.append((envio, envio.estado is not estado, mensaje))
+        
+        cambiados = sum(1 for _, cambio, _ in resultados if cambio)
+        log.debug("📊 Transición en lote (%s): %s de %s envíos cambiaron de estado",
+                  accion, cambiados, len(resultados))
+        return resultados
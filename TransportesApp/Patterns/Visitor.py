@@ -4,6 +4,15 @@ Patrón Visitor para calcular costos de diferentes tipos de envíos
 Permite agregar nuevas operaciones sin modificar las clases de envío
 """
 from abc import ABC, abstractmethod
+from typing import Optional
+
+from Patterns.CacheCotizaciones import CacheCotizaciones
+from Patterns.ReglasDescuento import MotorDescuentos
+from Utils.Bitacora import obtener_logger
+
+log = obtener_logger(__name__)
+
+SEPARADOR = "=" * 60
 
 class VisitorEnvio(ABC):
     """Interfaz base para visitantes de envíos"""
@@ -35,20 +44,45 @@ class CalculadorCosto(VisitorEnvio):
     RECARGO_SEGURO = 0.02       # 2% del costo base
     RECARGO_PESO_EXTRA = 2.0    # $2 por kg adicional después de 50kg
     
+    # Cotizaciones memorizadas, compartidas por todas las instancias
+    cache = CacheCotizaciones()
+    
+    def huella_tarifas(self) -> tuple:
+        """Identifica las tarifas vigentes (si cambian, el caché se invalida)"""
+        return (tuple(self.TARIFA_BASE.items()), self.TARIFA_DISTANCIA, self.RECARGO_FRAGIL,
+                self.RECARGO_SEGURO, self.RECARGO_PESO_EXTRA)
+    
     def visit(self, envio) -> float:
-        """Calcula el costo total del envío"""
-        print(f"\n{'='*60}")
-        print(f"CALCULANDO COSTO DEL ENVÍO: {envio.id_envio}")
-        print(f"{'='*60}")
+        """Calcula el costo total del envío (o lo toma del caché de cotizaciones)"""
+        # El caché se usa con cualquier nivel de log; el desglose solo aparece en los fallos
+        clave = (envio.tipo_envio, envio.peso, envio.distancia,
+                 envio.es_fragil, envio.requiere_seguro)
+        huella = self.huella_tarifas()
+        costo_total = self.cache.obtener(clave, huella)
+        if costo_total is None:
+            log.debug("💾 Caché de cotizaciones: fallo para %s", envio.id_envio)
+            costo_total = self._calcular(envio)
+            self.cache.guardar(clave, huella, costo_total)
+        else:
+            log.debug("💾 Caché de cotizaciones: acierto para %s ($%.2f)", envio.id_envio, costo_total)
+        
+        envio.costo = costo_total
+        return costo_total
+    
+    def _calcular(self, envio) -> float:
+        """Aplica las tarifas y recargos al envío"""
+        log.debug("\n%s", SEPARADOR)
+        log.debug("CALCULANDO COSTO DEL ENVÍO: %s", envio.id_envio)
+        log.debug(SEPARADOR)
         
         # Costo base por peso
         tarifa_kg = self.TARIFA_BASE.get(envio.tipo_envio, self.TARIFA_BASE["Estándar"])
         costo_base = envio.peso * tarifa_kg
-        print(f"Costo base ({envio.peso} kg × ${tarifa_kg}/kg): ${costo_base:.2f}")
+        log.debug("Costo base (%s kg × $%s/kg): $%.2f", envio.peso, tarifa_kg, costo_base)
         
         # Costo por distancia
         costo_distancia = envio.distancia * self.TARIFA_DISTANCIA
-        print(f"Costo por distancia ({envio.distancia} km × ${self.TARIFA_DISTANCIA}/km): ${costo_distancia:.2f}")
+        log.debug("Costo por distancia (%s km × $%s/km): $%.2f", envio.distancia, self.TARIFA_DISTANCIA, costo_distancia)
         
         costo_total = costo_base + costo_distancia
         
@@ -57,24 +91,23 @@ class CalculadorCosto(VisitorEnvio):
             peso_extra = envio.peso - 50
             recargo_peso = peso_extra * self.RECARGO_PESO_EXTRA
             costo_total += recargo_peso
-            print(f"Recargo por peso extra ({peso_extra} kg × ${self.RECARGO_PESO_EXTRA}/kg): ${recargo_peso:.2f}")
+            log.debug("Recargo por peso extra (%s kg × $%s/kg): $%.2f", peso_extra, self.RECARGO_PESO_EXTRA, recargo_peso)
         
         # Recargo por envío frágil
         if envio.es_fragil:
             costo_total += self.RECARGO_FRAGIL
-            print(f"Recargo por envío frágil: ${self.RECARGO_FRAGIL:.2f}")
+            log.debug("Recargo por envío frágil: $%.2f", self.RECARGO_FRAGIL)
         
         # Recargo por seguro
         if envio.requiere_seguro:
             recargo_seguro = costo_total * self.RECARGO_SEGURO
             costo_total += recargo_seguro
-            print(f"Recargo por seguro ({self.RECARGO_SEGURO*100}%): ${recargo_seguro:.2f}")
+            log.debug("Recargo por seguro (%s%%): $%.2f", self.RECARGO_SEGURO*100, recargo_seguro)
         
-        print(f"{'='*60}")
-        print(f"COSTO TOTAL: ${costo_total:.2f}")
-        print(f"{'='*60}\n")
+        log.debug(SEPARADOR)
+        log.debug("COSTO TOTAL: $%.2f", costo_total)
+        log.debug("%s\n", SEPARADOR)
         
-        envio.costo = costo_total
         return costo_total
 
 
@@ -100,9 +133,9 @@ class CalculadorTiempoEntrega(VisitorEnvio):
     
     def visit(self, envio) -> int:
         """Calcula los días estimados de entrega"""
-        print(f"\n{'='*60}")
-        print(f"CALCULANDO TIEMPO DE ENTREGA: {envio.id_envio}")
-        print(f"{'='*60}")
+        log.debug("\n%s", SEPARADOR)
+        log.debug("CALCULANDO TIEMPO DE ENTREGA: %s", envio.id_envio)
+        log.debug(SEPARADOR)
         
         velocidad = self.VELOCIDAD.get(envio.tipo_envio, self.VELOCIDAD["Estándar"])
         dias_procesamiento = self.DIAS_PROCESAMIENTO.get(envio.tipo_envio, 1)
@@ -110,19 +143,19 @@ class CalculadorTiempoEntrega(VisitorEnvio):
         # Calcular días de tránsito
         dias_transito = int(envio.distancia / velocidad) + 1  # Redondear hacia arriba
         
-        print(f"Días de procesamiento: {dias_procesamiento}")
-        print(f"Días de tránsito ({envio.distancia} km ÷ {velocidad} km/día): {dias_transito}")
+        log.debug("Días de procesamiento: %s", dias_procesamiento)
+        log.debug("Días de tránsito (%s km ÷ %s km/día): %s", envio.distancia, velocidad, dias_transito)
         
         # Días adicionales si es frágil (requiere manejo especial)
         dias_adicionales = 1 if envio.es_fragil else 0
         if dias_adicionales:
-            print(f"Días adicionales (envío frágil): {dias_adicionales}")
+            log.debug("Días adicionales (envío frágil): %s", dias_adicionales)
         
         dias_totales = dias_procesamiento + dias_transito + dias_adicionales
         
-        print(f"{'='*60}")
-        print(f"TIEMPO ESTIMADO DE ENTREGA: {dias_totales} días")
-        print(f"{'='*60}\n")
+        log.debug(SEPARADOR)
+        log.debug("TIEMPO ESTIMADO DE ENTREGA: %s días", dias_totales)
+        log.debug("%s\n", SEPARADOR)
         
         return dias_totales
 
@@ -134,9 +167,9 @@ class GeneradorReporte(VisitorEnvio):
     
     def visit(self, envio) -> str:
         """Genera un reporte completo del envío"""
-        print(f"\n{'='*60}")
-        print(f"GENERANDO REPORTE DETALLADO")
-        print(f"{'='*60}")
+        log.debug("\n%s", SEPARADOR)
+        log.debug("GENERANDO REPORTE DETALLADO")
+        log.debug(SEPARADOR)
         
         reporte = []
         reporte.append(f"\n{'='*80}")
@@ -176,7 +209,7 @@ class GeneradorReporte(VisitorEnvio):
         reporte.append(f"{'='*80}\n")
         
         reporte_completo = "\n".join(reporte)
-        print(reporte_completo)
+        log.debug("%s", reporte_completo)
         
         return reporte_completo
 
@@ -184,44 +217,29 @@ class GeneradorReporte(VisitorEnvio):
 class CalculadorDescuento(VisitorEnvio):
     """
     Visitor que calcula descuentos aplicables al envío
+    Las reglas provienen del motor declarativo (ver Patterns.ReglasDescuento)
     """
     
+    def __init__(self, motor: Optional[MotorDescuentos] = None):
+        self.motor = motor or MotorDescuentos.por_defecto()
+    
     def visit(self, envio) -> float:
         """Calcula el descuento total aplicable"""
-        print(f"\n{'='*60}")
-        print(f"CALCULANDO DESCUENTOS: {envio.id_envio}")
-        print(f"{'='*60}")
-        
-        descuento_total = 0.0
-        
-        # Descuento por volumen (envíos pesados)
-        if envio.peso > 100:
-            descuento_peso = envio.costo * 0.10  # 10% de descuento
-            descuento_total += descuento_peso
-            print(f"Descuento por volumen (peso > 100kg): ${descuento_peso:.2f} (10%)")
-        elif envio.peso > 50:
-            descuento_peso = envio.costo * 0.05  # 5% de descuento
-            descuento_total += descuento_peso
-            print(f"Descuento por volumen (peso > 50kg): ${descuento_peso:.2f} (5%)")
-        
-        # Descuento por distancia larga
-        if envio.distancia > 1000:
-            descuento_distancia = envio.costo * 0.08  # 8% de descuento
-            descuento_total += descuento_distancia
-            print(f"Descuento por distancia larga (>1000km): ${descuento_distancia:.2f} (8%)")
-        
-        # Descuento por servicio económico
-        if envio.tipo_envio == "Económico":
-            descuento_economico = envio.costo * 0.05  # 5% de descuento adicional
-            descuento_total += descuento_economico
-            print(f"Descuento por servicio económico: ${descuento_economico:.2f} (5%)")
+        log.debug("\n%s", SEPARADOR)
+        log.debug("CALCULANDO DESCUENTOS: %s", envio.id_envio)
+        log.debug(SEPARADOR)
+        
+        descuento_total, aplicados = self.motor.evaluar(envio)
+        
+        for descripcion, porcentaje, monto in aplicados:
+            log.debug("%s: $%.2f (%g%%)", descripcion, monto, porcentaje * 100)
         
         if descuento_total == 0:
-            print("No hay descuentos aplicables")
+            log.debug("No hay descuentos aplicables")
         
-        print(f"{'='*60}")
-        print(f"DESCUENTO TOTAL: ${descuento_total:.2f}")
-        print(f"COSTO FINAL CON DESCUENTO: ${envio.costo - descuento_total:.2f}")
-        print(f"{'='*60}\n")
+        log.debug(SEPARADOR)
+        log.debug("DESCUENTO TOTAL: $%.2f", descuento_total)
+        log.debug("COSTO FINAL CON DESCUENTO: $%.2f", envio.costo - descuento_total)
+        log.debug("%s\n", SEPARADOR)
         
         return descuento_total
@@ -0,0 +1,127 @@
+# Patterns/VisitorLote.py
+"""
+Versiones vectorizadas (NumPy) de los visitors de envíos
+Aplican las mismas reglas que los visitors de Patterns.Visitor a arreglos de
+envíos completos, en el mismo orden de operaciones para obtener resultados idénticos
+"""
+from typing import Dict, Sequence
+
+import numpy as np
+
+from Models.Envio import CODIGOS_TIPO
+from Patterns.Visitor import CalculadorCosto, CalculadorTiempoEntrega
+
+
+def _por_tipo(tabla: Dict[str, float], defecto: float) -> np.ndarray:
+    """Convierte una tabla tipo -> valor en un arreglo indexado por código de tipo"""
+    valores = np.full(len(CODIGOS_TIPO), defecto, dtype=np.float64)
+    for tipo, codigo in CODIGOS_TIPO.items():
+        valores[codigo] = tabla.get(tipo, defecto)
+    return valores
+
+
+def codigos_tipo(tipos: Sequence[str]) -> np.ndarray:
+    """Convierte nombres de tipo en códigos (-1 para tipos desconocidos)"""
+    return np.fromiter((CODIGOS_TIPO.get(tipo, -1) for tipo in tipos), dtype=np.int8, count=len(tipos))
+
+
+class CalculadorCostoLote:
+    """
+    Calcula el costo de muchos envíos a la vez con las reglas de CalculadorCosto:
+    tarifa por kg según tipo, tarifa por km, recargo por peso sobre 50 kg,
+    recargo fijo por fragilidad y recargo porcentual de seguro sobre el acumulado
+    Las tarifas se leen de CalculadorCosto en cada cálculo
+    """
+
+    def calcular(self, peso: np.ndarray, distancia: np.ndarray, tipo: np.ndarray,
+                 es_fragil: np.ndarray, requiere_seguro: np.ndarray) -> np.ndarray:
+        """
+        Retorna el costo total de cada envío
+
+        Args:
+            peso, distancia: Arreglos float64
+            tipo: Códigos de tipo (Models.Envio.CODIGOS_TIPO); -1 usa la tarifa Estándar
+            es_fragil, requiere_seguro: Arreglos booleanos
+        """
+        peso = np.asarray(peso, dtype=np.float64)
+        distancia = np.asarray(distancia, dtype=np.float64)
+        tipo = np.asarray(tipo)
+
+        tarifas = CalculadorCosto.TARIFA_BASE
+        tarifa_kg = _por_tipo(tarifas, tarifas["Estándar"])
+        tarifa_envio = np.where(tipo >= 0, tarifa_kg[np.maximum(tipo, 0)], tarifas["Estándar"])
+
+        # Mismo orden de operaciones que CalculadorCosto.visit
+        costo_total = peso * tarifa_envio + distancia * CalculadorCosto.TARIFA_DISTANCIA
+
+        pesado = peso > 50
+        costo_total[pesado] += (peso[pesado] - 50) * CalculadorCosto.RECARGO_PESO_EXTRA
+
+        costo_total[np.asarray(es_fragil, dtype=bool)] += CalculadorCosto.RECARGO_FRAGIL
+
+        asegurado = np.asarray(requiere_seguro, dtype=bool)
+        costo_total[asegurado] += costo_total[asegurado] * CalculadorCosto.RECARGO_SEGURO
+
+        return costo_total
+
+    def calcular_envios(self, envios: Sequence, asignar: bool = False) -> np.ndarray:
+        """
+        Calcula el costo de una lista de envíos
+
+        Args:
+            envios: Envíos a cotizar
+            asignar: Si es True guarda el resultado en envio.costo (como el visitor)
+        """
+        cantidad = len(envios)
+        costos = self.calcular(
+            np.fromiter((envio.peso for envio in envios), dtype=np.float64, count=cantidad),
+            np.fromiter((envio.distancia for envio in envios), dtype=np.float64, count=cantidad),
+            codigos_tipo([envio.tipo_envio for envio in envios]),
+            np.fromiter((envio.es_fragil for envio in envios), dtype=bool, count=cantidad),
+            np.fromiter((envio.requiere_seguro for envio in envios), dtype=bool, count=cantidad),
+        )
+        if asignar:
+            for envio, costo in zip(envios, costos.tolist()):
+                envio.costo = costo
+        return costos
+
+
+class CalculadorTiempoEntregaLote:
+    """
+    Calcula los días estimados de entrega de muchos envíos a la vez con las reglas
+    de CalculadorTiempoEntrega: días de procesamiento según tipo, días de tránsito
+    (distancia ÷ velocidad truncada, más uno) y un día adicional si es frágil
+    """
+
+    def calcular(self, distancia: np.ndarray, tipo: np.ndarray, es_fragil: np.ndarray) -> np.ndarray:
+        """
+        Retorna los días de entrega de cada envío (int64)
+
+        Args:
+            distancia: Arreglo float64
+            tipo: Códigos de tipo (Models.Envio.CODIGOS_TIPO); -1 usa los valores Estándar
+            es_fragil: Arreglo booleano
+        """
+        distancia = np.asarray(distancia, dtype=np.float64)
+        tipo = np.asarray(tipo)
+        conocido = tipo >= 0
+        codigo = np.maximum(tipo, 0)
+
+        velocidades = CalculadorTiempoEntrega.VELOCIDAD
+        velocidad = np.where(conocido, _por_tipo(velocidades, velocidades["Estándar"])[codigo],
+                             velocidades["Estándar"])
+        procesamiento = np.where(conocido, _por_tipo(CalculadorTiempoEntrega.DIAS_PROCESAMIENTO, 1)[codigo], 1)
+
+        # int() del visitor trunca hacia cero
+        dias_transito = np.trunc(distancia / velocidad).astype(np.int64) + 1
+
+        return procesamiento.astype(np.int64) + dias_transito + np.asarray(es_fragil, dtype=np.int64)
+
+    def calcular_envios(self, envios: Sequence) -> np.ndarray:
+        """Calcula los días de entrega de una lista de envíos"""
+        cantidad = len(envios)
+        return self.calcular(
+            np.fromiter((envio.distancia for envio in envios), dtype=np.float64, count=cantidad),
+            codigos_tipo([envio.tipo_envio for envio in envios]),
+            np.fromiter((envio.es_fragil for envio in envios), dtype=bool, count=cantidad),
+        )
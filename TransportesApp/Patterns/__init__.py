@@ -2,17 +2,20 @@
 """
 Paquete de patrones de diseño de comportamiento
 """
-from .ChainOfResponsibility import CadenaValidacion
+from .ChainOfResponsibility import CadenaValidacion, PipelineValidacion
 from .State import GestorEstadoEnvio
 from .Memento import OriginadorEnvio
 from .Visitor import CalculadorCosto, CalculadorTiempoEntrega, GeneradorReporte, CalculadorDescuento
+from .ReglasDescuento import MotorDescuentos
 
 __all__ = [
     'CadenaValidacion',
+    'PipelineValidacion',
     'GestorEstadoEnvio',
     'OriginadorEnvio',
     'CalculadorCosto',
     'CalculadorTiempoEntrega',
     'GeneradorReporte',
-    'CalculadorDescuento'
+    'CalculadorDescuento',
+    'MotorDescuentos'
 ]
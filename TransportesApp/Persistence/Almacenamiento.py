@@ -0,0 +1,35 @@
+# Persistence/Almacenamiento.py
+"""
+Interfaz de los backends de almacenamiento del controlador
+"""
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Tuple
+
+
+class AlmacenamientoEnvios(ABC):
+    """
+    Backend de almacenamiento persistente de envíos y sus historiales
+    Las lecturas se sirven desde memoria; el backend solo recibe mutaciones
+    y entrega el contenido completo al arrancar
+    """
+
+    @abstractmethod
+    def guardar(self, envio, originador=None):
+        """
+        Registra el estado actual de un envío (y su historial)
+        El controlador lo llama con el lock del envío tomado
+        """
+        pass
+
+    @abstractmethod
+    def cargar(self) -> Iterator[Tuple[tuple, Optional[dict]]]:
+        """Retorna pares (fila del envío, historial exportado) en orden de creación"""
+        pass
+
+    def vaciar(self):
+        """Espera a que todas las mutaciones pendientes sean escritas"""
+        pass
+
+    def cerrar(self):
+        """Escribe lo pendiente y libera los recursos del backend"""
+        pass
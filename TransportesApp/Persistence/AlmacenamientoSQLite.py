@@ -0,0 +1,239 @@
+# Persistence/AlmacenamientoSQLite.py
+"""
+Backend de almacenamiento SQLite con escritura diferida (write-behind)
+Las mutaciones se encolan sin tocar disco y un hilo escritor las confirma
+en lotes agrupados, de modo que la latencia de las peticiones no depende del disco
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+
+from .Almacenamiento import AlmacenamientoEnvios
+from .Serializacion import COLUMNAS_ENVIO, envio_a_fila
+from Patterns.Memento import OriginadorEnvio
+from Utils.Bitacora import obtener_logger
+
+log = obtener_logger(__name__)
+
+# Marca de fin para el hilo escritor
+_FIN = None
+
+
+class AlmacenamientoSQLite(AlmacenamientoEnvios):
+    """
+    Almacenamiento en SQLite (modo WAL) con una conexión por hilo
+    y una cola de escritura diferida confirmada en lotes
+    """
+
+    # Espera inicial y máxima (segundos) entre reintentos de un lote fallido
+    ESPERA_REINTENTO = 0.05
+    ESPERA_MAXIMA = 5.0
+    # Intentos de escribir lo pendiente al cerrar antes de darlo por perdido
+    REINTENTOS_AL_CERRAR = 5
+
+    def __init__(self, ruta: str, tamano_lote: int = 500, intervalo_lote: float = 0.05,
+                 sincronizacion: str = "NORMAL"):
+        """
+        Args:
+            ruta: Archivo de la base de datos SQLite
+            tamano_lote: Máximo de mutaciones confirmadas en una sola transacción
+            intervalo_lote: Segundos que el escritor espera para completar un lote
+            sincronizacion: Valor de PRAGMA synchronous ("NORMAL" o "FULL")
+        """
+        self.ruta = ruta
+        self.tamano_lote = tamano_lote
+        self.intervalo_lote = intervalo_lote
+        self.sincronizacion = sincronizacion
+
+        self._local = threading.local()
+        self._conexiones = []
+        self._lock_conexiones = threading.Lock()
+
+        self._cola = queue.Queue()
+        self.lotes_escritos = 0
+        self.mutaciones_escritas = 0
+        self.fallos = 0
+        self.ultimo_error: Optional[str] = None
+        self.pendientes = 0
+
+        self._crear_esquema()
+
+        self._escritor = threading.Thread(target=self._escribir_en_segundo_plano,
+                                          name="AlmacenamientoSQLite-escritor", daemon=True)
+        self._escritor.start()
+
+    def _conexion(self) -> sqlite3.Connection:
+        """Retorna la conexión del hilo actual, creándola si no existe"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute(f"PRAGMA synchronous={self.sincronizacion}")
+            self._local.conexion = conexion
+            with self._lock_conexiones:
+                self._conexiones.append(conexion)
+        return conexion
+
+    def _crear_esquema(self):
+        """Crea las tablas si no existen"""
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS envios (
+                    id_envio TEXT PRIMARY KEY,
+                    tipo_envio TEXT NOT NULL,
+                    remitente TEXT,
+                    destinatario TEXT,
+                    direccion_origen TEXT,
+                    direccion_destino TEXT,
+                    peso REAL,
+                    descripcion TEXT,
+                    fecha_creacion REAL,
+                    estado TEXT,
+                    costo REAL,
+                    distancia REAL,
+                    es_fragil INTEGER,
+                    requiere_seguro INTEGER,
+                    historial TEXT
+                )
+            """)
+
+    def guardar(self, envio, originador=None):
+        """
+        Encola el estado actual del envío; no realiza E/S en el hilo llamador
+        La fila y el historial se capturan juntos aquí (con el lock del envío tomado
+        por el controlador); el hilo escritor solo exporta la captura y la escribe
+        """
+        historial = originador.capturar_historial() if originador else None
+        self._cola.put((envio_a_fila(envio), historial))
+
+    def _escribir_en_segundo_plano(self):
+        """
+        Bucle del hilo escritor: agrupa mutaciones y las confirma por lotes
+        Un lote que falla no se descarta: queda pendiente (junto con las mutaciones
+        que lleguen después) y se reintenta con espera exponencial hasta confirmarse
+        """
+        # Última mutación sin confirmar de cada envío y elementos de la cola que representan
+        pendientes = {}
+        tomadas = 0
+        espera = self.ESPERA_REINTENTO
+        fin = False
+
+        while not fin:
+            if pendientes:
+                # Esperar antes de reintentar, salvo que lleguen mutaciones nuevas
+                try:
+                    lote = [self._cola.get(timeout=espera)]
+                except queue.Empty:
+                    lote = []
+            else:
+                lote = [self._cola.get()]
+            limite = time.monotonic() + self.intervalo_lote
+
+            while lote and lote[-1] is not _FIN and len(lote) < self.tamano_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            tomadas += len(lote)
+            for mutacion in lote:
+                if mutacion is _FIN:
+                    fin = True
+                else:
+                    pendientes[mutacion[0][0]] = mutacion
+
+            intentos = self.REINTENTOS_AL_CERRAR if fin else 1
+            for intento in range(intentos):
+                if self._escribir_lote(list(pendientes.values()), tomadas):
+                    pendientes.clear()
+                    espera = self.ESPERA_REINTENTO
+                    break
+                log.error("❌ Error al escribir lote en SQLite (%d envíos pendientes, fallo %d): %s",
+                          len(pendientes), self.fallos, self.ultimo_error)
+                espera = min(espera * 2, self.ESPERA_MAXIMA)
+                if intento + 1 < intentos:
+                    time.sleep(espera)
+            else:
+                if fin:
+                    log.error("❌ Se cierra el almacenamiento con %d envíos sin escribir", len(pendientes))
+            self.pendientes = len(pendientes)
+
+            # vaciar() retorna solo cuando lo tomado de la cola quedó escrito
+            if not pendientes or fin:
+                for _ in range(tomadas):
+                    self._cola.task_done()
+                tomadas = 0
+
+    def _escribir_lote(self, lote, mutaciones: int) -> bool:
+        """
+        Confirma en una sola transacción la última versión de cada envío (con su historial)
+        Returns: True si el lote quedó escrito
+        """
+        if not lote:
+            return True
+
+        columnas = COLUMNAS_ENVIO + ('historial',)
+        actualizaciones = ", ".join(f"{columna} = excluded.{columna}" for columna in columnas[1:])
+        sql = (f"INSERT INTO envios ({', '.join(columnas)}) "
+               f"VALUES ({', '.join('?' for _ in columnas)}) "
+               f"ON CONFLICT(id_envio) DO UPDATE SET {actualizaciones}")
+
+        try:
+            filas = [fila + (json.dumps(OriginadorEnvio.exportar_captura(historial), ensure_ascii=False)
+                             if historial is not None else None,)
+                     for fila, historial in lote]
+            conexion = self._conexion()
+            with conexion:
+                conexion.executemany(sql, filas)
+        except Exception as e:
+            # Cualquier fallo (de SQLite o al serializar un historial) deja el lote pendiente
+            self.fallos += 1
+            self.ultimo_error = str(e)
+            return False
+
+        self.lotes_escritos += 1
+        self.mutaciones_escritas += mutaciones
+        return True
+
+    def cargar(self) -> Iterator[Tuple[tuple, Optional[dict]]]:
+        """Retorna los envíos persistidos en orden de creación"""
+        cursor = self._conexion().execute(
+            f"SELECT {', '.join(COLUMNAS_ENVIO)}, historial FROM envios ORDER BY rowid"
+        )
+        for registro in cursor:
+            fila, historial = registro[:-1], registro[-1]
+            yield fila, json.loads(historial) if historial else None
+
+    def vaciar(self):
+        """Bloquea hasta que todo lo encolado quede escrito (incluidos los lotes en reintento)"""
+        self._cola.join()
+
+    def estadisticas(self) -> dict:
+        """Lotes y mutaciones escritos, fallos de escritura y envíos pendientes de reintento"""
+        return {
+            'lotes_escritos': self.lotes_escritos,
+            'mutaciones_escritas': self.mutaciones_escritas,
+            'fallos': self.fallos,
+            'ultimo_error': self.ultimo_error,
+            'envios_pendientes': self.pendientes,
+            'en_cola': self._cola.qsize()
+        }
+
+    def cerrar(self):
+        """Confirma las mutaciones pendientes, detiene el escritor y cierra conexiones"""
+        if self._escritor.is_alive():
+            self._cola.put(_FIN)
+            self._escritor.join()
+
+        with self._lock_conexiones:
+            for conexion in self._conexiones:
+                conexion.close()
+            self._conexiones.clear()
+        self._local = threading.local()
@@ -0,0 +1,116 @@
+# Persistence/AsignadorIds.py
+"""
+Asignadores de números de ID de envío
+El asignador local cuenta en memoria; el asignador por bloques arrienda rangos
+de IDs de una secuencia compartida en SQLite, de modo que varios procesos
+pueden crear envíos sin colisiones y sin coordinarse en cada alta
+"""
+import sqlite3
+import threading
+
+
+class AsignadorIds:
+    """Asignador en memoria para un único proceso"""
+
+    def __init__(self, siguiente: int = 1):
+        self._lock = threading.Lock()
+        self._siguiente = siguiente
+
+    def siguiente(self) -> int:
+        """Reserva y retorna el siguiente número de ID"""
+        with self._lock:
+            numero = self._siguiente
+            self._siguiente += 1
+        return numero
+
+    def proximo(self) -> int:
+        """Retorna el número que se asignará a continuación (sin reservarlo)"""
+        return self._siguiente
+
+    def reservar_hasta(self, numero: int):
+        """Garantiza que no se asigne ningún número menor que `numero`"""
+        with self._lock:
+            self._siguiente = max(self._siguiente, numero)
+
+    def cerrar(self):
+        """Libera los recursos del asignador"""
+        pass
+
+
+class AsignadorIdsBloques(AsignadorIds):
+    """
+    Asignador que arrienda bloques de IDs de una secuencia SQLite compartida
+    Cada proceso entrega IDs de su bloque en memoria y solo accede al archivo
+    al agotarlo. Los números son monótonos dentro de cada proceso y nunca se
+    reutilizan: el sobrante de un bloque se descarta al reiniciar
+    """
+
+    def __init__(self, ruta: str, tamano_bloque: int = 1000, nombre: str = "envios"):
+        """
+        Args:
+            ruta: Archivo SQLite con la secuencia compartida
+            tamano_bloque: Cantidad de IDs arrendados en cada acceso al archivo
+            nombre: Nombre de la secuencia dentro del archivo
+        """
+        super().__init__()
+        self.ruta = ruta
+        self.tamano_bloque = tamano_bloque
+        self.nombre = nombre
+        self.bloques_arrendados = 0
+
+        self._conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS secuencias (nombre TEXT PRIMARY KEY, siguiente INTEGER NOT NULL)")
+        self._conexion.execute(
+            "INSERT OR IGNORE INTO secuencias (nombre, siguiente) VALUES (?, 1)", (nombre,))
+
+        # Bloque vacío: el primer siguiente() arrienda uno nuevo
+        self._fin_bloque = self._siguiente
+
+    def _arrendar_bloque(self, minimo: int = 0):
+        """Reserva atómicamente el próximo bloque de la secuencia compartida"""
+        conexion = self._conexion
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            inicio = conexion.execute("SELECT siguiente FROM secuencias WHERE nombre = ?",
+                                      (self.nombre,)).fetchone()[0]
+            inicio = max(inicio, minimo)
+            conexion.execute("UPDATE secuencias SET siguiente = ? WHERE nombre = ?",
+                             (inicio + self.tamano_bloque, self.nombre))
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+
+        self._siguiente = inicio
+        self._fin_bloque = inicio + self.tamano_bloque
+        self.bloques_arrendados += 1
+
+    def siguiente(self) -> int:
+        """Reserva el siguiente número del bloque, arrendando otro si se agotó"""
+        with self._lock:
+            if self._siguiente >= self._fin_bloque:
+                self._arrendar_bloque()
+            numero = self._siguiente
+            self._siguiente += 1
+        return numero
+
+    def reservar_hasta(self, numero: int):
+        """
+        Garantiza que no se asigne ningún número menor que `numero`
+        (ej. IDs restaurados desde almacenamiento, diario o snapshot)
+        """
+        with self._lock:
+            if numero <= self._siguiente:
+                return
+            if numero < self._fin_bloque:
+                self._siguiente = numero
+            else:
+                self._arrendar_bloque(minimo=numero)
+
+    def cerrar(self):
+        """Cierra la conexión con la secuencia compartida"""
+        with self._lock:
+            self._conexion.close()
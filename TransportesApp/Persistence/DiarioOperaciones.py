@@ -0,0 +1,236 @@
+# Persistence/DiarioOperaciones.py
+"""
+Diario de operaciones (journal) de solo anexado
+Cada operación que modifica el controlador se registra como un registro binario
+compacto antes de retornar. Al arrancar se carga el último punto de control y se
+reproducen las operaciones posteriores; tras cada punto de control el diario se trunca
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+# Códigos de operación
+OP_CREAR = 1
+OP_AVANZAR = 2
+OP_CANCELAR = 3
+OP_MODIFICAR = 4
+OP_DESHACER = 5
+OP_REHACER = 6
+OP_MODIFICAR_VARIOS = 7
+OP_TRANSACCION = 8
+
+# Cabecera de registro: longitud del contenido + CRC32 del contenido
+_CABECERA = struct.Struct("<II")
+# Inicio del contenido: número de secuencia, timestamp, código de operación
+_INICIO = struct.Struct("<QdB")
+_ENTERO = struct.Struct("<q")
+_REAL = struct.Struct("<d")
+_LONGITUD = struct.Struct("<I")
+
+
+def _codificar(valor, partes: List[bytes]):
+    """Codifica un valor (None, bool, int, float, str, list, dict) con etiqueta de tipo"""
+    if valor is None:
+        partes.append(b"N")
+    elif valor is True:
+        partes.append(b"T")
+    elif valor is False:
+        partes.append(b"F")
+    elif isinstance(valor, int):
+        partes.append(b"i" + _ENTERO.pack(valor))
+    elif isinstance(valor, float):
+        partes.append(b"d" + _REAL.pack(valor))
+    elif isinstance(valor, str):
+        datos = valor.encode("utf-8")
+        partes.append(b"s" + _LONGITUD.pack(len(datos)) + datos)
+    elif isinstance(valor, (list, tuple)):
+        partes.append(b"l" + _LONGITUD.pack(len(valor)))
+        for elemento in valor:
+            _codificar(elemento, partes)
+    elif isinstance(valor, dict):
+        partes.append(b"m" + _LONGITUD.pack(len(valor)))
+        for clave, elemento in valor.items():
+            _codificar(clave, partes)
+            _codificar(elemento, partes)
+    else:
+        raise TypeError(f"Tipo no soportado en el diario: {type(valor).__name__}")
+
+
+def _decodificar(datos: bytes, pos: int) -> Tuple[object, int]:
+    """Decodifica un valor desde la posición dada; retorna (valor, nueva posición)"""
+    etiqueta = datos[pos:pos + 1]
+    pos += 1
+    if etiqueta == b"N":
+        return None, pos
+    if etiqueta == b"T":
+        return True, pos
+    if etiqueta == b"F":
+        return False, pos
+    if etiqueta == b"i":
+        return _ENTERO.unpack_from(datos, pos)[0], pos + _ENTERO.size
+    if etiqueta == b"d":
+        return _REAL.unpack_from(datos, pos)[0], pos + _REAL.size
+    if etiqueta == b"s":
+        longitud = _LONGITUD.unpack_from(datos, pos)[0]
+        pos += _LONGITUD.size
+        return datos[pos:pos + longitud].decode("utf-8"), pos + longitud
+    if etiqueta == b"l":
+        cantidad = _LONGITUD.unpack_from(datos, pos)[0]
+        pos += _LONGITUD.size
+        elementos = []
+        for _ in range(cantidad):
+            elemento, pos = _decodificar(datos, pos)
+            elementos.append(elemento)
+        return elementos, pos
+    if etiqueta == b"m":
+        cantidad = _LONGITUD.unpack_from(datos, pos)[0]
+        pos += _LONGITUD.size
+        diccionario = {}
+        for _ in range(cantidad):
+            clave, pos = _decodificar(datos, pos)
+            diccionario[clave], pos = _decodificar(datos, pos)
+        return diccionario, pos
+    raise ValueError(f"Etiqueta desconocida en el diario: {etiqueta!r}")
+
+
+class DiarioOperaciones:
+    """
+    Diario binario de operaciones con puntos de control periódicos
+    Solo realiza escrituras secuenciales al final del archivo
+    """
+
+    def __init__(self, ruta: str, intervalo_checkpoint: int = 10000, sincronizar: bool = True):
+        """
+        Args:
+            ruta: Archivo del diario (el punto de control se guarda en ruta + ".checkpoint")
+            intervalo_checkpoint: Operaciones registradas entre puntos de control
+            sincronizar: Si es True hace fsync de cada registro antes de retornar
+        """
+        self.ruta = ruta
+        self.ruta_checkpoint = ruta + ".checkpoint"
+        self.intervalo_checkpoint = intervalo_checkpoint
+        self.sincronizar = sincronizar
+
+        self._lock = threading.Lock()
+        self._secuencia = 0
+        self._secuencia_checkpoint = 0
+        self._desde_checkpoint = 0
+
+        self._archivo = open(self.ruta, "ab")
+
+    def registrar(self, operacion: int, *argumentos):
+        """Anexa una operación al diario (y la sincroniza a disco si corresponde)"""
+        partes = []
+        _codificar(list(argumentos), partes)
+
+        with self._lock:
+            self._secuencia += 1
+            contenido = _INICIO.pack(self._secuencia, time.time(), operacion) + b"".join(partes)
+            self._archivo.write(_CABECERA.pack(len(contenido), zlib.crc32(contenido)) + contenido)
+            self._archivo.flush()
+            if self.sincronizar:
+                os.fsync(self._archivo.fileno())
+            self._desde_checkpoint += 1
+
+    def registrar_lote(self, operacion: int, lista_argumentos: List[tuple]):
+        """
+        Anexa varias operaciones del mismo tipo con una sola escritura
+        (y una sola sincronización a disco)
+        """
+        codificados = []
+        for argumentos in lista_argumentos:
+            partes = []
+            _codificar(list(argumentos), partes)
+            codificados.append(b"".join(partes))
+
+        with self._lock:
+            registros = []
+            ahora = time.time()
+            for datos in codificados:
+                self._secuencia += 1
+                contenido = _INICIO.pack(self._secuencia, ahora, operacion) + datos
+                registros.append(_CABECERA.pack(len(contenido), zlib.crc32(contenido)) + contenido)
+            self._archivo.write(b"".join(registros))
+            self._archivo.flush()
+            if self.sincronizar:
+                os.fsync(self._archivo.fileno())
+            self._desde_checkpoint += len(registros)
+
+    def requiere_checkpoint(self) -> bool:
+        """Indica si ya se registraron suficientes operaciones para un punto de control"""
+        return self._desde_checkpoint >= self.intervalo_checkpoint
+
+    def leer(self) -> Iterator[Tuple[int, float, list]]:
+        """
+        Retorna (operación, timestamp, argumentos) de los registros posteriores al
+        último punto de control. Un registro final incompleto o corrupto (caída a
+        mitad de escritura) se descarta y el archivo se trunca en ese punto
+        """
+        with open(self.ruta, "rb") as archivo:
+            datos = archivo.read()
+
+        pos = 0
+        while pos + _CABECERA.size <= len(datos):
+            longitud, crc = _CABECERA.unpack_from(datos, pos)
+            inicio = pos + _CABECERA.size
+            contenido = datos[inicio:inicio + longitud]
+            if len(contenido) < longitud or zlib.crc32(contenido) != crc:
+                break
+
+            secuencia, timestamp, operacion = _INICIO.unpack_from(contenido, 0)
+            argumentos, _ = _decodificar(contenido, _INICIO.size)
+            pos = inicio + longitud
+
+            self._secuencia = max(self._secuencia, secuencia)
+            if secuencia <= self._secuencia_checkpoint:
+                continue  # Ya incluido en el punto de control
+            self._desde_checkpoint += 1
+            yield operacion, timestamp, argumentos
+
+        if pos < len(datos):
+            with self._lock:
+                self._archivo.truncate(pos)
+
+    def cargar_checkpoint(self) -> Optional[dict]:
+        """Retorna el estado guardado en el último punto de control o None"""
+        if not os.path.exists(self.ruta_checkpoint):
+            return None
+
+        with open(self.ruta_checkpoint, "r", encoding="utf-8") as archivo:
+            estado = json.load(archivo)
+
+        self._secuencia_checkpoint = estado['secuencia']
+        self._secuencia = max(self._secuencia, estado['secuencia'])
+        return estado
+
+    def checkpoint(self, estado: dict):
+        """
+        Guarda el estado completo del controlador de forma atómica y trunca el diario
+
+        Args:
+            estado: Diccionario serializable en JSON con el estado del controlador
+        """
+        with self._lock:
+            estado = dict(estado, secuencia=self._secuencia)
+            temporal = self.ruta_checkpoint + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump(estado, archivo, ensure_ascii=False)
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            os.replace(temporal, self.ruta_checkpoint)
+
+            # Los registros previos ya están cubiertos por el punto de control
+            self._archivo.truncate(0)
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+            self._secuencia_checkpoint = self._secuencia
+            self._desde_checkpoint = 0
+
+    def cerrar(self):
+        """Cierra el archivo del diario"""
+        with self._lock:
+            self._archivo.close()
@@ -0,0 +1,159 @@
+# Persistence/GestorMemoriaHistoriales.py
+"""
+Presupuesto global de memoria para los historiales Memento
+Lleva la cuenta de los bytes que ocupan los historiales de todos los envíos y,
+cuando superan el presupuesto, descarga a un archivo SQLite local los menos
+usados recientemente. Un historial descargado se recarga al volver a usarlo
+(deshacer, rehacer, consultar o exportar el historial, o guardar un cambio)
+"""
+import itertools
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class GestorMemoriaHistoriales:
+    """
+    Gestor compartido por todos los CaretakerEnvio (ver CaretakerEnvio.gestor)
+    El almacén en disco es un área de intercambio del proceso: se vacía al abrirlo
+    y no reemplaza a la persistencia de envíos
+    """
+
+    def __init__(self, presupuesto_bytes: int, ruta: Optional[str] = None):
+        """
+        Args:
+            presupuesto_bytes: Bytes máximos de historiales en memoria
+            ruta: Archivo SQLite para los historiales descargados (por defecto uno temporal)
+        """
+        self.presupuesto_bytes = presupuesto_bytes
+        self.descargas = 0
+        self.recargas = 0
+        self._bytes_en_memoria = 0
+        self._claves = itertools.count(1)
+        # clave -> [referencia débil al caretaker, bytes contabilizados], del menos al más usado
+        self._en_memoria: 'OrderedDict[int, list]' = OrderedDict()
+        self._en_disco: Dict[int, weakref.ref] = {}
+        self._lock = threading.Lock()
+
+        self._temporal = ruta is None
+        if ruta is None:
+            descriptor, ruta = tempfile.mkstemp(prefix="historiales-", suffix=".db")
+            os.close(descriptor)
+        self.ruta = ruta
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=OFF")
+        self._conexion.execute("DROP TABLE IF EXISTS historiales")
+        self._conexion.execute("CREATE TABLE historiales (clave INTEGER PRIMARY KEY, datos BLOB NOT NULL)")
+        self._conexion.commit()
+
+    def _registrar(self, caretaker):
+        """Asigna clave y lock de uso a un caretaker que todavía no los tiene"""
+        with self._lock:
+            if caretaker._lock is None:
+                caretaker._clave = next(self._claves)
+                caretaker._lock = threading.RLock()
+                self._en_memoria[caretaker._clave] = [weakref.ref(caretaker), 0]
+
+    @contextmanager
+    def usar(self, caretaker):
+        """
+        Contexto para operar sobre un historial: lo recarga si estaba en disco,
+        impide que se descargue mientras se usa y, al terminar, actualiza su
+        tamaño y descarga otros historiales si se superó el presupuesto
+        """
+        if caretaker._lock is None:
+            self._registrar(caretaker)
+
+        with caretaker._lock:
+            if caretaker.descargado:
+                self._recargar(caretaker)
+            try:
+                yield caretaker
+            finally:
+                tamano = caretaker.tamano_estimado()
+                with self._lock:
+                    entrada = self._en_memoria[caretaker._clave]
+                    self._bytes_en_memoria += tamano - entrada[1]
+                    entrada[1] = tamano
+                    self._en_memoria.move_to_end(caretaker._clave)
+
+        if self._bytes_en_memoria > self.presupuesto_bytes:
+            self._ajustar()
+
+    def _recargar(self, caretaker):
+        """Trae de disco el historial de un caretaker (con su lock tomado)"""
+        with self._lock:
+            clave = caretaker._clave
+            datos = self._conexion.execute(
+                "SELECT datos FROM historiales WHERE clave = ?", (clave,)).fetchone()[0]
+            self._conexion.execute("DELETE FROM historiales WHERE clave = ?", (clave,))
+            del self._en_disco[clave]
+            self._en_memoria[clave] = [weakref.ref(caretaker), 0]
+            self.recargas += 1
+        caretaker.cargar(datos)
+
+    def _ajustar(self):
+        """Descarga los historiales menos usados hasta volver al presupuesto"""
+        with self._lock:
+            # Cada historial se revisa a lo sumo una vez: los que están en uso se saltan
+            for clave in list(self._en_memoria):
+                if self._bytes_en_memoria <= self.presupuesto_bytes:
+                    break
+
+                referencia, tamano = self._en_memoria[clave]
+                caretaker = referencia()
+                if caretaker is None:
+                    del self._en_memoria[clave]
+                    self._bytes_en_memoria -= tamano
+                    continue
+
+                if not caretaker._lock.acquire(blocking=False):
+                    continue
+                try:
+                    self._conexion.execute("INSERT INTO historiales (clave, datos) VALUES (?, ?)",
+                                           (clave, caretaker.descargar()))
+                finally:
+                    caretaker._lock.release()
+
+                del self._en_memoria[clave]
+                self._en_disco[clave] = referencia
+                self._bytes_en_memoria -= tamano
+                self.descargas += 1
+
+    def _purgar(self):
+        """Elimina del disco los historiales de envíos que ya no existen (con el lock tomado)"""
+        muertas = [clave for clave, referencia in self._en_disco.items() if referencia() is None]
+        for clave in muertas:
+            del self._en_disco[clave]
+        self._conexion.executemany("DELETE FROM historiales WHERE clave = ?",
+                                   [(clave,) for clave in muertas])
+
+    def estadisticas(self) -> dict:
+        """Uso del presupuesto y contadores de descargas y recargas"""
+        with self._lock:
+            self._purgar()
+            return {
+                'presupuesto_bytes': self.presupuesto_bytes,
+                'bytes_en_memoria': self._bytes_en_memoria,
+                'uso_presupuesto': (self._bytes_en_memoria / self.presupuesto_bytes
+                                    if self.presupuesto_bytes else 0.0),
+                'historiales_en_memoria': len(self._en_memoria),
+                'historiales_en_disco': len(self._en_disco),
+                'descargas': self.descargas,
+                'recargas': self.recargas
+            }
+
+    def cerrar(self):
+        """Cierra el almacén en disco (y lo elimina si es temporal)"""
+        with self._lock:
+            self._conexion.close()
+            if self._temporal:
+                for sufijo in ("", "-wal", "-shm"):
+                    if os.path.exists(self.ruta + sufijo):
+                        os.remove(self.ruta + sufijo)
@@ -0,0 +1,57 @@
+# Persistence/Serializacion.py
+"""
+Conversión de envíos a filas planas y viceversa
+Compartida por los distintos mecanismos de persistencia
+"""
+from datetime import datetime
+
+from Models.Envio import CLASES_POR_TIPO
+from Patterns.State import GestorEstadoEnvio
+
+# Orden de los campos en una fila de envío
+COLUMNAS_ENVIO = (
+    'id_envio', 'tipo_envio', 'remitente', 'destinatario', 'direccion_origen',
+    'direccion_destino', 'peso', 'descripcion', 'fecha_creacion', 'estado',
+    'costo', 'distancia', 'es_fragil', 'requiere_seguro'
+)
+
+
+def envio_a_fila(envio) -> tuple:
+    """Convierte un envío en una tupla con el orden de COLUMNAS_ENVIO"""
+    return (
+        envio.id_envio,
+        envio.tipo_envio,
+        envio.remitente,
+        envio.destinatario,
+        envio.direccion_origen,
+        envio.direccion_destino,
+        envio.peso,
+        envio.descripcion,
+        envio.fecha_creacion.timestamp(),
+        envio.estado.__class__.__name__ if envio.estado else "Sin estado",
+        envio.costo,
+        envio.distancia,
+        bool(envio.es_fragil),
+        bool(envio.requiere_seguro)
+    )
+
+
+def envio_desde_fila(fila):
+    """Reconstruye un envío (con su estado) a partir de una fila"""
+    (id_envio, tipo_envio, remitente, destinatario, direccion_origen,
+     direccion_destino, peso, descripcion, fecha_creacion, estado,
+     costo, distancia, es_fragil, requiere_seguro) = fila
+
+    clase = CLASES_POR_TIPO.get(tipo_envio)
+    if clase is None:
+        raise ValueError(f"Tipo de envío '{tipo_envio}' no válido")
+
+    envio = clase(id_envio, remitente, destinatario, direccion_origen,
+                  direccion_destino, peso, descripcion)
+    envio.fecha_creacion = datetime.fromtimestamp(fecha_creacion)
+    envio.costo = costo
+    envio.distancia = distancia
+    envio.es_fragil = bool(es_fragil)
+    envio.requiere_seguro = bool(requiere_seguro)
+    GestorEstadoEnvio.restaurar_estado(envio, estado)
+    return envio
@@ -0,0 +1,215 @@
+# Persistence/SnapshotColumnar.py
+"""
+Snapshot columnar de envíos en un archivo de diseño fijo
+Las columnas numéricas se guardan como arreglos contiguos y las de texto como
+tablas de desplazamientos + bytes UTF-8. El archivo se abre con mmap, por lo que
+cargarlo no lee su contenido: cada fila se decodifica solo cuando se consulta
+"""
+import mmap
+import os
+import struct
+from array import array
+from typing import Dict, List, Sequence
+
+from Models.Envio import CODIGOS_TIPO
+from Patterns.State import CODIGOS_ESTADO
+
+MAGIA = b"ENVSNAP1"
+VERSION = 1
+
+# magia, versión, filas, contador de envíos, número de columnas
+_CABECERA = struct.Struct("<8sIIQI")
+# nombre de columna, desplazamiento, longitud en bytes
+_ENTRADA = struct.Struct("<24sQQ")
+
+# Columnas numéricas: nombre -> código de tipo de array
+COLUMNAS_NUMERICAS = {
+    'peso': 'd',
+    'costo': 'd',
+    'distancia': 'd',
+    'fecha_creacion': 'd',
+    'estado': 'B',
+    'tipo_envio': 'B',
+    'banderas': 'B',     # bit 0: frágil, bit 1: requiere seguro
+    'orden_id': 'I',     # filas ordenadas por ID (para búsqueda binaria)
+}
+
+COLUMNAS_TEXTO = ('id_envio', 'remitente', 'destinatario', 'direccion_origen',
+                  'direccion_destino', 'descripcion', 'tabla_estados', 'tabla_tipos')
+
+SIN_CODIGO = 255
+FRAGIL = 1
+SEGURO = 2
+
+
+def _columna_texto(valores: Sequence[str]) -> Dict[str, bytes]:
+    """Codifica una lista de textos como desplazamientos (.o) + datos (.d)"""
+    desplazamientos = array('Q', [0])
+    datos = bytearray()
+    for valor in valores:
+        datos += valor.encode("utf-8")
+        desplazamientos.append(len(datos))
+    return {'.o': desplazamientos.tobytes(), '.d': bytes(datos)}
+
+
+def escribir_snapshot(ruta: str, filas: List[tuple], contador_envios: int):
+    """
+    Escribe un snapshot columnar de forma atómica
+
+    Args:
+        ruta: Archivo de destino
+        filas: Filas de envío en el orden de Serializacion.COLUMNAS_ENVIO
+        contador_envios: Siguiente número de ID que asignará el controlador
+    """
+    por_columna = list(zip(*filas)) if filas else [()] * 14
+    (ids, tipos, remitentes, destinatarios, origenes, destinos, pesos,
+     descripciones, fechas, estados, costos, distancias, fragiles, seguros) = por_columna
+
+    columnas: Dict[str, bytes] = {
+        'peso': array('d', pesos).tobytes(),
+        'costo': array('d', costos).tobytes(),
+        'distancia': array('d', distancias).tobytes(),
+        'fecha_creacion': array('d', fechas).tobytes(),
+        'estado': bytes(CODIGOS_ESTADO.get(estado, SIN_CODIGO) for estado in estados),
+        'tipo_envio': bytes(CODIGOS_TIPO.get(tipo, SIN_CODIGO) for tipo in tipos),
+        'banderas': bytes((FRAGIL if fragil else 0) | (SEGURO if seguro else 0)
+                          for fragil, seguro in zip(fragiles, seguros)),
+        'orden_id': array('I', sorted(range(len(ids)), key=lambda fila: ids[fila])).tobytes(),
+    }
+    textos = {
+        'id_envio': ids,
+        'remitente': remitentes,
+        'destinatario': destinatarios,
+        'direccion_origen': origenes,
+        'direccion_destino': destinos,
+        'descripcion': descripciones,
+        'tabla_estados': list(CODIGOS_ESTADO),
+        'tabla_tipos': list(CODIGOS_TIPO),
+    }
+    for nombre, valores in textos.items():
+        for sufijo, datos in _columna_texto(valores).items():
+            columnas[nombre + sufijo] = datos
+
+    # Directorio de columnas con desplazamientos alineados a 8 bytes
+    desplazamiento = _CABECERA.size + _ENTRADA.size * len(columnas)
+    directorio = []
+    for nombre, datos in columnas.items():
+        desplazamiento += -desplazamiento % 8
+        directorio.append((nombre, desplazamiento, len(datos)))
+        desplazamiento += len(datos)
+
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as archivo:
+        archivo.write(_CABECERA.pack(MAGIA, VERSION, len(ids), contador_envios, len(columnas)))
+        for nombre, inicio, longitud in directorio:
+            archivo.write(_ENTRADA.pack(nombre.encode("ascii"), inicio, longitud))
+        for nombre, inicio, _ in directorio:
+            archivo.write(b"\0" * (inicio - archivo.tell()))
+            archivo.write(columnas[nombre])
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+
+class SnapshotColumnar:
+    """
+    Lector de un snapshot columnar mapeado en memoria
+    Abrirlo es O(1) respecto al número de envíos: solo se leen la cabecera y el directorio
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._archivo = open(ruta, "rb")
+        self._mmap = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self._vistas = []
+
+        magia, version, self.total_filas, self.contador_envios, n_columnas = \
+            _CABECERA.unpack_from(self._mmap, 0)
+        if magia != MAGIA or version != VERSION:
+            self.cerrar()
+            raise ValueError(f"{ruta} no es un snapshot de envíos válido")
+
+        base = memoryview(self._mmap)
+        self._vistas.append(base)
+        self._columnas = {}
+        for i in range(n_columnas):
+            nombre, inicio, longitud = _ENTRADA.unpack_from(
+                self._mmap, _CABECERA.size + i * _ENTRADA.size)
+            nombre = nombre.rstrip(b"\0").decode("ascii")
+            vista = base[inicio:inicio + longitud]
+            self._vistas.append(vista)
+
+            formato = COLUMNAS_NUMERICAS.get(nombre)
+            if formato is None and nombre.endswith(".o"):
+                formato = 'Q'
+            if formato and formato != 'B':
+                vista = vista.cast(formato)
+                self._vistas.append(vista)
+            self._columnas[nombre] = vista
+
+        self.tabla_estados = [self._texto('tabla_estados', i)
+                               for i in range(len(self._columnas['tabla_estados.o']) - 1)]
+        self.tabla_tipos = [self._texto('tabla_tipos', i)
+                             for i in range(len(self._columnas['tabla_tipos.o']) - 1)]
+
+    def _texto(self, columna: str, fila: int) -> str:
+        """Decodifica el texto de una fila en una columna de texto"""
+        desplazamientos = self._columnas[columna + '.o']
+        return str(self._columnas[columna + '.d'][desplazamientos[fila]:desplazamientos[fila + 1]],
+                   "utf-8")
+
+    def __len__(self) -> int:
+        return self.total_filas
+
+    def columna(self, nombre: str) -> memoryview:
+        """Retorna la vista (sin copiar) de una columna numérica"""
+        return self._columnas[nombre]
+
+    def id_en(self, fila: int) -> str:
+        """Retorna el ID del envío guardado en una fila"""
+        return self._texto('id_envio', fila)
+
+    def buscar(self, id_envio: str) -> int:
+        """Retorna la fila del envío con el ID dado (búsqueda binaria) o -1"""
+        orden = self._columnas['orden_id']
+        inferior, superior = 0, self.total_filas
+        while inferior < superior:
+            medio = (inferior + superior) // 2
+            if self.id_en(orden[medio]) < id_envio:
+                inferior = medio + 1
+            else:
+                superior = medio
+        if inferior < self.total_filas and self.id_en(orden[inferior]) == id_envio:
+            return orden[inferior]
+        return -1
+
+    def fila(self, fila: int) -> tuple:
+        """Decodifica una fila en el orden de Serializacion.COLUMNAS_ENVIO"""
+        columnas = self._columnas
+        codigo_estado = columnas['estado'][fila]
+        codigo_tipo = columnas['tipo_envio'][fila]
+        banderas = columnas['banderas'][fila]
+        return (
+            self._texto('id_envio', fila),
+            self.tabla_tipos[codigo_tipo] if codigo_tipo != SIN_CODIGO else "",
+            self._texto('remitente', fila),
+            self._texto('destinatario', fila),
+            self._texto('direccion_origen', fila),
+            self._texto('direccion_destino', fila),
+            columnas['peso'][fila],
+            self._texto('descripcion', fila),
+            columnas['fecha_creacion'][fila],
+            self.tabla_estados[codigo_estado] if codigo_estado != SIN_CODIGO else "Sin estado",
+            columnas['costo'][fila],
+            columnas['distancia'][fila],
+            bool(banderas & FRAGIL),
+            bool(banderas & SEGURO),
+        )
+
+    def cerrar(self):
+        """Libera las vistas y el mapeo del archivo"""
+        for vista in reversed(self._vistas):
+            vista.release()
+        self._vistas.clear()
+        self._mmap.close()
+        self._archivo.close()
@@ -0,0 +1,13 @@
+# Persistence/__init__.py
+"""
+Paquete de persistencia de la aplicación
+"""
+from .Almacenamiento import AlmacenamientoEnvios
+from .AlmacenamientoSQLite import AlmacenamientoSQLite
+from .AsignadorIds import AsignadorIds, AsignadorIdsBloques
+from .DiarioOperaciones import DiarioOperaciones
+from .GestorMemoriaHistoriales import GestorMemoriaHistoriales
+from .SnapshotColumnar import SnapshotColumnar
+
+__all__ = ['AlmacenamientoEnvios', 'AlmacenamientoSQLite', 'AsignadorIds', 'AsignadorIdsBloques',
+           'DiarioOperaciones', 'GestorMemoriaHistoriales', 'SnapshotColumnar']
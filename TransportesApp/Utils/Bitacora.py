@@ -0,0 +1,86 @@
+# Utils/Bitacora.py
+"""
+Bitácora (logging) de la aplicación sobre el módulo estándar logging
+Todos los mensajes de Controllers y Patterns pasan por loggers hijos de "transportes".
+Los mensajes usan argumentos diferidos (%-format): si el nivel está desactivado no se
+construye ningún texto. En modo silencioso solo se emiten errores
+"""
+import json
+import logging
+import os
+import sys
+from typing import Optional
+
+RAIZ = "transportes"
+
+# Nivel adicional para desactivar toda la salida informativa (producción)
+SILENCIO = logging.ERROR
+
+NIVELES = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+    'SILENCIO': SILENCIO,
+}
+
+# Sin configurar, la bitácora no emite nada (ni usa el handler de último recurso)
+logging.getLogger(RAIZ).addHandler(logging.NullHandler())
+
+
+def obtener_logger(nombre: str) -> logging.Logger:
+    """Retorna el logger de un módulo (ej. "Patterns.Visitor" -> "transportes.Patterns.Visitor")"""
+    return logging.getLogger(f"{RAIZ}.{nombre}")
+
+
+def evento(logger: logging.Logger, nivel: int, nombre: str, mensaje: str, *args, **campos):
+    """
+    Registra un evento estructurado: además del mensaje lleva un nombre de evento y
+    campos clave-valor que el formato JSON emite como propiedades propias.
+    Si el nivel está desactivado retorna sin construir nada
+    """
+    if logger.isEnabledFor(nivel):
+        logger.log(nivel, mensaje, *args, extra={'evento': nombre, 'campos': campos})
+
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por registro: nivel, logger, mensaje, evento y campos"""
+
+    def format(self, registro: logging.LogRecord) -> str:
+        datos = {
+            'momento': registro.created,
+            'nivel': registro.levelname,
+            'logger': registro.name,
+            'mensaje': registro.getMessage().strip(),
+        }
+        if hasattr(registro, 'evento'):
+            datos['evento'] = registro.evento
+            datos.update(registro.campos)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+def configurar_bitacora(nivel: Optional[str] = None, formato: Optional[str] = None):
+    """
+    Configura la salida de la bitácora (idempotente)
+
+    Args:
+        nivel: "DEBUG", "INFO", "WARNING", "ERROR" o "SILENCIO". La variable de entorno
+               TRANSPORTES_LOG_NIVEL tiene prioridad; por defecto "INFO"
+        formato: "texto" (solo el mensaje, como la salida por consola) o "json".
+                 La variable TRANSPORTES_LOG_FORMATO tiene prioridad; por defecto "texto"
+    """
+    nivel = (os.environ.get('TRANSPORTES_LOG_NIVEL') or nivel or 'INFO').upper()
+    formato = (os.environ.get('TRANSPORTES_LOG_FORMATO') or formato or 'texto').lower()
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel de bitácora '{nivel}' no válido. Niveles válidos: {', '.join(NIVELES)}")
+
+    raiz = logging.getLogger(RAIZ)
+    for handler in list(raiz.handlers):
+        if not isinstance(handler, logging.NullHandler):
+            raiz.removeHandler(handler)
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(FormateadorJSON() if formato == 'json' else logging.Formatter("%(message)s"))
+    raiz.addHandler(handler)
+    raiz.setLevel(NIVELES[nivel])
+    raiz.propagate = False
@@ -0,0 +1,205 @@
+# Utils/Distancias.py
+"""
+Proveedores de distancia entre direcciones
+ValidadorDistancia obtiene la distancia de un proveedor intercambiable. El proveedor
+geográfico reconoce la ciudad de cada dirección en un nomenclátor local y calcula la
+distancia en línea recta (haversine), sin acceso a red; el proveedor simulado conserva
+el cálculo histórico y sirve como respaldo y para pruebas. DistanciasEnCache guarda los
+resultados en memoria (LRU) y opcionalmente en disco (SQLite) por par de direcciones
+normalizadas, de modo que las rutas repetidas no se recalculan
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+RUTA_CIUDADES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ciudades.json")
+
+RADIO_TIERRA_KM = 6371.0
+
+
+def normalizar_direccion(direccion: str) -> str:
+    """Minúsculas, sin tildes y con espacios colapsados (clave estable para el caché)"""
+    texto = unicodedata.normalize("NFKD", direccion or "")
+    texto = "".join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return re.sub(r"\s+", " ", texto).strip().lower()
+
+
+def haversine(latitud1: float, longitud1: float, latitud2: float, longitud2: float) -> float:
+    """Distancia en km sobre la superficie terrestre entre dos coordenadas en grados"""
+    fi1, fi2 = math.radians(latitud1), math.radians(latitud2)
+    delta_fi = fi2 - fi1
+    delta_lambda = math.radians(longitud2 - longitud1)
+    a = math.sin(delta_fi / 2) ** 2 + math.cos(fi1) * math.cos(fi2) * math.sin(delta_lambda / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+class ProveedorDistancias(ABC):
+    """Interfaz de los proveedores de distancia"""
+
+    # Identifica al proveedor en el caché en disco (resultados de proveedores distintos no se mezclan)
+    nombre = "base"
+
+    @abstractmethod
+    def distancia(self, direccion_origen: str, direccion_destino: str) -> float:
+        """Retorna la distancia en km entre dos direcciones"""
+        pass
+
+
+class ProveedorDistanciaSimulada(ProveedorDistancias):
+    """Distancia simulada a partir del largo de la dirección de destino (cálculo histórico)"""
+
+    nombre = "simulada"
+
+    def distancia(self, direccion_origen: str, direccion_destino: str) -> float:
+        return len(direccion_destino) * 10
+
+
+class ProveedorDistanciaGeografica(ProveedorDistancias):
+    """
+    Distancia haversine entre las ciudades reconocidas en ambas direcciones
+    La ciudad se busca primero en los segmentos separados por comas (del último al
+    primero) y luego como texto contenido en la dirección. Si alguna de las dos no
+    se reconoce, o ambas están en la misma ciudad (la distancia en línea recta sería
+    0 km), responde el proveedor de respaldo con las direcciones normalizadas
+    """
+
+    def __init__(self, ciudades: Optional[Dict[str, Tuple[float, float]]] = None,
+                 respaldo: Optional[ProveedorDistancias] = None):
+        """
+        Args:
+            ciudades: Nombre de ciudad -> (latitud, longitud); por defecto Utils/ciudades.json
+            respaldo: Proveedor para direcciones sin ciudad reconocida (por defecto el simulado)
+        """
+        if ciudades is None:
+            with open(RUTA_CIUDADES, encoding="utf-8") as archivo:
+                ciudades = json.load(archivo)["ciudades"]
+        self.ciudades = {normalizar_direccion(nombre): tuple(coordenadas)
+                         for nombre, coordenadas in ciudades.items()}
+        # Nombres más largos primero: "santa marta" antes que "marta"
+        self._nombres = sorted(self.ciudades, key=len, reverse=True)
+        self.respaldo = respaldo or ProveedorDistanciaSimulada()
+        # La huella del nomenclátor invalida el caché en disco si cambia cualquier coordenada
+        huella = hashlib.sha1(json.dumps(sorted(self.ciudades.items())).encode("utf-8")).hexdigest()[:16]
+        self.nombre = f"geografica:{huella}:{self.respaldo.nombre}"
+
+    def ubicar(self, direccion: str) -> Optional[Tuple[float, float]]:
+        """Retorna las coordenadas de la ciudad de la dirección o None"""
+        normalizada = normalizar_direccion(direccion)
+        for segmento in reversed(normalizada.split(",")):
+            coordenadas = self.ciudades.get(segmento.strip())
+            if coordenadas:
+                return coordenadas
+        for nombre in self._nombres:
+            if re.search(rf"\b{re.escape(nombre)}\b", normalizada):
+                return self.ciudades[nombre]
+        return None
+
+    def distancia(self, direccion_origen: str, direccion_destino: str) -> float:
+        origen = self.ubicar(direccion_origen)
+        destino = self.ubicar(direccion_destino)
+        if origen is None or destino is None or origen == destino:
+            return self.respaldo.distancia(normalizar_direccion(direccion_origen),
+                                           normalizar_direccion(direccion_destino))
+        return round(haversine(*origen, *destino), 1)
+
+
+class DistanciasEnCache(ProveedorDistancias):
+    """
+    Envoltorio de un proveedor con caché LRU en memoria y caché opcional en disco
+    Seguro entre hilos; la clave es el par (origen, destino) normalizado
+    """
+
+    def __init__(self, proveedor: ProveedorDistancias, capacidad: int = 10000,
+                 ruta: Optional[str] = None):
+        """
+        Args:
+            proveedor: Proveedor que calcula las distancias no guardadas
+            capacidad: Cantidad máxima de pares en memoria
+            ruta: Archivo SQLite donde se conservan los pares entre reinicios (None: solo memoria)
+        """
+        self.proveedor = proveedor
+        self.nombre = proveedor.nombre
+        self.capacidad = capacidad
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self._entradas: 'OrderedDict[Tuple[str, str], float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._conexion = None
+        if ruta:
+            self._conexion = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS distancias (proveedor TEXT NOT NULL, origen TEXT NOT NULL, "
+                "destino TEXT NOT NULL, km REAL NOT NULL, PRIMARY KEY (proveedor, origen, destino))")
+            self._conexion.commit()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def _guardar_en_memoria(self, clave: Tuple[str, str], km: float):
+        """Agrega un par al LRU descartando el menos usado (llamar con el lock tomado)"""
+        self._entradas[clave] = km
+        if len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+
+    def distancia(self, direccion_origen: str, direccion_destino: str) -> float:
+        clave = (normalizar_direccion(direccion_origen), normalizar_direccion(direccion_destino))
+        with self._lock:
+            km = self._entradas.get(clave)
+            if km is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return km
+
+            if self._conexion is not None:
+                fila = self._conexion.execute(
+                    "SELECT km FROM distancias WHERE proveedor = ? AND origen = ? AND destino = ?",
+                    (self.nombre, *clave)).fetchone()
+                if fila is not None:
+                    self.aciertos_disco += 1
+                    self._guardar_en_memoria(clave, fila[0])
+                    return fila[0]
+
+            self.fallos += 1
+
+        # El cálculo se hace fuera del lock y sobre el par normalizado, de modo que todas las
+        # escrituras de una misma dirección obtienen el mismo valor sin importar cuál llegó primero
+        km = self.proveedor.distancia(*clave)
+        with self._lock:
+            self._guardar_en_memoria(clave, km)
+            if self._conexion is not None:
+                self._conexion.execute(
+                    "INSERT OR REPLACE INTO distancias (proveedor, origen, destino, km) VALUES (?, ?, ?, ?)",
+                    (self.nombre, *clave, km))
+                self._conexion.commit()
+        return km
+
+    def estadisticas(self) -> dict:
+        """Aciertos en memoria y en disco, fallos y ocupación del caché"""
+        with self._lock:
+            return {
+                'proveedor': self.nombre,
+                'aciertos': self.aciertos,
+                'aciertos_disco': self.aciertos_disco,
+                'fallos': self.fallos,
+                'entradas': len(self._entradas),
+                'capacidad': self.capacidad,
+                'en_disco': self._conexion is not None
+            }
+
+    def cerrar(self):
+        """Cierra el caché en disco"""
+        with self._lock:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
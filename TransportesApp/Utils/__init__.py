@@ -0,0 +1,10 @@
+# Utils/__init__.py
+"""
+Paquete de utilidades transversales de la aplicación
+"""
+from .Bitacora import obtener_logger, configurar_bitacora, evento
+from .Distancias import (ProveedorDistancias, ProveedorDistanciaSimulada,
+                         ProveedorDistanciaGeografica, DistanciasEnCache)
+
+__all__ = ['obtener_logger', 'configurar_bitacora', 'evento', 'ProveedorDistancias',
+           'ProveedorDistanciaSimulada', 'ProveedorDistanciaGeografica', 'DistanciasEnCache']
@@ -12,12 +12,102 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from Controllers.EnvioController import EnvioController
+from Patterns.ChainOfResponsibility import CadenaValidacion, ValidadorDistancia
+from Patterns.Visitor import CalculadorCosto
+from Persistence.AlmacenamientoSQLite import AlmacenamientoSQLite
+from Persistence.DiarioOperaciones import DiarioOperaciones
+from Persistence.AsignadorIds import AsignadorIdsBloques
+from Persistence.GestorMemoriaHistoriales import GestorMemoriaHistoriales
+from Patterns.Memento import CaretakerEnvio
+from Patterns.State import ESTADOS
+from Utils.Bitacora import configurar_bitacora
+from Utils.Distancias import DistanciasEnCache, ProveedorDistanciaGeografica, ProveedorDistanciaSimulada
+import atexit
+import time
+from datetime import datetime
 
 app = Flask(__name__)
 CORS(app)  # Permitir peticiones desde el frontend
 
+# Bitácora: TRANSPORTES_LOG_NIVEL=DEBUG|INFO|WARNING|ERROR|SILENCIO, TRANSPORTES_LOG_FORMATO=texto|json
+configurar_bitacora("INFO")
+
+# Reordenamiento adaptativo de las reglas de validación (TRANSPORTES_VALIDACION_REORDENAR=cada N validaciones)
+if os.environ.get('TRANSPORTES_VALIDACION_REORDENAR'):
+    CadenaValidacion.pipeline().reordenar_cada = int(os.environ['TRANSPORTES_VALIDACION_REORDENAR'])
+
+# Proveedor de distancias (TRANSPORTES_DISTANCIAS=geografica|simulada) con caché
+# opcional en disco (TRANSPORTES_DISTANCIAS_CACHE=ruta/al/archivo.db)
+proveedor_distancias = DistanciasEnCache(
+    ProveedorDistanciaSimulada() if os.environ.get('TRANSPORTES_DISTANCIAS') == 'simulada'
+    else ProveedorDistanciaGeografica(),
+    ruta=os.environ.get('TRANSPORTES_DISTANCIAS_CACHE')
+)
+ValidadorDistancia.configurar_proveedor(proveedor_distancias)
+atexit.register(proveedor_distancias.cerrar)
+
+# Almacenamiento persistente opcional (TRANSPORTES_DB=ruta/al/archivo.db)
+almacenamiento = None
+if os.environ.get('TRANSPORTES_DB'):
+    almacenamiento = AlmacenamientoSQLite(
+        os.environ['TRANSPORTES_DB'],
+        tamano_lote=int(os.environ.get('TRANSPORTES_DB_LOTE', 500))
+    )
+    atexit.register(almacenamiento.cerrar)
+
+# Diario de operaciones opcional (TRANSPORTES_DIARIO=ruta/al/diario.log); excluyente con
+# TRANSPORTES_DB, ya que ambos recuperan el estado completo al arrancar
+diario = None
+if os.environ.get('TRANSPORTES_DIARIO'):
+    if almacenamiento:
+        raise RuntimeError("TRANSPORTES_DIARIO no se puede combinar con TRANSPORTES_DB: "
+                           "las operaciones recuperadas se aplicarían dos veces")
+    diario = DiarioOperaciones(
+        os.environ['TRANSPORTES_DIARIO'],
+        intervalo_checkpoint=int(os.environ.get('TRANSPORTES_DIARIO_CHECKPOINT', 10000))
+    )
+    atexit.register(diario.cerrar)
+
+# Secuencia de IDs compartida entre procesos (TRANSPORTES_SECUENCIA=ruta/al/archivo.db)
+asignador_ids = None
+if os.environ.get('TRANSPORTES_SECUENCIA'):
+    asignador_ids = AsignadorIdsBloques(
+        os.environ['TRANSPORTES_SECUENCIA'],
+        tamano_bloque=int(os.environ.get('TRANSPORTES_SECUENCIA_BLOQUE', 1000))
+    )
+    atexit.register(asignador_ids.cerrar)
+
+# Presupuesto global de memoria para historiales (TRANSPORTES_HISTORIAL_MEMORIA_MB=megabytes);
+# los historiales menos usados se descargan a TRANSPORTES_HISTORIAL_DISCO (por defecto un temporal)
+gestor_historiales = None
+if os.environ.get('TRANSPORTES_HISTORIAL_MEMORIA_MB'):
+    gestor_historiales = GestorMemoriaHistoriales(
+        int(float(os.environ['TRANSPORTES_HISTORIAL_MEMORIA_MB']) * 2**20),
+        ruta=os.environ.get('TRANSPORTES_HISTORIAL_DISCO')
+    )
+    CaretakerEnvio.gestor = gestor_historiales
+    atexit.register(gestor_historiales.cerrar)
+
+# Analítica columnar (requiere NumPy; se desactiva si no está instalado)
+try:
+    from Models.AlmacenColumnarEnvios import AlmacenColumnarEnvios
+    analitica = AlmacenColumnarEnvios()
+except ImportError:
+    analitica = None
+
 # Instancia global del controlador
-controller = EnvioController()
+controller = EnvioController(almacenamiento=almacenamiento, diario=diario, analitica=analitica,
+                             asignador_ids=asignador_ids)
+
+# Snapshot columnar opcional para arranque rápido (TRANSPORTES_SNAPSHOT=ruta/al/archivo.snap);
+# solo sin diario ni base de datos, que ya recuperan el estado completo
+if os.environ.get('TRANSPORTES_SNAPSHOT'):
+    if diario or almacenamiento:
+        raise RuntimeError("TRANSPORTES_SNAPSHOT no se puede combinar con TRANSPORTES_DIARIO ni "
+                           "TRANSPORTES_DB: el snapshot reemplazaría los cambios recuperados de ellos")
+    if os.path.exists(os.environ['TRANSPORTES_SNAPSHOT']):
+        controller.cargar_snapshot(os.environ['TRANSPORTES_SNAPSHOT'])
+    atexit.register(controller.guardar_snapshot, os.environ['TRANSPORTES_SNAPSHOT'])
 
 
 @app.route('/api/health', methods=['GET'])
@@ -25,16 +115,30 @@ def health_check():
     """Endpoint para verificar que el servidor está funcionando"""
     return jsonify({
         'status': 'ok',
-        'message': 'API de Transportes funcionando correctamente'
+        'message': 'API de Transportes funcionando correctamente',
+        'cache_cotizaciones': CalculadorCosto.cache.estadisticas(),
+        'validacion': CadenaValidacion.pipeline().estadisticas(),
+        'distancias': proveedor_distancias.estadisticas(),
+        'almacenamiento': almacenamiento.estadisticas() if almacenamiento else None
     })
 
 
 @app.route('/api/envios', methods=['GET'])
 def listar_envios():
-    """Lista todos los envíos registrados"""
+    """
+    Lista los envíos registrados
+    Filtros opcionales por query string: estado, tipo, remitente, destinatario
+    """
     try:
+        envios = controller.filtrar_envios(
+            estado=request.args.get('estado'),
+            tipo=request.args.get('tipo'),
+            remitente=request.args.get('remitente'),
+            destinatario=request.args.get('destinatario')
+        )
+        
         envios_data = []
-        for envio in controller.envios:
+        for envio in envios:
             envios_data.append({
                 'id': envio.id_envio,
                 'remitente': envio.remitente,
@@ -66,7 +170,10 @@ def listar_envios():
 
 @app.route('/api/envios/<id_envio>', methods=['GET'])
 def obtener_envio(id_envio):
-    """Obtiene un envío específico por ID"""
+    """
+    Obtiene un envío específico por ID
+    Con ?as_of=<fecha ISO o timestamp> retorna el envío tal como estaba en ese momento
+    """
     try:
         envio = controller.obtener_envio(id_envio)
         
@@ -76,6 +183,9 @@ def obtener_envio(id_envio):
                 'error': f'Envío {id_envio} no encontrado'
             }), 404
         
+        if request.args.get('as_of'):
+            return obtener_envio_en(envio, request.args['as_of'])
+        
         return jsonify({
             'success': True,
             'data': {
@@ -156,6 +266,266 @@ def crear_envio():
         }), 500
 
 
+@app.route('/api/envios/lote', methods=['POST'])
+def crear_envios_lote():
+    """Crea muchos envíos en una sola petición y reporta el resultado de cada uno"""
+    try:
+        data = request.get_json()
+        envios = data.get('envios') if isinstance(data, dict) else None
+        
+        if not isinstance(envios, list):
+            return jsonify({
+                'success': False,
+                'error': 'Se esperaba un objeto con la lista "envios"'
+            }), 400
+        
+        inicio = time.perf_counter()
+        resultados = controller.crear_envios_lote(envios)
+        duracion = time.perf_counter() - inicio
+        
+        detalle = []
+        for indice, (envio, mensaje) in enumerate(resultados):
+            if envio:
+                detalle.append({
+                    'indice': indice,
+                    'success': True,
+                    'id': envio.id_envio,
+                    'costo': envio.costo,
+                    'estado': envio.estado.get_descripcion()
+                })
+            else:
+                detalle.append({
+                    'indice': indice,
+                    'success': False,
+                    'error': mensaje
+                })
+        
+        creados = sum(1 for item in detalle if item['success'])
+        return jsonify({
+            'success': creados > 0 or not detalle,
+            'data': {
+                'creados': creados,
+                'fallidos': len(detalle) - creados,
+                'duracion_segundos': duracion,
+                'envios_por_segundo': creados / duracion if duracion else 0,
+                'resultados': detalle
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/envios/validar', methods=['POST'])
+def validar_envios_lote():
+    """Valida muchos envíos sin crearlos y reporta todos los errores de cada uno"""
+    try:
+        data = request.get_json()
+        envios = data.get('envios') if isinstance(data, dict) else None
+        
+        if not isinstance(envios, list):
+            return jsonify({
+                'success': False,
+                'error': 'Se esperaba un objeto con la lista "envios"'
+            }), 400
+        
+        resultados = controller.validar_envios_lote(envios)
+        
+        detalle = []
+        for indice, (envio, errores) in enumerate(resultados):
+            item = {
+                'indice': indice,
+                'valido': not errores,
+                'errores': errores
+            }
+            if envio:
+                item['distancia'] = envio.distancia
+                item['requiere_seguro'] = envio.requiere_seguro
+            detalle.append(item)
+        
+        validos = sum(1 for item in detalle if item['valido'])
+        return jsonify({
+            'success': True,
+            'data': {
+                'validos': validos,
+                'invalidos': len(detalle) - validos,
+                'resultados': detalle
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def fecha_local(texto: str) -> datetime:
+    """Fecha ISO como hora local sin zona (la de las fechas de creación guardadas)"""
+    fecha = datetime.fromisoformat(texto)
+    if fecha.tzinfo is not None:
+        fecha = datetime.fromtimestamp(fecha.timestamp())
+    return fecha
+
+
+@app.route('/api/envios/transicion', methods=['POST'])
+def transicionar_envios():
+    """Avanza o cancela todos los envíos que cumplen un filtro"""
+    try:
+        data = request.get_json() or {}
+        
+        ids = data.get('ids')
+        if ids is not None and (not isinstance(ids, list)
+                                or not all(isinstance(id_envio, str) for id_envio in ids)):
+            return jsonify({
+                'success': False,
+                'error': '"ids" debe ser una lista de IDs de envío'
+            }), 400
+        
+        desde = fecha_local(data['desde']) if data.get('desde') else None
+        hasta = fecha_local(data['hasta']) if data.get('hasta') else None
+        
+        resultados = controller.transicionar_envios(
+            accion=data.get('accion', 'siguiente'),
+            ids=ids,
+            estado=data.get('estado'),
+            tipo=data.get('tipo'),
+            desde=desde,
+            hasta=hasta
+        )
+        
+        cambiados = sum(1 for _, cambio, _ in resultados if cambio)
+        return jsonify({
+            'success': True,
+            'data': {
+                'total': len(resultados),
+                'cambiados': cambiados,
+                'sin_cambio': len(resultados) - cambiados,
+                'resultados': [
+                    {'id': id_envio, 'cambio': cambio, 'mensaje': mensaje}
+                    for id_envio, cambio, mensaje in resultados
+                ]
+            }
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/cotizar', methods=['POST'])
+def cotizar():
+    """Cotiza un envío (costo, descuentos y tiempo de entrega) sin crearlo"""
+    try:
+        data = request.get_json() or {}
+        
+        campos_requeridos = ['tipo', 'direccion_origen', 'direccion_destino', 'peso']
+        for campo in campos_requeridos:
+            if campo not in data:
+                return jsonify({
+                    'success': False,
+                    'error': f'Campo requerido faltante: {campo}'
+                }), 400
+        
+        cotizacion, mensaje = controller.cotizar(
+            tipo=data['tipo'],
+            direccion_origen=data['direccion_origen'],
+            direccion_destino=data['direccion_destino'],
+            peso=float(data['peso']),
+            es_fragil=data.get('es_fragil', False),
+            remitente=data.get('remitente', ''),
+            destinatario=data.get('destinatario', ''),
+            descripcion=data.get('descripcion', '')
+        )
+        
+        if not cotizacion:
+            return jsonify({
+                'success': False,
+                'error': mensaje
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': cotizacion
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error en los datos: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def obtener_envio_en(envio, as_of: str):
+    """Respuesta de GET /api/envios/<id>?as_of=...: el envío reconstruido desde su historial"""
+    try:
+        momento = datetime.fromtimestamp(float(as_of))
+    except ValueError:
+        try:
+            momento = datetime.fromisoformat(as_of)
+            momento.timestamp()
+        except (ValueError, OverflowError, OSError):
+            momento = None
+    except (OverflowError, OSError):
+        # Fecha fuera del rango representable (ej. 1e20 o inf)
+        momento = None
+    
+    if momento is None:
+        return jsonify({
+            'success': False,
+            'error': f'Fecha inválida en as_of: {as_of}'
+        }), 400
+    
+    memento = controller.obtener_envio_en(envio.id_envio, momento)
+    if not memento:
+        return jsonify({
+            'success': False,
+            'error': f'Sin historial del envío {envio.id_envio} en {momento.strftime("%Y-%m-%d %H:%M:%S")}'
+        }), 404
+    
+    campos = memento.get_campos()
+    clase_estado = ESTADOS.get(campos['estado'])
+    return jsonify({
+        'success': True,
+        'data': {
+            'id': campos['id_envio'],
+            'remitente': campos['remitente'],
+            'destinatario': campos['destinatario'],
+            'origen': campos['direccion_origen'],
+            'destino': campos['direccion_destino'],
+            'peso': campos['peso'],
+            'tipo': campos['tipo_envio'],
+            'estado': clase_estado().get_descripcion() if clase_estado else "Sin estado",
+            'costo': campos['costo'],
+            'distancia': campos['distancia'],
+            'es_fragil': campos['es_fragil'],
+            'requiere_seguro': campos['requiere_seguro'],
+            'descripcion': campos['descripcion'],
+            'fecha_creacion': envio.fecha_creacion.strftime("%Y-%m-%d %H:%M:%S"),
+            'as_of': momento.isoformat(),
+            'snapshot': {
+                'timestamp': memento.get_timestamp().isoformat(),
+                'descripcion_cambio': memento.get_descripcion_cambio()
+            }
+        }
+    })
+
+
 @app.route('/api/envios/<id_envio>/estado', methods=['GET'])
 def consultar_estado(id_envio):
     """Consulta el estado actual de un envío"""
@@ -235,6 +605,113 @@ def cancelar_envio(id_envio):
         }), 500
 
 
+@app.route('/api/envios/<id_envio>', methods=['PATCH'])
+def modificar_envio_campos(id_envio):
+    """Modifica varios campos de un envío en una sola operación atómica"""
+    try:
+        data = request.get_json()
+        
+        if not isinstance(data, dict) or not data:
+            return jsonify({
+                'success': False,
+                'error': 'Se esperaba un objeto con los campos a modificar'
+            }), 400
+        
+        if not controller.obtener_envio(id_envio):
+            return jsonify({
+                'success': False,
+                'error': f'Envío {id_envio} no encontrado'
+            }), 404
+        
+        resultado, mensaje = controller.modificar_envio_campos(id_envio, data)
+        
+        if not resultado:
+            return jsonify({
+                'success': False,
+                'error': mensaje
+            }), 400
+        
+        envio = controller.obtener_envio(id_envio)
+        
+        return jsonify({
+            'success': True,
+            'message': mensaje,
+            'data': {
+                'id': id_envio,
+                'costo_actualizado': envio.costo,
+                'distancia': envio.distancia,
+                'requiere_seguro': envio.requiere_seguro
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/transacciones', methods=['POST'])
+def ejecutar_transaccion():
+    """Aplica varias operaciones sobre distintos envíos: todas o ninguna"""
+    try:
+        data = request.get_json() or {}
+        operaciones = data.get('operaciones')
+        
+        if not isinstance(operaciones, list) or not operaciones:
+            return jsonify({
+                'success': False,
+                'error': 'Se esperaba una lista "operaciones" con al menos una operación'
+            }), 400
+        
+        transaccion = controller.transaccion()
+        for operacion in operaciones:
+            if not isinstance(operacion, dict) or not operacion.get('id'):
+                return jsonify({
+                    'success': False,
+                    'error': 'Cada operación requiere "accion" e "id"'
+                }), 400
+            
+            accion = operacion.get('accion')
+            if accion == 'modificar':
+                transaccion.modificar(operacion['id'], operacion.get('cambios') or {})
+            elif accion == 'avanzar':
+                transaccion.avanzar(operacion['id'])
+            elif accion == 'cancelar':
+                transaccion.cancelar(operacion['id'])
+            else:
+                return jsonify({
+                    'success': False,
+                    'error': f"Acción '{accion}' no válida. Acciones válidas: modificar, avanzar, cancelar"
+                }), 400
+        
+        resultado, mensaje = transaccion.confirmar()
+        
+        if not resultado:
+            return jsonify({
+                'success': False,
+                'error': mensaje
+            }), 409
+        
+        ids = list(dict.fromkeys(operacion['id'] for operacion in operaciones))
+        return jsonify({
+            'success': True,
+            'message': mensaje,
+            'data': [
+                {
+                    'id': id_envio,
+                    'estado': envio.estado.get_descripcion() if envio.estado else 'Sin estado',
+                    'costo': envio.costo
+                }
+                for id_envio, envio in ((id_envio, controller.obtener_envio(id_envio)) for id_envio in ids)
+            ]
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/envios/<id_envio>/modificar', methods=['PUT'])
 def modificar_envio(id_envio):
     """Modifica datos de un envío"""
@@ -334,13 +811,14 @@ def rehacer_cambio(id_envio):
 def obtener_historial(id_envio):
     """Obtiene el historial de cambios de un envío"""
     try:
-        if id_envio not in controller.originadores:
+        originador = controller.registro.obtener_originador(id_envio)
+        if not originador:
             return jsonify({
                 'success': False,
                 'error': f'Envío {id_envio} no encontrado'
             }), 404
         
-        historial = controller.originadores[id_envio].caretaker.get_historial_completo()
+        historial = originador.caretaker.get_historial_completo()
         
         return jsonify({
             'success': True,
@@ -379,6 +857,33 @@ def calcular_tiempo_entrega(id_envio):
         }), 500
 
 
+@app.route('/api/envios/tiempos-entrega', methods=['GET'])
+def calcular_tiempos_entrega():
+    """Calcula el tiempo estimado de entrega de muchos envíos (por defecto, todos los abiertos)"""
+    try:
+        ids = request.args.get('ids')
+        resultados = controller.calcular_tiempos_entrega(
+            ids=ids.split(',') if ids else None,
+            estado=request.args.get('estado'),
+            tipo=request.args.get('tipo')
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': [
+                {'id': id_envio, 'dias_estimados': dias}
+                for id_envio, dias in resultados
+            ],
+            'total': len(resultados)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/envios/<id_envio>/descuentos', methods=['GET'])
 def calcular_descuentos(id_envio):
     """Calcula los descuentos aplicables"""
@@ -409,6 +914,42 @@ def calcular_descuentos(id_envio):
         }), 500
 
 
+@app.route('/api/analitica', methods=['GET'])
+def obtener_analitica():
+    """Retorna agregados de todo el libro de envíos (ingresos, peso, distancia)"""
+    try:
+        if controller.analitica is None:
+            return jsonify({
+                'success': False,
+                'error': 'Analítica no disponible (requiere NumPy)'
+            }), 501
+        
+        return jsonify({
+            'success': True,
+            'data': controller.analitica.resumen()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/historiales/memoria', methods=['GET'])
+def obtener_memoria_historiales():
+    """Uso del presupuesto de memoria de los historiales y descargas/recargas a disco"""
+    if gestor_historiales is None:
+        return jsonify({
+            'success': False,
+            'error': 'Presupuesto de historiales no configurado (TRANSPORTES_HISTORIAL_MEMORIA_MB)'
+        }), 501
+    
+    return jsonify({
+        'success': True,
+        'data': gestor_historiales.estadisticas()
+    })
+
+
 @app.route('/api/envios/<id_envio>/reporte', methods=['GET'])
 def generar_reporte(id_envio):
     """Genera un reporte completo del envío"""
@@ -0,0 +1,80 @@
+# benchmark_costos.py
+"""
+Benchmark del cálculo de costos: CalculadorCosto (un envío a la vez) frente a
+CalculadorCostoLote (NumPy). Verifica además que ambos den resultados idénticos bit a bit
+Ejecutar: python benchmark_costos.py [cantidad_envios]
+"""
+import sys
+import os
+import random
+import time
+
+# Agregar el path del proyecto
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from Models.Envio import CLASES_POR_TIPO
+from Patterns.Visitor import CalculadorCosto
+from Patterns.VisitorLote import CalculadorCostoLote, codigos_tipo
+
+
+def crear_envios(cantidad: int) -> list:
+    """Genera envíos aleatorios (semilla fija) de todos los tipos"""
+    aleatorio = random.Random(42)
+    clases = list(CLASES_POR_TIPO.values())
+    envios = []
+    for i in range(cantidad):
+        envio = aleatorio.choice(clases)(f"ENV-{i:07d}", "Juan Pérez", "María García",
+                                         "Calle 100 #45-67, Bogotá", "Carrera 50 #23-45, Medellín",
+                                         round(aleatorio.uniform(0.1, 1000), 2))
+        envio.distancia = aleatorio.randint(10, 3000)
+        envio.es_fragil = aleatorio.random() < 0.2
+        envio.requiere_seguro = envio.peso > 50 or envio.es_fragil
+        envios.append(envio)
+    return envios
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    envios = crear_envios(cantidad)
+
+    inicio = time.perf_counter()
+    calculador = CalculadorCosto()
+    por_objeto = np.array([envio.accept(calculador) for envio in envios])
+    tiempo_objeto = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    vectorizado = CalculadorCostoLote().calcular_envios(envios)
+    tiempo_lote = time.perf_counter() - inicio
+
+    # Solo el cálculo, con las columnas ya extraídas (ej. desde el almacén columnar)
+    columnas = (
+        np.array([envio.peso for envio in envios], dtype=np.float64),
+        np.array([envio.distancia for envio in envios], dtype=np.float64),
+        codigos_tipo([envio.tipo_envio for envio in envios]),
+        np.array([envio.es_fragil for envio in envios], dtype=bool),
+        np.array([envio.requiere_seguro for envio in envios], dtype=bool),
+    )
+    inicio = time.perf_counter()
+    CalculadorCostoLote().calcular(*columnas)
+    tiempo_columnas = time.perf_counter() - inicio
+
+    identicos = np.array_equal(por_objeto.view(np.uint64), vectorizado.view(np.uint64))
+
+    print(f"\n{'='*60}")
+    print(f"CÁLCULO DE COSTOS ({cantidad:,} envíos)")
+    print(f"{'='*60}")
+    print(f"Visitor (por objeto):     {tiempo_objeto:8.3f} s  ({cantidad / tiempo_objeto:12,.0f} envíos/s)")
+    print(f"Lote (NumPy):             {tiempo_lote:8.3f} s  ({cantidad / tiempo_lote:12,.0f} envíos/s)")
+    print(f"Lote (solo columnas):     {tiempo_columnas:8.3f} s  ({cantidad / tiempo_columnas:12,.0f} envíos/s)")
+    print(f"Aceleración:              {tiempo_objeto / tiempo_lote:8.1f}x")
+    print(f"Resultados idénticos:     {'Sí' if identicos else 'NO'}")
+    print(f"{'='*60}\n")
+
+    if not identicos:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmark_memoria.py
+"""
+Benchmark de memoria por envío: representación anterior (__dict__ + datetime)
+frente a la representación compacta actual (__slots__ + timestamp flotante)
+Ejecutar: python benchmark_memoria.py [cantidad_envios]
+"""
+import sys
+import os
+import gc
+import tracemalloc
+from datetime import datetime
+
+# Agregar el path del proyecto
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from Models.Envio import EnvioExpress
+
+
+class EnvioConDict:
+    """Réplica de la representación anterior de Envio (atributos en __dict__)"""
+
+    def __init__(self, id_envio, remitente, destinatario, direccion_origen,
+                 direccion_destino, peso, tipo_envio, descripcion=""):
+        self.id_envio = id_envio
+        self.remitente = remitente
+        self.destinatario = destinatario
+        self.direccion_origen = direccion_origen
+        self.direccion_destino = direccion_destino
+        self.peso = peso
+        self.tipo_envio = tipo_envio
+        self.descripcion = descripcion
+        self.fecha_creacion = datetime.now()
+        self.estado = None
+        self.costo = 0.0
+        self.distancia = 0.0
+        self.es_fragil = False
+        self.requiere_seguro = False
+
+
+def medir(fabrica, cantidad: int) -> float:
+    """Retorna los bytes asignados por envío al crear `cantidad` envíos"""
+    gc.collect()
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+
+    envios = [fabrica(i) for i in range(cantidad)]
+
+    total = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    del envios
+    gc.collect()
+    return total / cantidad
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    # Textos compartidos: solo el ID es distinto en cada envío
+    remitente, destinatario = "Juan Pérez", "María García"
+    origen, destino = "Calle 100 #45-67, Bogotá", "Carrera 50 #23-45, Medellín"
+
+    antes = medir(lambda i: EnvioConDict(f"ENV-{i:07d}", remitente, destinatario,
+                                         origen, destino, 12.5, "Express"), cantidad)
+    despues = medir(lambda i: EnvioExpress(f"ENV-{i:07d}", remitente, destinatario,
+                                           origen, destino, 12.5), cantidad)
+
+    print(f"\n{'='*60}")
+    print(f"MEMORIA POR ENVÍO ({cantidad:,} envíos)")
+    print(f"{'='*60}")
+    print(f"Antes (__dict__ + datetime):      {antes:8.1f} bytes/envío")
+    print(f"Después (__slots__ + timestamp):  {despues:8.1f} bytes/envío")
+    print(f"Ahorro:                           {antes - despues:8.1f} bytes/envío "
+          f"({(1 - despues / antes) * 100:.1f}%)")
+    print(f"Total a esta escala:              {antes * cantidad / 2**20:8.1f} MiB → "
+          f"{despues * cantidad / 2**20:.1f} MiB")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
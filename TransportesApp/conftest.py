@@ -0,0 +1,35 @@
+# conftest.py
+"""
+Configuración de pytest para las pruebas de tests/
+Ejecutar desde TransportesApp con: python -m pytest
+"""
+import os
+
+import pytest
+
+# Las pruebas no necesitan la salida de la bitácora (tiene prioridad sobre configurar_bitacora)
+os.environ.setdefault('TRANSPORTES_LOG_NIVEL', 'SILENCIO')
+
+# test_patrones.py es la demostración interactiva por consola (python test_patrones.py)
+collect_ignore = ["test_patrones.py"]
+
+
+@pytest.fixture
+def controller():
+    """Controlador en memoria, sin almacenamiento ni diario"""
+    from Controllers.EnvioController import EnvioController
+    return EnvioController()
+
+
+@pytest.fixture
+def datos_envio():
+    """Datos válidos para crear un envío (claves de crear_envio())"""
+    return {
+        'tipo': "Estándar",
+        'remitente': "Ana Pérez",
+        'destinatario': "Carlos Ruiz",
+        'direccion_origen': "Calle 10 #20-30, Bogotá",
+        'direccion_destino': "Carrera 5 #12-40, Medellín",
+        'peso': 8.0,
+        'descripcion': "Libros",
+    }
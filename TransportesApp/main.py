@@ -17,10 +17,13 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from Views.ConsoleView import ConsoleView
+from Utils.Bitacora import configurar_bitacora
 
 def main():
     """Función principal que inicia la aplicación"""
     try:
+        # La consola muestra el detalle de cada patrón (TRANSPORTES_LOG_NIVEL lo reduce)
+        configurar_bitacora("DEBUG")
         vista = ConsoleView()
         vista.ejecutar()
     except KeyboardInterrupt:
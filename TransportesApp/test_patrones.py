@@ -13,6 +13,10 @@ from Controllers.EnvioController import EnvioController
 from Patterns.ChainOfResponsibility import CadenaValidacion
 from Patterns.State import GestorEstadoEnvio
 from Patterns.Visitor import CalculadorCosto, CalculadorTiempoEntrega, GeneradorReporte
+from Utils.Bitacora import configurar_bitacora
+
+# La demostración muestra el detalle completo de cada patrón
+configurar_bitacora("DEBUG")
 
 def separador(titulo):
     """Imprime un separador visual"""
@@ -0,0 +1,141 @@
+# tests/test_concurrencia.py
+"""
+Pruebas de concurrencia de EnvioController: IDs únicos, locks por franja de envíos
+y transacciones que toman varios locks sin interbloquearse
+"""
+import sys
+import threading
+
+import pytest
+
+from Controllers.EnvioController import EnvioController
+
+HILOS = 8
+
+
+@pytest.fixture(autouse=True)
+def cambios_de_hilo_frecuentes():
+    """Fuerza cambios de hilo frecuentes para que las carreras aparezcan"""
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(intervalo)
+
+
+def ejecutar_en_hilos(trabajo, cantidad: int = HILOS):
+    """Ejecuta trabajo(k) en varios hilos a la vez y propaga el primer error"""
+    errores = []
+    inicio = threading.Barrier(cantidad)
+
+    def envoltura(k):
+        try:
+            inicio.wait()
+            trabajo(k)
+        except BaseException as error:  # pragma: no cover - solo si la prueba falla
+            errores.append(error)
+
+    hilos = [threading.Thread(target=envoltura, args=(k,)) for k in range(cantidad)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(timeout=60)
+        assert not hilo.is_alive(), "Un hilo no terminó (posible interbloqueo)"
+    if errores:
+        raise errores[0]
+
+
+def test_creacion_concurrente_asigna_ids_unicos(controller, datos_envio):
+    por_hilo = 40
+
+    def trabajo(k):
+        for _ in range(por_hilo):
+            assert controller.crear_envio(**datos_envio) is not None
+
+    ejecutar_en_hilos(trabajo)
+
+    ids = [envio.id_envio for envio in controller.envios]
+    assert len(ids) == HILOS * por_hilo
+    assert len(set(ids)) == len(ids)
+    assert controller.get_total_envios() == HILOS * por_hilo
+
+
+def test_modificaciones_concurrentes_de_campos_distintos_no_se_pierden(controller, datos_envio):
+    envio = controller.crear_envio(**datos_envio)
+    campos = ['remitente', 'destinatario', 'descripcion', 'peso']
+    repeticiones = 200
+
+    def trabajo(k):
+        campo = campos[k % len(campos)]
+        for i in range(repeticiones):
+            valor = 1.0 + i if campo == 'peso' else f"{campo}-{i}"
+            exito, mensaje = controller.modificar_envio_campos(envio.id_envio, {campo: valor})
+            assert exito, mensaje
+
+    ejecutar_en_hilos(trabajo, len(campos))
+
+    # Cada PATCH copia el envío completo: sin lock, una copia vieja pisaría los otros campos
+    assert envio.remitente == f"remitente-{repeticiones - 1}"
+    assert envio.destinatario == f"destinatario-{repeticiones - 1}"
+    assert envio.descripcion == f"descripcion-{repeticiones - 1}"
+    assert envio.peso == float(repeticiones)
+
+
+def test_avances_concurrentes_aplican_cada_transicion_una_vez(controller, datos_envio):
+    envios = [controller.crear_envio(**datos_envio) for _ in range(100)]
+
+    def trabajo(k):
+        for envio in envios:
+            assert controller.avanzar_estado_envio(envio.id_envio)
+
+    # Cuatro avances por envío: Pendiente -> ... -> Entregado
+    ejecutar_en_hilos(trabajo, 4)
+
+    for envio in envios:
+        assert envio.estado.__class__.__name__ == "EstadoEntregado"
+        caretaker = controller.originadores[envio.id_envio].caretaker
+        assert caretaker.get_total_cambios() == 5
+        estados = [paso['estado'] for paso in caretaker.get_historial_completo()]
+        assert estados == ["EstadoPendiente", "EstadoEnProceso", "EstadoEnTransito",
+                           "EstadoEnDistribucion", "EstadoEntregado"]
+    assert controller.registro.contar_por('estado') == {"EstadoEntregado": len(envios)}
+
+
+def test_transacciones_cruzadas_no_se_interbloquean(controller, datos_envio):
+    # Más envíos que franjas de lock: varios envíos comparten franja
+    envios = [controller.crear_envio(**datos_envio)
+              for _ in range(EnvioController.FRANJAS_LOCK + 8)]
+    ids = [envio.id_envio for envio in envios]
+    repeticiones = 30
+
+    def trabajo(k):
+        # Cada hilo recorre los envíos en un orden distinto
+        orden = ids[k:] + ids[:k] if k % 2 else list(reversed(ids))
+        for i in range(repeticiones):
+            par = (orden[i % len(orden)], orden[(i * 7 + 3) % len(orden)])
+            with controller.transaccion() as transaccion:
+                for id_envio in par:
+                    transaccion.modificar(id_envio, {'descripcion': f"hilo {k}"})
+            assert transaccion.resultado[0], transaccion.resultado[1]
+
+    ejecutar_en_hilos(trabajo)
+
+    for envio in envios:
+        assert envio.descripcion == "Libros" or envio.descripcion.startswith("hilo ")
+
+
+def test_transicion_en_lote_concurrente_con_avances_individuales(controller, datos_envio):
+    envios = [controller.crear_envio(**datos_envio) for _ in range(30)]
+    ids = [envio.id_envio for envio in envios]
+
+    def trabajo(k):
+        if k % 2:
+            controller.transicionar_envios("siguiente", ids=ids)
+        else:
+            for id_envio in ids:
+                controller.avanzar_estado_envio(id_envio)
+
+    ejecutar_en_hilos(trabajo, 4)
+
+    for envio in envios:
+        assert envio.estado.__class__.__name__ == "EstadoEntregado"
+        assert controller.originadores[envio.id_envio].caretaker.get_total_cambios() == 5
@@ -0,0 +1,143 @@
+# tests/test_diario.py
+"""
+Pruebas del diario de operaciones: reabrir el diario (punto de control más
+operaciones posteriores) reconstruye el mismo estado que tenía el controlador
+"""
+import time
+
+import pytest
+
+from Controllers.EnvioController import EnvioController
+from Persistence.DiarioOperaciones import DiarioOperaciones
+from Persistence.Serializacion import COLUMNAS_ENVIO, envio_a_fila
+
+FECHA = COLUMNAS_ENVIO.index('fecha_creacion')
+
+
+def abrir(ruta, intervalo_checkpoint: int = 7) -> EnvioController:
+    return EnvioController(diario=DiarioOperaciones(ruta, intervalo_checkpoint=intervalo_checkpoint,
+                                                    sincronizar=False))
+
+
+def assert_mismas_filas(vivo: EnvioController, recuperado: EnvioController):
+    esperadas = sorted(envio_a_fila(envio) for envio in vivo.envios)
+    obtenidas = sorted(envio_a_fila(envio) for envio in recuperado.envios)
+    assert len(obtenidas) == len(esperadas)
+    for fila, fila_esperada in zip(obtenidas, esperadas):
+        # Al reproducir, la fecha de creación es la del registro en el diario
+        assert fila[:FECHA] + fila[FECHA + 1:] == fila_esperada[:FECHA] + fila_esperada[FECHA + 1:]
+        assert fila[FECHA] == pytest.approx(fila_esperada[FECHA], abs=0.05)
+
+
+def assert_mismos_historiales(vivo: EnvioController, recuperado: EnvioController):
+    originadores = recuperado.originadores
+    for id_envio, originador in vivo.originadores.items():
+        esperado = originador.exportar_historial()
+        obtenido = originadores[id_envio].exportar_historial()
+        assert obtenido['indice_actual'] == esperado['indice_actual'], id_envio
+        assert len(obtenido['mementos']) == len(esperado['mementos']), id_envio
+        for memento, memento_esperado in zip(obtenido['mementos'], esperado['mementos']):
+            # Todo igual salvo el instante, que el diario anota por separado
+            assert memento[:-2] == memento_esperado[:-2]
+            assert memento[-1] == memento_esperado[-1]
+            assert memento[-2] == pytest.approx(memento_esperado[-2], abs=0.05)
+
+
+def operaciones_mixtas(controller: EnvioController, datos_envio: dict) -> list:
+    """Aplica todos los tipos de operación que registra el diario; retorna los IDs"""
+    ids = [controller.crear_envio(**dict(datos_envio, peso=5.0 + i)).id_envio for i in range(6)]
+    resultados = controller.crear_envios_lote([
+        dict(datos_envio, tipo="Express", peso=60),
+        dict(datos_envio, peso=-1),
+        dict(datos_envio, tipo="Económico", es_fragil="true"),
+    ])
+    ids += [envio.id_envio for envio, _ in resultados if envio]
+
+    controller.avanzar_estado_envio(ids[0])
+    controller.avanzar_estado_envio(ids[0])
+    controller.cancelar_envio(ids[1])
+    controller.modificar_envio(ids[2], "peso", 12.5)
+    controller.modificar_envio(ids[2], "remitente", "Dora Díaz")
+    controller.deshacer_cambio(ids[2])
+    controller.modificar_envio_campos(ids[3], {'peso': 70, 'fragil': True, 'descripcion': "Vajilla"})
+    controller.modificar_envio_campos(ids[3], {'peso': 5000})  # rechazada: no se registra
+    controller.deshacer_cambio(ids[3])
+    controller.rehacer_cambio(ids[3])
+    controller.transicionar_envios("siguiente", ids=ids[4:])
+    controller.transicionar_envios("cancelar", ids=[ids[5]])
+    controller.ejecutar_transaccion([
+        ("modificar", ids[4], {'destinatario': "Elena Gómez"}),
+        ("avanzar", ids[4], None),
+        ("modificar", ids[6], {'peso': 2.5}),
+    ])
+    controller.ejecutar_transaccion([
+        ("modificar", ids[0], {'peso': 9.0}),
+        ("avanzar", ids[1], None),  # cancelado: revierte toda la transacción
+    ])
+    return ids
+
+
+def test_reapertura_reproduce_el_estado(tmp_path, datos_envio):
+    ruta = str(tmp_path / "operaciones.diario")
+    vivo = abrir(ruta)
+    operaciones_mixtas(vivo, datos_envio)
+    vivo.diario.cerrar()
+
+    recuperado = abrir(ruta)
+    assert_mismas_filas(vivo, recuperado)
+    assert recuperado.contador_envios == vivo.contador_envios
+    assert_mismos_historiales(vivo, recuperado)
+    recuperado.diario.cerrar()
+
+
+def test_reapertura_sin_punto_de_control(tmp_path, datos_envio):
+    ruta = str(tmp_path / "operaciones.diario")
+    vivo = abrir(ruta, intervalo_checkpoint=10**6)
+    operaciones_mixtas(vivo, datos_envio)
+    vivo.diario.cerrar()
+
+    recuperado = abrir(ruta, intervalo_checkpoint=10**6)
+    assert recuperado.diario.cargar_checkpoint() is None
+    assert_mismas_filas(vivo, recuperado)
+    assert_mismos_historiales(vivo, recuperado)
+    recuperado.diario.cerrar()
+
+
+def test_reaperturas_sucesivas_continuan_el_diario(tmp_path, datos_envio):
+    ruta = str(tmp_path / "operaciones.diario")
+    vivo = abrir(ruta)
+    ids = operaciones_mixtas(vivo, datos_envio)
+    vivo.diario.cerrar()
+
+    # Seguir operando sobre el controlador recuperado y volver a reabrir
+    intermedio = abrir(ruta)
+    nuevo = intermedio.crear_envio(**datos_envio)
+    assert nuevo.id_envio not in ids
+    intermedio.avanzar_estado_envio(nuevo.id_envio)
+    intermedio.modificar_envio_campos(ids[2], {'destinatario': "Franco Luna"})
+    intermedio.diario.cerrar()
+
+    recuperado = abrir(ruta)
+    assert_mismas_filas(intermedio, recuperado)
+    assert_mismos_historiales(intermedio, recuperado)
+    recuperado.diario.cerrar()
+
+
+def test_consulta_historica_tras_reapertura(tmp_path, datos_envio):
+    ruta = str(tmp_path / "operaciones.diario")
+    vivo = abrir(ruta)
+    envio = vivo.crear_envio(**datos_envio)
+    for peso in (4.0, 6.0):
+        time.sleep(0.02)
+        vivo.modificar_envio(envio.id_envio, "peso", peso)
+    vivo.diario.cerrar()
+
+    # Los mementos reconstruidos conservan la fecha de la operación original
+    recuperado = abrir(ruta)
+    originador = recuperado.originadores[envio.id_envio]
+    marcas = [memento[-2] for memento in originador.exportar_historial()['mementos']]
+    assert marcas == sorted(marcas)
+    assert originador.estado_en(marcas[0] - 1) is None
+    assert originador.estado_en(marcas[1]).get_campos()['peso'] == 4.0
+    assert originador.estado_en(marcas[2]).get_campos()['peso'] == 6.0
+    recuperado.diario.cerrar()
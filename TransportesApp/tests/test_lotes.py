@@ -0,0 +1,309 @@
+# tests/test_lotes.py
+"""
+Pruebas de las operaciones en lote y atómicas: errores por elemento en la creación
+y validación en lote, transiciones en lote, PATCH y transacciones (todo o nada),
+tanto en EnvioController como en los endpoints de la API
+"""
+import pytest
+
+from Persistence.Serializacion import envio_a_fila
+
+
+def instantanea(controller, id_envio: str) -> tuple:
+    """Fila del envío y su historial completo (para verificar que nada cambió)"""
+    return (envio_a_fila(controller.obtener_envio(id_envio)),
+            controller.originadores[id_envio].exportar_historial())
+
+
+# ============================================================================
+# CREACIÓN Y VALIDACIÓN EN LOTE
+# ============================================================================
+
+def test_crear_lote_reporta_errores_por_elemento(controller, datos_envio):
+    resultados = controller.crear_envios_lote([
+        datos_envio,
+        "no es un objeto",
+        {'tipo': "Express", 'remitente': "Ana"},
+        dict(datos_envio, remitente=123),
+        dict(datos_envio, direccion_destino=["Calle 1"]),
+        dict(datos_envio, peso="pesado"),
+        dict(datos_envio, es_fragil="sí"),
+        dict(datos_envio, tipo="Urgente"),
+        dict(datos_envio, peso=0),
+        dict(datos_envio, tipo="Express", es_fragil="true"),
+    ])
+
+    assert len(resultados) == 10
+    creados = [envio for envio, _ in resultados if envio]
+    assert [indice for indice, (envio, _) in enumerate(resultados) if envio] == [0, 9]
+    assert creados[1].es_fragil is True and creados[1].tipo_envio == "Express"
+
+    mensajes = [mensaje for _, mensaje in resultados]
+    assert "Cada envío debe ser un objeto" in mensajes[1]
+    assert "Campos requeridos faltantes" in mensajes[2] and "destinatario" in mensajes[2]
+    assert "deben ser texto: remitente" in mensajes[3]
+    assert "deben ser texto: direccion_destino" in mensajes[4]
+    assert "Peso inválido" in mensajes[5]
+    assert "'es_fragil'" in mensajes[6]
+    assert "Tipo de envío 'Urgente' no válido" in mensajes[7]
+    assert "Peso mínimo" in mensajes[8]
+
+    # Solo los válidos quedan registrados
+    assert {envio.id_envio for envio in controller.envios} == {envio.id_envio for envio in creados}
+
+
+def test_validar_lote_reporta_todos_los_errores_sin_crear(controller, datos_envio):
+    resultados = controller.validar_envios_lote([
+        datos_envio,
+        dict(datos_envio, tipo="Urgente", peso=5000, remitente=""),
+        dict(datos_envio, remitente=123, destinatario={'nombre': "Carlos"}),
+        dict(datos_envio, peso="pesado", es_fragil="quizás"),
+        {'peso': 3},
+        42,
+    ])
+
+    assert resultados[0][1] == []
+    assert resultados[0][0].distancia > 0
+
+    errores = resultados[1][1]
+    assert any("Remitente o destinatario vacío" in error for error in errores)
+    assert any("Peso máximo" in error for error in errores)
+    assert any("Tipo de envío inválido" in error for error in errores)
+
+    assert any("deben ser texto: remitente, destinatario" in error for error in resultados[2][1])
+    assert len(resultados[3][1]) == 2 and resultados[3][0] is None
+    assert any("Campos requeridos faltantes" in error for error in resultados[4][1])
+    assert resultados[5] == (None, ["❌ Error: Cada envío debe ser un objeto"])
+
+    assert controller.get_total_envios() == 0
+
+
+# ============================================================================
+# TRANSICIONES EN LOTE
+# ============================================================================
+
+def test_transicion_en_lote_por_ids(controller, datos_envio):
+    envios = [controller.crear_envio(**datos_envio) for _ in range(3)]
+    controller.cancelar_envio(envios[2].id_envio)
+    ids = [envio.id_envio for envio in envios]
+
+    resultados = controller.transicionar_envios("siguiente", ids=ids + [ids[0], "ENV-99999"])
+
+    por_id = {id_envio: (cambio, mensaje) for id_envio, cambio, mensaje in resultados}
+    assert len(resultados) == 4  # el ID repetido se transiciona una sola vez
+    assert por_id[ids[0]][0] and por_id[ids[1]][0]
+    assert not por_id[ids[2]][0]
+    assert por_id["ENV-99999"] == (False, "Envío ENV-99999 no encontrado")
+    assert envios[0].estado.__class__.__name__ == "EstadoEnProceso"
+    assert envios[2].estado.__class__.__name__ == "EstadoCancelado"
+
+
+def test_transicion_en_lote_por_filtro(controller, datos_envio):
+    estandar = [controller.crear_envio(**datos_envio) for _ in range(3)]
+    express = controller.crear_envio(**dict(datos_envio, tipo="Express"))
+    controller.avanzar_estado_envio(estandar[0].id_envio)
+
+    resultados = controller.transicionar_envios("cancelar", estado="EstadoPendiente", tipo="Estándar")
+
+    assert sorted(id_envio for id_envio, _, _ in resultados) == sorted(
+        envio.id_envio for envio in estandar[1:])
+    assert all(envio.estado.__class__.__name__ == "EstadoCancelado" for envio in estandar[1:])
+    assert estandar[0].estado.__class__.__name__ == "EstadoEnProceso"
+    assert express.estado.__class__.__name__ == "EstadoPendiente"
+
+
+def test_transicion_en_lote_rechaza_acciones_y_filtros_invalidos(controller):
+    with pytest.raises(ValueError):
+        controller.transicionar_envios("entregar", ids=["ENV-00001"])
+    with pytest.raises(ValueError):
+        controller.transicionar_envios("siguiente")
+
+
+# ============================================================================
+# PATCH Y TRANSACCIONES (TODO O NADA)
+# ============================================================================
+
+@pytest.mark.parametrize("cambios", [
+    {'peso': 20, 'campo_inexistente': 1},
+    {'remitente': "Dora Díaz", 'peso': "pesado"},
+    {'descripcion': "Vajilla", 'fragil': "tal vez"},
+    {'remitente': "Dora Díaz", 'peso': 5000},
+    {'remitente': ""},
+    {},
+])
+def test_patch_invalido_no_modifica_el_envio(controller, datos_envio, cambios):
+    envio = controller.crear_envio(**datos_envio)
+    antes = instantanea(controller, envio.id_envio)
+
+    exito, mensaje = controller.modificar_envio_campos(envio.id_envio, cambios)
+
+    assert not exito and mensaje.startswith("❌")
+    assert instantanea(controller, envio.id_envio) == antes
+
+
+def test_patch_aplica_todos_los_campos_con_un_snapshot(controller, datos_envio):
+    envio = controller.crear_envio(**datos_envio)
+    costo = envio.costo
+
+    exito, _ = controller.modificar_envio_campos(
+        envio.id_envio, {'peso': 60, 'fragil': "true", 'descripcion': "Vajilla"})
+
+    assert exito
+    assert (envio.peso, envio.es_fragil, envio.descripcion) == (60.0, True, "Vajilla")
+    assert envio.requiere_seguro and envio.costo > costo
+    assert controller.originadores[envio.id_envio].caretaker.get_total_cambios() == 2
+
+
+def test_transaccion_fallida_no_modifica_ningun_envio(controller, datos_envio):
+    envios = [controller.crear_envio(**datos_envio) for _ in range(3)]
+    controller.cancelar_envio(envios[2].id_envio)
+    ids = [envio.id_envio for envio in envios]
+    antes = [instantanea(controller, id_envio) for id_envio in ids]
+
+    with controller.transaccion() as transaccion:
+        transaccion.modificar(ids[0], {'peso': 25, 'remitente': "Dora Díaz"})
+        transaccion.avanzar(ids[0])
+        transaccion.avanzar(ids[1])
+        transaccion.avanzar(ids[2])  # cancelado: no puede avanzar
+
+    exito, mensaje = transaccion.resultado
+    assert not exito and ids[2] in mensaje
+    assert [instantanea(controller, id_envio) for id_envio in ids] == antes
+
+
+def test_transaccion_fallida_por_validacion_en_un_paso_posterior(controller, datos_envio):
+    envios = [controller.crear_envio(**datos_envio) for _ in range(2)]
+    ids = [envio.id_envio for envio in envios]
+    antes = [instantanea(controller, id_envio) for id_envio in ids]
+
+    exito, _ = controller.ejecutar_transaccion([
+        ("avanzar", ids[0], None),
+        ("modificar", ids[1], {'peso': 30}),
+        ("modificar", ids[1], {'peso': 5000}),
+    ])
+
+    assert not exito
+    assert [instantanea(controller, id_envio) for id_envio in ids] == antes
+
+
+def test_transaccion_confirmada_aplica_todo(controller, datos_envio):
+    envios = [controller.crear_envio(**datos_envio) for _ in range(2)]
+    ids = [envio.id_envio for envio in envios]
+
+    exito, _ = controller.ejecutar_transaccion([
+        ("modificar", ids[0], {'peso': 60}),
+        ("avanzar", ids[0], None),
+        ("avanzar", ids[0], None),
+        ("cancelar", ids[1], None),
+    ])
+
+    assert exito
+    assert envios[0].peso == 60.0 and envios[0].requiere_seguro
+    assert envios[0].estado.__class__.__name__ == "EstadoEnTransito"
+    assert envios[1].estado.__class__.__name__ == "EstadoCancelado"
+    # Un solo snapshot por envío para toda la transacción
+    assert controller.originadores[ids[0]].caretaker.get_total_cambios() == 2
+    assert controller.originadores[ids[1]].caretaker.get_total_cambios() == 2
+
+
+def test_transaccion_confirmada_no_se_reutiliza(controller, datos_envio):
+    envio = controller.crear_envio(**datos_envio)
+    transaccion = controller.transaccion().avanzar(envio.id_envio)
+    assert transaccion.confirmar()[0]
+    with pytest.raises(RuntimeError):
+        transaccion.avanzar(envio.id_envio)
+    with pytest.raises(RuntimeError):
+        transaccion.confirmar()
+
+
+# ============================================================================
+# ENDPOINTS DE LA API
+# ============================================================================
+
+@pytest.fixture(scope="module")
+def api():
+    """Aplicación Flask (en memoria) y su controlador"""
+    pytest.importorskip("flask")
+    pytest.importorskip("flask_cors")
+    from backend import app as backend
+    return backend.app.test_client(), backend.controller
+
+
+def crear_por_api(cliente, datos_envio) -> str:
+    respuesta = cliente.post('/api/envios/lote', json={'envios': [datos_envio]})
+    return respuesta.get_json()['data']['resultados'][0]['id']
+
+
+def test_api_lote_detalla_cada_elemento(api, datos_envio):
+    cliente, _ = api
+    respuesta = cliente.post('/api/envios/lote', json={'envios': [
+        datos_envio, dict(datos_envio, remitente=123), dict(datos_envio, es_fragil="sí")]})
+
+    assert respuesta.status_code == 200
+    datos = respuesta.get_json()['data']
+    assert (datos['creados'], datos['fallidos']) == (1, 2)
+    assert [item['success'] for item in datos['resultados']] == [True, False, False]
+    assert "deben ser texto" in datos['resultados'][1]['error']
+
+    assert cliente.post('/api/envios/lote', json={'envios': "x"}).status_code == 400
+
+
+def test_api_validar_lote(api, datos_envio):
+    cliente, controller = api
+    total = controller.get_total_envios()
+    respuesta = cliente.post('/api/envios/validar', json={'envios': [
+        datos_envio, dict(datos_envio, destinatario=["x"], peso=5000)]})
+
+    assert respuesta.status_code == 200
+    resultados = respuesta.get_json()['data']['resultados']
+    assert resultados[0]['valido'] and not resultados[1]['valido']
+    assert len(resultados[1]['errores']) == 2
+    assert controller.get_total_envios() == total
+
+
+def test_api_transicion(api, datos_envio):
+    cliente, controller = api
+    id_envio = crear_por_api(cliente, datos_envio)
+
+    for cuerpo in ({'ids': id_envio}, {'ids': [1, 2]}, {'accion': "entregar", 'ids': [id_envio]}, {}):
+        assert cliente.post('/api/envios/transicion', json=cuerpo).status_code == 400
+
+    respuesta = cliente.post('/api/envios/transicion', json={
+        'ids': [id_envio, id_envio], 'desde': "2000-01-01T00:00:00+00:00"})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['data']['cambiados'] == 1
+    assert controller.obtener_envio(id_envio).estado.__class__.__name__ == "EstadoEnProceso"
+
+
+def test_api_patch_invalido_no_modifica_el_envio(api, datos_envio):
+    cliente, controller = api
+    id_envio = crear_por_api(cliente, datos_envio)
+    antes = instantanea(controller, id_envio)
+
+    respuesta = cliente.patch(f'/api/envios/{id_envio}', json={'peso': 30, 'fragil': "quizás"})
+
+    assert respuesta.status_code == 400
+    assert instantanea(controller, id_envio) == antes
+    assert cliente.patch('/api/envios/ENV-99999', json={'peso': 3}).status_code == 404
+
+
+def test_api_transaccion_revertida(api, datos_envio):
+    cliente, controller = api
+    ids = [crear_por_api(cliente, datos_envio) for _ in range(2)]
+    cliente.post(f'/api/envios/{ids[1]}/cancelar')
+    antes = [instantanea(controller, id_envio) for id_envio in ids]
+
+    respuesta = cliente.post('/api/transacciones', json={'operaciones': [
+        {'accion': "modificar", 'id': ids[0], 'cambios': {'peso': 40}},
+        {'accion': "avanzar", 'id': ids[1]},
+    ]})
+
+    assert respuesta.status_code == 409
+    assert [instantanea(controller, id_envio) for id_envio in ids] == antes
+
+    respuesta = cliente.post('/api/transacciones', json={'operaciones': [
+        {'accion': "modificar", 'id': ids[0], 'cambios': {'peso': 40}},
+        {'accion': "avanzar", 'id': ids[0]},
+    ]})
+    assert respuesta.status_code == 200
+    assert controller.obtener_envio(ids[0]).peso == 40.0
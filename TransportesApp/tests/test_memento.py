@@ -0,0 +1,192 @@
+# tests/test_memento.py
+"""
+Pruebas del historial (patrón Memento): el caretaker con deltas en buffer circular
+se comporta igual que la implementación original basada en una lista de mementos
+"""
+import random
+from typing import List, Optional
+
+import pytest
+
+from Models.Envio import Envio
+from Patterns.Memento import CaretakerEnvio, MementoEnvio, OriginadorEnvio, momento_fijo
+
+
+class CaretakerLista:
+    """Implementación original del caretaker (lista de mementos), como referencia"""
+
+    def __init__(self):
+        self._historial: List[MementoEnvio] = []
+        self._indice_actual: int = -1
+        self._max_historial: int = 50
+
+    def guardar(self, memento: MementoEnvio):
+        if self._indice_actual < len(self._historial) - 1:
+            self._historial = self._historial[:self._indice_actual + 1]
+        self._historial.append(memento)
+        if len(self._historial) > self._max_historial:
+            self._historial.pop(0)
+        else:
+            self._indice_actual += 1
+
+    def deshacer(self) -> Optional[MementoEnvio]:
+        if self._indice_actual > 0:
+            self._indice_actual -= 1
+            return self._historial[self._indice_actual]
+        return None
+
+    def rehacer(self) -> Optional[MementoEnvio]:
+        if self._indice_actual < len(self._historial) - 1:
+            self._indice_actual += 1
+            return self._historial[self._indice_actual]
+        return None
+
+    def get_historial_completo(self) -> List[dict]:
+        return [memento.get_resumen() for memento in self._historial]
+
+    def puede_deshacer(self) -> bool:
+        return self._indice_actual > 0
+
+    def puede_rehacer(self) -> bool:
+        return self._indice_actual < len(self._historial) - 1
+
+    def get_total_cambios(self) -> int:
+        return len(self._historial)
+
+
+@pytest.fixture(autouse=True)
+def sin_gestor_de_memoria():
+    """Las pruebas usan historiales sin el gestor de memoria compartido"""
+    gestor = CaretakerEnvio.gestor
+    CaretakerEnvio.gestor = None
+    yield
+    CaretakerEnvio.gestor = gestor
+
+
+def nuevo_envio() -> Envio:
+    return Envio("ENV-00001", "Ana Pérez", "Carlos Ruiz", "Calle 10 #20-30, Bogotá",
+                 "Carrera 5 #12-40, Medellín", 8.0, "Estándar", "Libros")
+
+
+def mutar(envio: Envio, azar: random.Random):
+    """Cambia uno o varios campos del envío (a veces ninguno)"""
+    for _ in range(azar.choice([0, 1, 1, 2, 5])):
+        campo = azar.choice(['remitente', 'destinatario', 'direccion_destino', 'peso',
+                             'descripcion', 'costo', 'distancia', 'es_fragil'])
+        if campo in ('peso', 'costo', 'distancia'):
+            setattr(envio, campo, round(azar.uniform(0.1, 900), 2))
+        elif campo == 'es_fragil':
+            envio.es_fragil = not envio.es_fragil
+        else:
+            setattr(envio, campo, f"{campo} {azar.randint(0, 5)}")
+
+
+def tupla(memento: Optional[MementoEnvio]) -> Optional[tuple]:
+    return None if memento is None else memento.a_tupla()
+
+
+def assert_equivalentes(caretaker: CaretakerEnvio, referencia: CaretakerLista):
+    assert caretaker.get_total_cambios() == referencia.get_total_cambios()
+    assert caretaker.puede_deshacer() == referencia.puede_deshacer()
+    assert caretaker.puede_rehacer() == referencia.puede_rehacer()
+    assert caretaker.get_historial_completo() == referencia.get_historial_completo()
+    exportado = caretaker.exportar()
+    assert exportado['indice_actual'] == referencia._indice_actual
+    assert [tuple(memento) for memento in exportado['mementos']] == \
+        [memento.a_tupla() for memento in referencia._historial]
+
+
+@pytest.mark.parametrize("semilla", range(12))
+def test_secuencias_aleatorias_equivalen_a_la_lista(semilla):
+    azar = random.Random(semilla)
+    envio = nuevo_envio()
+    caretaker = CaretakerEnvio()
+    referencia = CaretakerLista()
+
+    # Más de 150 guardados: el buffer circular da varias vueltas
+    for paso in range(400):
+        operacion = azar.choices(["guardar", "deshacer", "rehacer"], weights=[5, 3, 2])[0]
+        if operacion == "guardar":
+            mutar(envio, azar)
+            with momento_fijo(1_700_000_000 + paso):
+                memento = MementoEnvio(envio)
+            memento.set_descripcion_cambio(f"paso {paso}")
+            caretaker.guardar(memento)
+            referencia.guardar(memento)
+        elif operacion == "deshacer":
+            assert tupla(caretaker.deshacer()) == tupla(referencia.deshacer())
+        else:
+            assert tupla(caretaker.rehacer()) == tupla(referencia.rehacer())
+        assert_equivalentes(caretaker, referencia)
+
+
+def test_deshacer_y_rehacer_recorren_todo_el_historial():
+    envio = nuevo_envio()
+    caretaker = CaretakerEnvio()
+    referencia = CaretakerLista()
+    for paso in range(CaretakerEnvio.INTERVALO_CHECKPOINT * 7):
+        envio.peso = 1.0 + paso
+        with momento_fijo(1_700_000_000 + paso):
+            memento = MementoEnvio(envio)
+        caretaker.guardar(memento)
+        referencia.guardar(memento)
+
+    # Deshacer hasta el primer paso guardado y rehacer hasta el último
+    while referencia.puede_deshacer():
+        assert tupla(caretaker.deshacer()) == tupla(referencia.deshacer())
+    assert caretaker.deshacer() is None
+    while referencia.puede_rehacer():
+        assert tupla(caretaker.rehacer()) == tupla(referencia.rehacer())
+    assert caretaker.rehacer() is None
+    assert_equivalentes(caretaker, referencia)
+
+
+def test_exportar_e_importar_conservan_historial_y_posicion():
+    azar = random.Random(7)
+    envio = nuevo_envio()
+    caretaker = CaretakerEnvio()
+    for paso in range(75):
+        mutar(envio, azar)
+        with momento_fijo(1_700_000_000 + paso):
+            caretaker.guardar(MementoEnvio(envio))
+    for _ in range(13):
+        caretaker.deshacer()
+
+    copia = CaretakerEnvio.importar(caretaker.exportar())
+    assert copia.get_historial_completo() == caretaker.get_historial_completo()
+    assert copia.puede_deshacer() == caretaker.puede_deshacer()
+    assert tupla(copia.rehacer()) == tupla(caretaker.rehacer())
+    assert tupla(copia.deshacer()) == tupla(caretaker.deshacer())
+    assert CaretakerEnvio.exportar_captura(caretaker.capturar()) == caretaker.exportar()
+
+
+def test_estado_en_busca_el_paso_vigente():
+    envio = nuevo_envio()
+    caretaker = CaretakerEnvio()
+    for paso in range(60):
+        envio.peso = 1.0 + paso
+        with momento_fijo(1_700_000_000 + 10 * paso):
+            caretaker.guardar(MementoEnvio(envio))
+
+    # Los 10 primeros pasos salieron del buffer (límite de 50)
+    assert caretaker.estado_en(1_700_000_000 + 95) is None
+    assert caretaker.estado_en(1_700_000_000 + 100).get_campos()['peso'] == 11.0
+    assert caretaker.estado_en(1_700_000_000 + 335).get_campos()['peso'] == 34.0
+    assert caretaker.estado_en(1_800_000_000).get_campos()['peso'] == 60.0
+
+
+def test_originador_deshace_y_rehace_los_datos():
+    envio = nuevo_envio()
+    originador = OriginadorEnvio(envio)
+    originador.modificar_peso(12.0)
+    originador.modificar_remitente("Dora Díaz")
+
+    assert originador.deshacer()
+    assert (envio.peso, envio.remitente) == (12.0, "Ana Pérez")
+    assert originador.deshacer()
+    assert (envio.peso, envio.remitente) == (8.0, "Ana Pérez")
+    assert not originador.deshacer()
+    assert originador.rehacer()
+    assert originador.rehacer()
+    assert (envio.peso, envio.remitente) == (12.0, "Dora Díaz")
+    assert not originador.rehacer()